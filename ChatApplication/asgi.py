@@ -8,12 +8,21 @@ https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
 """
 
 import os
-from channels.routing import ProtocolTypeRouter
+from channels.routing import ProtocolTypeRouter, URLRouter
+from channels.security.websocket import AllowedHostsOriginValidator
 from django.core.asgi import get_asgi_application
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yourprojectname.settings')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ChatApplication.settings')
+
+# Initialize Django before importing anything that touches the app registry
+django_asgi_app = get_asgi_application()
+
+from chatapp.middleware import JWTAuthMiddleware  # noqa: E402
+from chatapp.routing import websocket_urlpatterns  # noqa: E402
 
 application = ProtocolTypeRouter({
-    "http": get_asgi_application(),
+    "http": django_asgi_app,
+    "websocket": AllowedHostsOriginValidator(
+        JWTAuthMiddleware(URLRouter(websocket_urlpatterns))
+    ),
 })
-
@@ -76,6 +76,16 @@ WSGI_APPLICATION = 'ChatApplication.wsgi.application'
 
 ASGI_APPLICATION = 'ChatApplication.asgi.application'
 
+# Channels
+# The in-memory layer only fans out within a single process; use
+# channels_redis in production deployments with more than one worker.
+
+CHANNEL_LAYERS = {
+    'default': {
+        'BACKEND': 'channels.layers.InMemoryChannelLayer',
+    },
+}
+
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
@@ -86,14 +96,79 @@ DATABASES = {
     }
 }
 
+# Switch the database to WAL mode with synchronous=NORMAL, so readers and
+# the writer stop blocking each other. Turn it on for deployments; WAL
+# mode is written into the database file, so it is off by default to
+# leave the checked-in db.sqlite3 alone.
+SQLITE_WAL = False
+
+# Per-connection SQLite pragmas, merged over chatapp.sqlite.DEFAULT_PRAGMAS
+# (busy_timeout, mmap_size, cache_size) and the WAL ones. Set a pragma to
+# None to leave SQLite's own default in place.
+SQLITE_PRAGMAS = {}
+
+
+# 'default' is per process here. Blacklisted tokens and membership or
+# user changes reach other worker processes right away only with a shared
+# backend (Redis, Memcached); otherwise the token blacklist is re-read
+# every chatapp.tokens.BLACKLIST_SYNC_INTERVAL seconds.
+CACHES = {
+    # Cached users and membership answers, one small entry each. Past
+    # MAX_ENTRIES a quarter of the cache is culled, so size it above the
+    # number of users times the rooms they are active in.
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+            'CULL_FREQUENCY': 4,
+        },
+    },
+    # Version counters (chatapp.versions.version_cache) that the entries
+    # in 'default' are keyed by, one per chatroom plus the token
+    # blacklist. Kept apart so culling 'default' never evicts them: a lost
+    # version turns every answer cached under it into a miss.
+    'versions': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'versions',
+        'TIMEOUT': None,
+        'OPTIONS': {
+            'MAX_ENTRIES': 1000000,
+        },
+    },
+    # Serialized user and member lists (chatapp.response_cache). Entries
+    # are keyed by version, so stale ones are never read and only need
+    # evicting: MAX_ENTRIES bounds the cache and CULL_FREQUENCY sets how
+    # much of it goes when full. FileBasedCache works here too, with a
+    # LOCATION directory shared by every worker process.
+    'responses': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'responses',
+        'TIMEOUT': 60 * 60,
+        'OPTIONS': {
+            'MAX_ENTRIES': 1000,
+            'CULL_FREQUENCY': 4,
+        },
+    },
+}
+
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'chatapp.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    # orjson-backed JSON when it is installed, the stdlib otherwise
+    'DEFAULT_RENDERER_CLASSES': [
+        'chatapp.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'chatapp.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
 AUTHENTICATION_BACKENDS = [
@@ -114,6 +189,7 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),
     'USER_ID_FIELD': 'id',
     'USER_ID_CLAIM': 'user_id',
+    'TOKEN_REFRESH_SERIALIZER': 'chatapp.serializers.TokenRefreshSerializer',
 }
 
 
@@ -0,0 +1,104 @@
+"""
+Concurrent load through the ASGI handler: sync DRF message views versus
+their native async versions.
+
+Each simulated client authenticates with a real JWT and alternates
+between posting a message and reading the latest page of its chatroom,
+for ``--seconds`` per variant. Requests go through Django's ASGIHandler
+in-process, the same entry point daphne calls, so sync views pay for the
+sync_to_async bridge exactly as they do in production. Reported per
+variant: completed requests per second and latency percentiles.
+
+Usage::
+
+    python -m benchmarks.bench_asgi_load
+    python -m benchmarks.bench_asgi_load --clients 64 --seconds 10
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from .common import make_users, print_table, setup_django, test_database
+
+VARIANTS = {
+    'sync': 'chatroom_messages',
+    'async': 'async_chatroom_messages',
+}
+
+
+def seed(clients):
+    from rest_framework_simplejwt.tokens import AccessToken
+    from chatapp.models import ChatMembership, ChatRoom, Message
+
+    users = make_users(clients)
+    chatroom = ChatRoom.objects.create(name='Busy room', type=ChatRoom.GROUP)
+    ChatMembership.objects.bulk_create([ChatMembership(user=user, chatroom=chatroom) for user in users])
+    Message.objects.bulk_create([
+        Message(user=users[0], chatroom=chatroom, content=f'history {i}') for i in range(1000)
+    ])
+    return [str(AccessToken.for_user(user)) for user in users], chatroom
+
+
+async def client_loop(token, url, deadline, latencies, failures):
+    from django.test import AsyncClient
+
+    client = AsyncClient()
+    headers = {'Authorization': f'Bearer {token}'}
+    post = True
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        if post:
+            response = await client.post(
+                url, {'content': 'load test'}, content_type='application/json', headers=headers
+            )
+            ok = response.status_code == 201
+        else:
+            response = await client.get(url, headers=headers)
+            ok = response.status_code == 200
+        latencies.append(time.perf_counter() - start)
+        if not ok:
+            failures.append(response.status_code)
+        post = not post
+
+
+async def run_variant(tokens, url, seconds):
+    latencies = []
+    failures = []
+    deadline = time.perf_counter() + seconds
+    await asyncio.gather(*(client_loop(token, url, deadline, latencies, failures) for token in tokens))
+    return latencies, failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args(argv)
+
+    setup_django()
+    from django.urls import reverse
+
+    rows = []
+    for variant, url_name in VARIANTS.items():
+        with test_database():
+            tokens, chatroom = seed(args.clients)
+            url = reverse(url_name, args=[chatroom.id])
+            latencies, failures = asyncio.run(run_variant(tokens, url, args.seconds))
+
+        latencies_ms = sorted(latency * 1000 for latency in latencies)
+        rows.append([
+            variant,
+            f'{len(latencies) / args.seconds:.0f}',
+            f'{statistics.median(latencies_ms):.1f}',
+            f'{latencies_ms[int(len(latencies_ms) * 0.95)]:.1f}',
+            len(failures),
+        ])
+
+    print(f'{args.clients} concurrent clients, {args.seconds:g}s per variant')
+    print_table(['views', 'requests/s', 'p50 ms', 'p95 ms', 'failures'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""
+Compare message ingest throughput of the single-message endpoint with the
+batch endpoint at a few batch sizes.
+"""
+
+from .common import (
+    authenticated_client, make_users, measure, print_table, setup_django, test_database
+)
+
+MESSAGES = 2_000
+BATCH_SIZES = [10, 100, 1_000]
+
+
+def run():
+    from django.urls import reverse
+    from chatapp.models import ChatMembership, ChatRoom
+
+    users = make_users(50)
+    chatroom = ChatRoom.objects.create(name='Ingest', type=ChatRoom.GROUP)
+    ChatMembership.objects.bulk_create([ChatMembership(user=user, chatroom=chatroom) for user in users])
+    client = authenticated_client(users[0])
+
+    rows = []
+    single_url = reverse('chatroom_messages', args=[chatroom.id])
+    with measure() as result:
+        for i in range(MESSAGES):
+            response = client.post(single_url, {'content': f'Message {i}'}, format='json')
+            assert response.status_code == 201, response.data
+    rows.append(['single', MESSAGES, result['queries'], f"{MESSAGES / result['seconds']:.0f}"])
+
+    batch_url = reverse('create_messages_batch')
+    for batch_size in BATCH_SIZES:
+        with measure() as result:
+            for start in range(0, MESSAGES, batch_size):
+                batch = [
+                    {'chatroom': chatroom.id, 'content': f'Message {i}'}
+                    for i in range(start, start + batch_size)
+                ]
+                response = client.post(batch_url, {'messages': batch}, format='json')
+                assert response.status_code == 201, response.data
+        rows.append([f'batch of {batch_size}', MESSAGES, result['queries'], f"{MESSAGES / result['seconds']:.0f}"])
+
+    print_table(['path', 'messages', 'queries', 'messages/s'], rows)
+
+
+if __name__ == '__main__':
+    setup_django()
+    with test_database():
+        run()
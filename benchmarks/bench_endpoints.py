@@ -0,0 +1,283 @@
+"""
+Endpoint benchmark suite with query-count and latency budgets.
+
+Seeds a chatroom with 10, 1k or 100k messages, runs every view in
+``chatapp/urls.py`` through APIClient with real JWT authentication and
+records the median wall time, the number of DB queries and the response
+size of each. Results are compared with ``benchmarks/baseline.json`` and
+the run exits non-zero on a regression:
+
+- any extra query,
+- a response more than ``--size-tolerance`` larger,
+- a median time more than ``--time-tolerance`` slower (plus a small
+  absolute allowance, since sub-millisecond timings are noisy).
+
+Usage::
+
+    python -m benchmarks.bench_endpoints                    # 10 and 1k
+    python -m benchmarks.bench_endpoints --scales 10 1k 100k
+    python -m benchmarks.bench_endpoints --update-baseline  # accept results
+
+Timings are machine specific; refresh the baseline when moving machines.
+"""
+
+import argparse
+import json
+import statistics
+import sys
+from itertools import count
+from pathlib import Path
+
+from .common import make_users, measure, print_table, setup_django, test_database
+
+BASELINE_PATH = Path(__file__).resolve().parent / 'baseline.json'
+
+SCALES = {
+    '10': 10,
+    '1k': 1_000,
+    '100k': 100_000,
+}
+
+MEMBERS = 200
+SIDE_ROOMS = 20
+TIME_SLACK_MS = 2.0
+
+_unique = count()
+
+
+class Case:
+    """
+    One request to benchmark. ``prepare`` runs before every timed request,
+    outside the measurement, and returns ``(path, data)``.
+    """
+
+    def __init__(self, name, method, prepare, expected_status):
+        self.name = name
+        self.method = method
+        self.prepare = prepare
+        self.expected_status = expected_status
+
+
+def seed(message_count):
+    from chatapp.activity import record_messages_created
+    from chatapp.models import ChatMembership, ChatRoom, Message
+
+    # make_users gives everyone the password 'benchmark'
+    users = make_users(MEMBERS)
+    owner = users[0]
+
+    chatroom = ChatRoom.objects.create(name='Busy room', type=ChatRoom.GROUP)
+    side_rooms = ChatRoom.objects.bulk_create([
+        ChatRoom(name=f'Side room {i}', type=ChatRoom.GROUP) for i in range(SIDE_ROOMS)
+    ])
+    ChatMembership.objects.bulk_create(
+        [ChatMembership(user=user, chatroom=chatroom) for user in users] +
+        [ChatMembership(user=owner, chatroom=room) for room in side_rooms]
+    )
+
+    words = ['deploy', 'lunch', 'review', 'standup', 'release', 'coffee', 'incident', 'retro']
+    for start in range(0, message_count, 10_000):
+        messages = Message.objects.bulk_create([
+            Message(
+                user=users[i % MEMBERS],
+                chatroom=chatroom,
+                content=f'{words[i % len(words)]} update number {i}'
+            )
+            for i in range(start, min(start + 10_000, message_count))
+        ])
+        record_messages_created(chatroom.id, messages)
+    for room in side_rooms:
+        record_messages_created(room.id, [
+            Message.objects.create(user=owner, chatroom=room, content='hello')
+        ])
+
+    return owner, chatroom
+
+
+def build_cases(owner, chatroom):
+    from django.urls import reverse
+    from rest_framework_simplejwt.tokens import RefreshToken
+    from chatapp.models import ChatRoom, Message
+    from chatapp.personal import get_or_create_personal_chatroom
+
+    refresh = str(RefreshToken.for_user(owner))
+    newest = Message.objects.filter(chatroom=chatroom).order_by('-timestamp', '-id').first()
+
+    def fixed(path, data=None):
+        return lambda: (path, data)
+
+    def register():
+        n = next(_unique)
+        return reverse('register'), {
+            'username': f'bench-register-{n}', 'email': f'register{n}@example.com', 'password': 'benchmark'
+        }
+
+    def new_room():
+        n = next(_unique)
+        return reverse('chatrooms_list'), {'name': f'New room {n}', 'type': ChatRoom.GROUP, 'member_ids': []}
+
+    def disposable_room():
+        room = ChatRoom.objects.create(name='Disposable', type=ChatRoom.GROUP)
+        room.members.add(owner)
+        return reverse('chatrooms_detail', args=[room.id]), None
+
+    peer = chatroom.members.exclude(id=owner.id).order_by('id').first()
+
+    def personal_room():
+        # Time the lookup of an existing room rather than its creation
+        get_or_create_personal_chatroom(owner.id, peer.id)
+        return reverse('personal_chatroom'), {'user_id': peer.id}
+
+    def own_message():
+        message = Message.objects.create(user=owner, chatroom=chatroom, content='to be edited')
+        return reverse('message_detail', args=[message.id]), {'content': 'edited'}
+
+    detail = reverse('chatrooms_detail', args=[chatroom.id])
+    messages = reverse('chatroom_messages', args=[chatroom.id])
+    async_messages = reverse('async_chatroom_messages', args=[chatroom.id])
+    return [
+        Case('register', 'post', register, 201),
+        Case('login', 'post', fixed(reverse('login'), {'username': owner.username, 'password': 'benchmark'}), 200),
+        Case('token_refresh', 'post', fixed(reverse('token_refresh'), {'refresh': refresh}), 200),
+        Case('users GET', 'get', fixed(reverse('users')), 200),
+        Case('users PUT', 'put', fixed(reverse('users'), {'email': owner.email}), 200),
+        Case('list_users', 'get', fixed(reverse('list_users')), 200),
+        Case('chatrooms_list GET', 'get', fixed(reverse('chatrooms_list')), 200),
+        Case('chatrooms_list POST', 'post', new_room, 201),
+        Case('inbox', 'get', fixed(reverse('inbox')), 200),
+        Case('personal_chatroom', 'post', personal_room, 200),
+        Case('chatrooms_detail GET', 'get', fixed(detail), 200),
+        Case('chatrooms_detail PUT', 'put', fixed(detail, {'name': 'Busy room', 'type': ChatRoom.GROUP}), 200),
+        Case('chatrooms_detail DELETE', 'delete', disposable_room, 204),
+        Case('chatroom_members', 'get', fixed(reverse('chatroom_members', args=[chatroom.id])), 200),
+        Case('chatroom_export', 'get', fixed(reverse('chatroom_export', args=[chatroom.id])), 200),
+        Case('chatroom_read', 'post', fixed(reverse('chatroom_read', args=[chatroom.id]), {'message_id': newest.id}), 200),
+        Case('chatroom_messages GET', 'get', fixed(messages), 200),
+        Case('chatroom_messages POST', 'post', fixed(messages, {'content': 'benchmark message'}), 201),
+        Case('create_messages_batch', 'post', fixed(reverse('create_messages_batch'), {
+            'messages': [{'chatroom': chatroom.id, 'content': f'batch {i}'} for i in range(100)]
+        }), 201),
+        Case('search_messages', 'get', fixed(reverse('search_messages'), {'q': 'deploy'}), 200),
+        Case('message_detail PUT', 'put', own_message, 200),
+        Case('message_detail DELETE', 'delete', own_message, 204),
+        Case('async_chatroom_messages GET', 'get', fixed(async_messages), 200),
+        Case('async_chatroom_messages POST', 'post', fixed(async_messages, {'content': 'benchmark message'}), 201),
+        # Answers at once: there is a message after the cursor
+        Case('async_poll_messages', 'get', fixed(
+            reverse('async_poll_messages', args=[chatroom.id]), {'after_id': newest.id - 1, 'timeout': 0, 'limit': 1}
+        ), 200),
+        # Staff only; the benchmark user is not staff
+        Case('cache_stats', 'get', fixed(reverse('cache_stats')), 403),
+    ]
+
+
+def check_coverage(cases):
+    """
+    Fail loudly when a view is added to chatapp/urls.py without a case here.
+    """
+    from chatapp.urls import urlpatterns
+
+    covered = {case.name.split(' ')[0] for case in cases}
+    missing = {pattern.name for pattern in urlpatterns} - covered
+    if missing:
+        raise SystemExit(f'No benchmark case for: {", ".join(sorted(missing))}')
+
+
+def run_case(client, case, repeat):
+    from chatapp.tokens import flush_outstanding_tokens
+
+    timings = []
+    for _ in range(repeat + 1):
+        path, data = case.prepare()
+        # Tokens issued by earlier requests would otherwise be written
+        # whenever their flush interval happens to run out
+        flush_outstanding_tokens()
+        request = getattr(client, case.method)
+        with measure() as result:
+            if case.method == 'get':
+                response = request(path, data)
+            else:
+                response = request(path, data, format='json')
+            # Streamed bodies are produced while they are read
+            body = b''.join(response.streaming_content) if response.streaming else response.content
+        if response.status_code != case.expected_status:
+            raise SystemExit(f'{case.name}: expected {case.expected_status}, got {response.status_code}')
+        timings.append(result['seconds'] * 1000)
+    # The first request warms caches and is not counted
+    return {
+        'ms': round(statistics.median(timings[1:]), 3),
+        'queries': result['queries'],
+        'bytes': len(body),
+    }
+
+
+def run_scale(message_count, repeat):
+    from rest_framework.test import APIClient
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    owner, chatroom = seed(message_count)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(owner).access_token}')
+
+    cases = build_cases(owner, chatroom)
+    check_coverage(cases)
+    return {case.name: run_case(client, case, repeat) for case in cases}
+
+
+def compare(scale, results, baseline, time_tolerance, size_tolerance):
+    regressions = []
+    rows = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        verdict = 'new'
+        if expected is not None:
+            problems = []
+            if result['queries'] > expected['queries']:
+                problems.append(f"queries {expected['queries']} -> {result['queries']}")
+            if result['bytes'] > expected['bytes'] * (1 + size_tolerance):
+                problems.append(f"bytes {expected['bytes']} -> {result['bytes']}")
+            if result['ms'] > expected['ms'] * (1 + time_tolerance) + TIME_SLACK_MS:
+                problems.append(f"ms {expected['ms']} -> {result['ms']}")
+            verdict = 'REGRESSION' if problems else 'ok'
+            regressions += [f'[{scale}] {name}: {problem}' for problem in problems]
+        rows.append([name, f"{result['ms']:.2f}", result['queries'], result['bytes'], verdict])
+
+    print(f'\nScale {scale} messages')
+    print_table(['endpoint', 'median ms', 'queries', 'bytes', 'vs baseline'], rows)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--scales', nargs='+', choices=SCALES, default=['10', '1k'])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--time-tolerance', type=float, default=0.5)
+    parser.add_argument('--size-tolerance', type=float, default=0.1)
+    parser.add_argument('--update-baseline', action='store_true')
+    args = parser.parse_args(argv)
+
+    setup_django()
+    baseline = json.loads(BASELINE_PATH.read_text()) if BASELINE_PATH.exists() else {}
+
+    regressions = []
+    for scale in args.scales:
+        with test_database():
+            results = run_scale(SCALES[scale], args.repeat)
+        regressions += compare(scale, results, baseline.get(scale, {}), args.time_tolerance, args.size_tolerance)
+        baseline[scale] = results if args.update_baseline else baseline.get(scale, {})
+
+    if args.update_baseline:
+        BASELINE_PATH.write_text(json.dumps(baseline, indent=2, sort_keys=True) + '\n')
+        print(f'\nBaseline written to {BASELINE_PATH}')
+        return 0
+
+    if regressions:
+        print('\nRegressions:')
+        for regression in regressions:
+            print(f'  {regression}')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
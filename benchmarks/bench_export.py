@@ -0,0 +1,106 @@
+"""
+Export a chatroom of a million messages as NDJSON, plain and gzipped.
+
+Reports the time to stream the whole export, its size and the peak
+Python memory traced while streaming, next to the same numbers for a
+room a hundred times smaller. Peak memory should not grow with the room.
+Each export is streamed both the way a WSGI server reads it and the way
+Django's ASGI handler does. Every export runs twice: once timed, once under tracemalloc, which is
+too slow to time.
+
+Usage::
+
+    python -m benchmarks.bench_export
+    python -m benchmarks.bench_export --messages 200000
+"""
+
+import argparse
+import itertools
+import time
+import tracemalloc
+
+from .common import authenticated_client, make_users, print_table, setup_django, test_database
+
+
+def seed(name, user, count):
+    from chatapp.models import ChatMembership, ChatRoom, Message
+
+    chatroom = ChatRoom.objects.create(name=name, type=ChatRoom.GROUP)
+    ChatMembership.objects.create(user=user, chatroom=chatroom)
+    for start in range(0, count, 50_000):
+        Message.objects.bulk_create([
+            Message(user=user, chatroom=chatroom, content=f'compliance export line {i}')
+            for i in range(start, min(start + 50_000, count))
+        ])
+    return chatroom
+
+
+def export(client, chatroom, compress, asgi_headers=None):
+    """
+    Stream one export through the test client, or through the ASGI path
+    when ``asgi_headers`` are given. Returns its size in bytes.
+    """
+    from asgiref.sync import async_to_sync
+    from django.test import AsyncClient
+    from django.urls import reverse
+
+    url = reverse('chatroom_export', args=[chatroom.id])
+    params = {'compress': 'gzip'} if compress else {}
+    if asgi_headers is None:
+        response = client.get(url, params)
+        return sum(len(block) for block in response.streaming_content)
+
+    async def stream():
+        response = await AsyncClient().get(url, params, headers=asgi_headers)
+        # Like ASGIHandler.send_response
+        size = 0
+        async for block in response:
+            size += len(block)
+        return size
+
+    return async_to_sync(stream)()
+
+
+def peak_memory(client, chatroom, compress, asgi_headers=None):
+    tracemalloc.start()
+    try:
+        export(client, chatroom, compress, asgi_headers)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--messages', type=int, default=1_000_000)
+    args = parser.parse_args(argv)
+
+    setup_django()
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    rows = []
+    with test_database():
+        (user,) = make_users(1)
+        client = authenticated_client(user)
+        headers = {'Authorization': f'Bearer {AccessToken.for_user(user)}'}
+        for count in (args.messages // 100, args.messages):
+            chatroom = seed(f'Room {count}', user, count)
+            for asgi, compress in itertools.product((False, True), (False, True)):
+                start = time.perf_counter()
+                size = export(client, chatroom, compress, headers if asgi else None)
+                seconds = time.perf_counter() - start
+                peak = peak_memory(client, chatroom, compress, headers if asgi else None)
+                rows.append([
+                    count,
+                    'asgi' if asgi else 'wsgi',
+                    'gzip' if compress else 'none',
+                    f'{seconds:.1f}',
+                    f'{size / 1024 / 1024:.1f}',
+                    f'{peak / 1024 / 1024:.2f}',
+                ])
+
+    print_table(['messages', 'server', 'compression', 'seconds', 'MiB sent', 'peak MiB'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Render and parse chatroom detail payloads with DRF's stdlib JSON classes
+and with the orjson-backed ones from ``chatapp.renderers`` and
+``chatapp.parsers``.
+
+The payload is a ChatRoomDetailSerializer response for a full room: the
+first page of members and the latest messages, each ``--content-length``
+characters long. Rendering and parsing run ``--iterations`` times per
+variant, and the rendered bytes are checked to match. Reported per
+variant and direction: microseconds per payload and the speedup over
+the stdlib.
+
+Usage::
+
+    python -m benchmarks.bench_json
+    python -m benchmarks.bench_json --content-length 4000 --iterations 2000
+"""
+
+import argparse
+import io
+import time
+
+from .common import make_users, print_table, setup_django, test_database
+
+
+def seed(content_length):
+    from chatapp.models import ChatMembership, ChatRoom, Message
+    from chatapp.pagination import DETAIL_MEMBER_LIMIT, DETAIL_MESSAGE_LIMIT
+
+    users = make_users(DETAIL_MEMBER_LIMIT + 1)
+    chatroom = ChatRoom.objects.create(name='Busy room', type=ChatRoom.GROUP)
+    ChatMembership.objects.bulk_create([ChatMembership(user=user, chatroom=chatroom) for user in users])
+    # Mostly ASCII with some accented and non-Latin text, like real chat
+    line = 'Déployé le correctif — 修正をデプロイしました, see the release notes. '
+    content = (line * (content_length // len(line) + 1))[:content_length]
+    Message.objects.bulk_create([
+        Message(user=users[i % len(users)], chatroom=chatroom, content=content)
+        for i in range(DETAIL_MESSAGE_LIMIT)
+    ])
+    return chatroom
+
+
+def per_call(function, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        function()
+    return (time.perf_counter() - start) / iterations * 1_000_000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--content-length', type=int, default=2000)
+    parser.add_argument('--iterations', type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    setup_django()
+    from rest_framework.parsers import JSONParser
+    from rest_framework.renderers import JSONRenderer
+    from chatapp.parsers import FastJSONParser
+    from chatapp.renderers import FastJSONRenderer, orjson
+    from chatapp.serializers import ChatRoomDetailSerializer
+
+    with test_database():
+        chatroom = seed(args.content_length)
+        payload = ChatRoomDetailSerializer(chatroom).data
+
+    variants = {
+        'stdlib': (JSONRenderer(), JSONParser()),
+        'orjson' if orjson else 'fast (orjson missing)': (FastJSONRenderer(), FastJSONParser()),
+    }
+    body = JSONRenderer().render(payload)
+    rows = []
+    baseline = {}
+    for name, (renderer, json_parser) in variants.items():
+        if renderer.render(payload) != body:
+            raise SystemExit(f'{name} renders different bytes than the stdlib renderer')
+        timings = {
+            'render': per_call(lambda: renderer.render(payload), args.iterations),
+            'parse': per_call(lambda: json_parser.parse(io.BytesIO(body)), args.iterations),
+        }
+        for direction, micros in timings.items():
+            baseline.setdefault(direction, micros)
+            rows.append([name, direction, f'{micros:.0f}', f'{baseline[direction] / micros:.1f}x'])
+
+    print(f'{len(body) / 1024:.0f} KiB payload, {args.iterations} iterations')
+    print_table(['variant', 'direction', 'µs per payload', 'speedup'], rows)
+
+
+if __name__ == '__main__':
+    main()
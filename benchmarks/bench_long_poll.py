@@ -0,0 +1,90 @@
+"""
+Idle long-poll waiters on one chatroom, then a single new message.
+
+``--waiters`` clients long-poll the room through the ASGI handler
+in-process. Once all of them are parked, the benchmark idles for
+``--idle`` seconds and reports the CPU time spent meanwhile, which
+should be close to zero: parked waiters run no queries. Then one message
+is posted, and it reports how long until every waiter has answered with
+it.
+
+Usage::
+
+    python -m benchmarks.bench_long_poll
+    python -m benchmarks.bench_long_poll --waiters 5000 --idle 5
+"""
+
+import argparse
+import asyncio
+import time
+
+from .common import make_users, print_table, setup_django, test_database
+
+
+def seed():
+    from rest_framework_simplejwt.tokens import AccessToken
+    from chatapp.models import ChatMembership, ChatRoom, Message
+
+    (user,) = make_users(1)
+    chatroom = ChatRoom.objects.create(name='Quiet room', type=ChatRoom.GROUP)
+    ChatMembership.objects.create(user=user, chatroom=chatroom)
+    seen = Message.objects.create(user=user, chatroom=chatroom, content='seen')
+    return user, chatroom, seen, str(AccessToken.for_user(user))
+
+
+async def scenario(waiters, idle, user, chatroom, seen, token):
+    from asgiref.sync import sync_to_async
+    from django.test import AsyncClient
+    from django.urls import reverse
+    from chatapp import notifier
+    from chatapp.models import Message
+
+    url = reverse('async_poll_messages', args=[chatroom.id])
+    headers = {'Authorization': f'Bearer {token}'}
+    client = AsyncClient()
+    polls = [
+        asyncio.create_task(client.get(url, {'after_id': seen.id, 'timeout': 60}, headers=headers))
+        for _ in range(waiters)
+    ]
+
+    start = time.perf_counter()
+    while notifier.subscriber_count(chatroom.id) < waiters:
+        await asyncio.sleep(0.05)
+    parked = time.perf_counter() - start
+
+    cpu = time.process_time()
+    await asyncio.sleep(idle)
+    idle_cpu = time.process_time() - cpu
+
+    start = time.perf_counter()
+    await sync_to_async(Message.objects.create)(user=user, chatroom=chatroom, content='wake up')
+    responses = await asyncio.gather(*polls)
+    woken = time.perf_counter() - start
+
+    delivered = sum(len(response.json()['messages']) == 1 for response in responses)
+    return parked, idle_cpu, woken, delivered
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--waiters', type=int, default=1000)
+    parser.add_argument('--idle', type=float, default=3)
+    args = parser.parse_args(argv)
+
+    setup_django()
+    with test_database():
+        user, chatroom, seen, token = seed()
+        parked, idle_cpu, woken, delivered = asyncio.run(
+            scenario(args.waiters, args.idle, user, chatroom, seen, token)
+        )
+
+    print(f'{args.waiters} waiters, {args.idle:g}s idle')
+    print_table(['phase', 'seconds', 'notes'], [
+        ['park all waiters', f'{parked:.2f}', ''],
+        ['idle', f'{args.idle:.2f}', f'{idle_cpu * 1000:.0f} ms CPU'],
+        ['deliver one message', f'{woken:.2f}', f'{delivered}/{args.waiters} waiters got it'],
+    ])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""
+Create chatrooms of 10, 1k and 10k members and resize them.
+
+Resizing swaps out half of the members, so each PUT both adds and removes
+``size / 2`` users.
+"""
+
+from .common import (
+    authenticated_client, make_users, measure, print_table, setup_django, test_database
+)
+
+SIZES = [10, 1_000, 10_000]
+
+
+def run():
+    from django.urls import reverse
+    from chatapp.models import ChatRoom
+
+    users = make_users(max(SIZES) * 3 // 2)
+    owner = users[0]
+    client = authenticated_client(owner)
+
+    rows = []
+    for size in SIZES:
+        member_ids = [user.id for user in users[1:size]]
+        with measure() as created:
+            response = client.post(
+                reverse('chatrooms_list'),
+                {'name': f'Room {size}', 'type': ChatRoom.GROUP, 'member_ids': member_ids},
+                format='json'
+            )
+        assert response.status_code == 201, response.data
+
+        kept = member_ids[:len(member_ids) // 2]
+        swapped_in = [user.id for user in users[size:size + len(member_ids) - len(kept)]]
+        with measure() as resized:
+            response = client.put(
+                reverse('chatrooms_detail', args=[response.data['id']]),
+                {'name': f'Room {size}', 'type': ChatRoom.GROUP,
+                 'member_ids': [owner.id, *kept, *swapped_in]},
+                format='json'
+            )
+        assert response.status_code == 200, response.data
+
+        rows.append([
+            size,
+            f"{created['seconds'] * 1000:.1f}", created['queries'],
+            f"{resized['seconds'] * 1000:.1f}", resized['queries'],
+        ])
+
+    print_table(['members', 'create ms', 'create queries', 'resize ms', 'resize queries'], rows)
+
+
+if __name__ == '__main__':
+    setup_django()
+    with test_database():
+        run()
@@ -0,0 +1,73 @@
+"""
+Deleting a chatroom with a long history: cascade delete vs tombstone.
+
+For each ``--messages`` size, one room is deleted through the ORM
+collector, as delete_chatroom used to do, and an identical room is
+tombstoned and then purged in batches. The tombstone is what the request
+waits for; the purge runs in the background worker.
+
+Usage::
+
+    python -m benchmarks.bench_purge
+    python -m benchmarks.bench_purge --messages 50000 --batch-size 5000
+"""
+
+import argparse
+
+from .common import make_users, measure, print_table, setup_django, test_database
+
+
+def seed(user, messages):
+    from chatapp.activity import record_messages_created
+    from chatapp.models import ChatMembership, ChatRoom, Message
+
+    chatroom = ChatRoom.objects.create(name='Doomed', type=ChatRoom.GROUP)
+    ChatMembership.objects.create(user=user, chatroom=chatroom)
+    created = Message.objects.bulk_create(
+        [Message(user=user, chatroom=chatroom, content=f'message {i}') for i in range(messages)],
+        batch_size=5000
+    )
+    record_messages_created(chatroom.id, created)
+    return chatroom
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--messages', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--batch-size', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    setup_django()
+    rows = []
+    with test_database():
+        from chatapp import purge
+
+        batch_size = args.batch_size or purge.PURGE_BATCH_SIZE
+        (user,) = make_users(1)
+        for messages in args.messages:
+            chatroom = seed(user, messages)
+            with measure() as cascade:
+                chatroom.delete()
+
+            chatroom = seed(user, messages)
+            with measure() as tombstone:
+                purge.tombstone_chatroom(chatroom.id)
+            with measure() as purged:
+                purge.purge_chatroom(chatroom.id, batch_size)
+
+            rows.append([
+                messages,
+                f"{cascade['seconds'] * 1000:.1f}", cascade['queries'],
+                f"{tombstone['seconds'] * 1000:.1f}", tombstone['queries'],
+                f"{purged['seconds'] * 1000:.1f}", purged['queries'],
+            ])
+
+    print(f'purge batch size {batch_size}')
+    print_table(
+        ['messages', 'cascade ms', 'queries', 'tombstone ms', 'queries', 'purge ms', 'queries'],
+        rows
+    )
+
+
+if __name__ == '__main__':
+    main()
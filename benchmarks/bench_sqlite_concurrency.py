@@ -0,0 +1,137 @@
+"""
+Concurrent writers and readers against SQLite, with and without the
+connection pragmas from ``chatapp.sqlite``, WAL included.
+
+Writer threads post messages to a shared chatroom through the
+chatroom_messages endpoint while reader threads page through its
+history. Each profile runs on its own fresh database file, because WAL
+mode sticks to the file once enabled. Reported per profile: requests per second for
+each side and the share of requests that failed, most of them with
+"database is locked".
+
+Usage::
+
+    python -m benchmarks.bench_sqlite_concurrency
+    python -m benchmarks.bench_sqlite_concurrency --writers 8 --readers 8 --seconds 10
+"""
+
+import argparse
+import threading
+import time
+from collections import Counter
+
+from .common import authenticated_client, make_users, print_table, setup_django, test_database
+
+# Profile name -> whether chatapp.sqlite applies its pragmas, WAL
+# included. 'plain' is Django's stock sqlite3 configuration.
+PROFILES = {
+    'plain': False,
+    'tuned': True,
+}
+
+
+def seed(writers, readers):
+    from chatapp.models import ChatMembership, ChatRoom, Message
+
+    users = make_users(writers + readers)
+    chatroom = ChatRoom.objects.create(name='Busy room', type=ChatRoom.GROUP)
+    ChatMembership.objects.bulk_create([ChatMembership(user=user, chatroom=chatroom) for user in users])
+    Message.objects.bulk_create([
+        Message(user=users[0], chatroom=chatroom, content=f'history {i}') for i in range(1000)
+    ])
+    return users, chatroom
+
+
+def worker(user, chatroom, writer, deadline, results):
+    from django.db import connection
+    from django.urls import reverse
+
+    client = authenticated_client(user)
+    url = reverse('chatroom_messages', args=[chatroom.id])
+    counts = Counter()
+    try:
+        while time.perf_counter() < deadline:
+            try:
+                if writer:
+                    response = client.post(url, {'content': 'concurrent message'}, format='json')
+                    ok = response.status_code == 201
+                else:
+                    response = client.get(url)
+                    ok = response.status_code == 200
+            except Exception as e:  # noqa: BLE001 - every failure counts as an error
+                ok = False
+                counts['locked' if 'locked' in str(e) else 'other'] += 1
+            counts['ok' if ok else 'failed'] += 1
+    finally:
+        connection.close()
+    results.append((writer, counts))
+
+
+def run_profile(tuned, writers, readers, seconds):
+    from django.test import override_settings
+    from chatapp.sqlite import DEFAULT_PRAGMAS
+
+    pragmas = {} if tuned else {name: None for name in DEFAULT_PRAGMAS}
+    with override_settings(SQLITE_WAL=tuned, SQLITE_PRAGMAS=pragmas), test_database():
+        from django.db import connection
+
+        users, chatroom = seed(writers, readers)
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            journal_mode = cursor.fetchone()[0]
+        # The threads open their own connections
+        connection.close()
+
+        results = []
+        deadline = time.perf_counter() + seconds
+        threads = [
+            threading.Thread(target=worker, args=(users[i], chatroom, i < writers, deadline, results))
+            for i in range(writers + readers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    summary = {}
+    for side, is_writer in (('write', True), ('read', False)):
+        counts = sum((c for w, c in results if w == is_writer), Counter())
+        total = counts['ok'] + counts['failed']
+        summary[side] = {
+            'per_second': counts['ok'] / seconds,
+            'error_rate': counts['failed'] / total if total else 0.0,
+            'locked': counts['locked'],
+        }
+    return journal_mode, summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args(argv)
+
+    setup_django()
+    rows = []
+    for name, tuned in PROFILES.items():
+        journal_mode, summary = run_profile(tuned, args.writers, args.readers, args.seconds)
+        rows.append([
+            name,
+            journal_mode,
+            f"{summary['write']['per_second']:.0f}",
+            f"{summary['write']['error_rate']:.1%}",
+            f"{summary['read']['per_second']:.0f}",
+            f"{summary['read']['error_rate']:.1%}",
+            summary['write']['locked'] + summary['read']['locked'],
+        ])
+
+    print(f'{args.writers} writers, {args.readers} readers, {args.seconds:g}s per profile')
+    print_table(
+        ['profile', 'journal', 'writes/s', 'write errors', 'reads/s', 'read errors', 'locked'],
+        rows
+    )
+
+
+if __name__ == '__main__':
+    main()
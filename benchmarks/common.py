@@ -0,0 +1,97 @@
+"""
+Shared helpers for the benchmark scripts.
+
+Benchmarks run against a throwaway test database, never ``db.sqlite3``.
+Run them from the repository root, e.g. ``python -m benchmarks.bench_membership``.
+"""
+
+import contextlib
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+def setup_django():
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ChatApplication.settings')
+
+    import django
+    django.setup()
+
+
+@contextlib.contextmanager
+def test_database():
+    """
+    Create a fresh test database for the duration of the block.
+
+    The database lives in a temporary file rather than in memory, so every
+    block starts empty and disk I/O is part of what gets measured.
+    """
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    with tempfile.TemporaryDirectory() as directory:
+        connection.settings_dict['TEST']['NAME'] = os.path.join(directory, 'benchmark.sqlite3')
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0)
+        try:
+            yield
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+
+@contextlib.contextmanager
+def measure():
+    """
+    Time a block and count the queries it runs.
+
+    Yields a dict that is filled with ``seconds`` and ``queries`` when the
+    block exits.
+    """
+    from django.db import connection
+
+    result = {'queries': 0}
+
+    def count_query(execute, sql, params, many, context):
+        result['queries'] += 1
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(count_query):
+        start = time.perf_counter()
+        yield result
+        result['seconds'] = time.perf_counter() - start
+
+
+def make_users(count, prefix='bench'):
+    """
+    Bulk insert users sharing one precomputed password hash.
+    """
+    from django.contrib.auth.hashers import make_password
+    from django.contrib.auth.models import User
+
+    password = make_password('benchmark')
+    return User.objects.bulk_create([
+        User(username=f'{prefix}{i}', email=f'{prefix}{i}@example.com', password=password)
+        for i in range(count)
+    ], batch_size=2000)
+
+
+def authenticated_client(user):
+    from rest_framework.test import APIClient
+
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+def print_table(headers, rows):
+    widths = [
+        max(len(str(value)) for value in [header, *(row[i] for row in rows)])
+        for i, header in enumerate(headers)
+    ]
+    print('  '.join(str(h).ljust(w) for h, w in zip(headers, widths)))
+    for row in rows:
+        print('  '.join(str(v).ljust(w) for v, w in zip(row, widths)))
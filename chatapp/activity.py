@@ -0,0 +1,111 @@
+from collections import Counter
+from functools import partial
+
+from django.db import transaction
+from django.db.models import BigIntegerField, Case, Count, F, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce, Greatest
+from . import notifier
+from .models import ChatMembership, ChatRoom, Message
+
+
+def record_messages_created(chatroom_id, messages):
+    """
+    Fold newly created messages of one chatroom into its activity summary
+    and its members' unread counts, with one UPDATE each. Safe against
+    concurrent writers: an older message committed late never replaces a
+    newer last_message. Wakes long-poll waiters on the room after commit.
+    """
+    if not messages:
+        return
+    newest = max(messages, key=lambda message: (message.timestamp, message.id))
+    ChatRoom.objects.filter(id=chatroom_id).update(
+        version=F('version') + 1,
+        message_count=F('message_count') + len(messages),
+        last_message_id=Case(
+            When(last_activity_at__lte=newest.timestamp, then=Value(newest.id)),
+            default=F('last_message_id'),
+            output_field=BigIntegerField()
+        ),
+        last_activity_at=Greatest(F('last_activity_at'), Value(newest.timestamp)),
+    )
+
+    # Authors do not get unread counts for their own messages
+    own_messages = Case(
+        *[
+            When(user_id=user_id, then=Value(count))
+            for user_id, count in Counter(message.user_id for message in messages).items()
+        ],
+        default=Value(0)
+    )
+    ChatMembership.objects.filter(chatroom_id=chatroom_id).update(
+        unread_count=F('unread_count') + len(messages) - own_messages
+    )
+    # Long-poll waiters re-read the room, so only wake them once the
+    # messages are visible
+    transaction.on_commit(partial(notifier.notify, chatroom_id))
+
+
+def record_message_created(message):
+    record_messages_created(message.chatroom_id, [message])
+
+
+def record_message_deleted(message):
+    """
+    Take a deleted message out of its chatroom's activity summary and the
+    unread counts of members who had not read it yet. When it was the last
+    message or someone's read cursor, the next older message takes its
+    place; only a live one can become the last message.
+    """
+    latest = Message.objects.filter(chatroom_id=message.chatroom_id).order_by('-timestamp', '-id')
+    ChatRoom.objects.filter(id=message.chatroom_id).update(
+        version=F('version') + 1,
+        message_count=Greatest(F('message_count') - 1, Value(0)),
+        last_message_id=Case(
+            When(last_message_id=message.id, then=Subquery(latest.live().values('id')[:1])),
+            default=F('last_message_id'),
+            output_field=BigIntegerField()
+        ),
+    )
+
+    ChatMembership.objects.filter(
+        Q(last_read_message_id__isnull=True) | Q(last_read_message_id__lt=message.id),
+        chatroom_id=message.chatroom_id,
+        unread_count__gt=0,
+    ).exclude(user_id=message.user_id).update(unread_count=F('unread_count') - 1)
+
+    ChatMembership.objects.filter(
+        chatroom_id=message.chatroom_id,
+        last_read_message_id=message.id,
+    ).update(
+        last_read_message_id=Subquery(latest.filter(id__lt=message.id).values('id')[:1])
+    )
+
+
+def mark_read(membership, message):
+    """
+    Advance a member's read cursor to ``message`` and recount what is left
+    unread after it in the same UPDATE. Cursors never move backwards.
+    Returns the number of rows updated (0 when the cursor was already past
+    ``message``).
+    """
+    unread_after = (
+        Message.objects
+        .filter(chatroom_id=membership.chatroom_id)
+        .filter(
+            Q(timestamp__gt=message.timestamp) |
+            Q(timestamp=message.timestamp, id__gt=message.id),
+            # Redundant, but lets SQLite seek instead of scanning the room
+            timestamp__gte=message.timestamp,
+        )
+        .exclude(user_id=membership.user_id)
+        .values('chatroom_id')
+        .annotate(count=Count('id'))
+        .values('count')
+    )
+    return ChatMembership.objects.filter(
+        Q(last_read_message_id__isnull=True) | Q(last_read_message_id__lt=message.id),
+        id=membership.id,
+    ).update(
+        last_read_message_id=message.id,
+        unread_count=Coalesce(Subquery(unread_after), 0),
+    )
@@ -0,0 +1,113 @@
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+
+USER_CACHE_TIMEOUT = 60 * 5
+
+# Everything the API reads from request.user. Other fields (password,
+# last_login, date_joined) are left deferred and load on first access.
+CACHED_USER_FIELDS = (
+    'id', 'username', 'email', 'first_name', 'last_name', 'is_active', 'is_staff', 'is_superuser'
+)
+
+
+def _user_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def invalidate_user(user_id):
+    cache.delete(_user_key(user_id))
+
+
+def _cached_field_names(User):
+    # from_db() expects partial values in model field order
+    return [field.attname for field in User._meta.concrete_fields if field.attname in CACHED_USER_FIELDS]
+
+
+def get_cached_user(user_id):
+    """
+    The user with primary key ``user_id``, or ``None`` if there is none.
+
+    The fields in CACHED_USER_FIELDS are kept in the cache, so a hit costs
+    no query. The returned instance has its remaining fields deferred:
+    reading one loads it, and save() only writes the loaded fields, so a
+    cached user is safe to update.
+    """
+    User = get_user_model()
+    field_names = _cached_field_names(User)
+    key = _user_key(user_id)
+    values = cache.get(key)
+    if values is None:
+        values = User.objects.filter(pk=user_id).values_list(*field_names).first()
+        if values is None:
+            return None
+        cache.set(key, values, USER_CACHE_TIMEOUT)
+    return User.from_db('default', field_names, values)
+
+
+async def aget_cached_user(user_id):
+    """
+    Async variant of get_cached_user.
+    """
+    User = get_user_model()
+    field_names = _cached_field_names(User)
+    key = _user_key(user_id)
+    values = await cache.aget(key)
+    if values is None:
+        values = await User.objects.filter(pk=user_id).values_list(*field_names).afirst()
+        if values is None:
+            return None
+        await cache.aset(key, values, USER_CACHE_TIMEOUT)
+    return User.from_db('default', field_names, values)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that resolves the token's user through
+    get_cached_user instead of a SELECT on every request. Entries are
+    dropped whenever a user is saved or deleted (see chatapp.signals).
+    """
+
+    def get_user(self, validated_token):
+        # Revocation compares the password hash, which is not cached
+        if api_settings.CHECK_REVOKE_TOKEN:
+            return super().get_user(validated_token)
+        return self._check_user(get_cached_user(self._get_user_id(validated_token)))
+
+    async def aget_user(self, validated_token):
+        if api_settings.CHECK_REVOKE_TOKEN:
+            return await sync_to_async(super().get_user)(validated_token)
+        return self._check_user(await aget_cached_user(self._get_user_id(validated_token)))
+
+    async def aauthenticate(self, request):
+        """
+        Async variant of authenticate() for async views. Token validation
+        does no I/O; only the user lookup is awaited.
+        """
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    def _get_user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_('Token contained no recognizable user identification')) from e
+
+    def _check_user(self, user):
+        if user is None:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        return user
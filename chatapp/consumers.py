@@ -0,0 +1,55 @@
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from .models import ChatMembership
+from .realtime import chatroom_group_name, user_group_name
+
+
+class ChatConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Streams message events for every chatroom the authenticated user
+    belongs to. Messages are sent through the REST API; the socket is
+    receive-only.
+    """
+
+    async def connect(self):
+        user = self.scope.get('user')
+        if user is None or not user.is_authenticated:
+            await self.close(code=4401)
+            return
+
+        self.chatroom_groups = {
+            chatroom_group_name(chatroom_id)
+            for chatroom_id in await self.get_chatroom_ids(user)
+        }
+        self.user_group = user_group_name(user.id)
+        for group in [self.user_group, *self.chatroom_groups]:
+            await self.channel_layer.group_add(group, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        for group in [getattr(self, 'user_group', None), *getattr(self, 'chatroom_groups', ())]:
+            if group is not None:
+                await self.channel_layer.group_discard(group, self.channel_name)
+
+    async def chat_message(self, event):
+        await self.send_json({'type': event['event'], 'message': event['message']})
+
+    async def chat_membership(self, event):
+        group = chatroom_group_name(event['chatroom'])
+        if event['joined']:
+            self.chatroom_groups.add(group)
+            await self.channel_layer.group_add(group, self.channel_name)
+        else:
+            self.chatroom_groups.discard(group)
+            await self.channel_layer.group_discard(group, self.channel_name)
+        await self.send_json({
+            'type': 'chatroom.joined' if event['joined'] else 'chatroom.left',
+            'chatroom': event['chatroom'],
+        })
+
+    @database_sync_to_async
+    def get_chatroom_ids(self, user):
+        return list(
+            ChatMembership.objects.filter(user=user, chatroom__deleted_at__isnull=True)
+            .values_list('chatroom_id', flat=True)
+        )
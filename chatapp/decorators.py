@@ -0,0 +1,39 @@
+import functools
+
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+from rest_framework import exceptions
+from .authentication import CachedJWTAuthentication
+
+
+def async_api_view(methods):
+    """
+    The async counterpart of ``@api_view(methods)`` with
+    ``@permission_classes([IsAuthenticated])`` for plain Django async views.
+
+    The bearer token is checked natively in async, so the request never
+    crosses into a worker thread for authentication. Failures get the same
+    401 body and WWW-Authenticate header DRF would send. Like api_view the
+    view is exempt from CSRF checks, since it only accepts bearer tokens.
+    """
+    def decorator(view):
+        @csrf_exempt
+        @require_http_methods(methods)
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            authentication = CachedJWTAuthentication()
+            try:
+                result = await authentication.aauthenticate(request)
+                if result is None:
+                    raise exceptions.NotAuthenticated()
+            except exceptions.APIException as e:
+                detail = e.detail if isinstance(e.detail, dict) else {'detail': e.detail}
+                response = JsonResponse(detail, status=e.status_code)
+                response['WWW-Authenticate'] = authentication.authenticate_header(request)
+                return response
+
+            request.user, request.auth = result
+            return await view(request, *args, **kwargs)
+        return wrapper
+    return decorator
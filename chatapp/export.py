@@ -0,0 +1,78 @@
+import json
+import zlib
+
+from asgiref.sync import sync_to_async
+from rest_framework import serializers
+from .models import Message
+
+
+EXPORT_CHUNK_SIZE = 2000
+# Lines are joined into blocks of roughly this many bytes before they are
+# handed to the response, to keep per-yield overhead down
+EXPORT_BLOCK_SIZE = 64 * 1024
+
+
+def export_lines(chatroom_id, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yield a chatroom's history as NDJSON, oldest first, in blocks of
+    encoded lines. Each line has the fields of MessageSerializer.
+
+    Rows are read with a server-side iterator, so memory use depends on
+    ``chunk_size`` and not on the size of the room.
+    """
+    timestamp_field = serializers.DateTimeField()
+    rows = (
+        Message.objects.live().filter(chatroom_id=chatroom_id)
+        .order_by('timestamp', 'id')
+        .values_list('id', 'user_id', 'chatroom_id', 'content', 'timestamp')
+        .iterator(chunk_size=chunk_size)
+    )
+
+    block = []
+    block_size = 0
+    for message_id, user_id, message_chatroom_id, content, timestamp in rows:
+        line = json.dumps({
+            'id': message_id,
+            'user': user_id,
+            'chatroom': message_chatroom_id,
+            'content': content,
+            'timestamp': timestamp_field.to_representation(timestamp),
+        }, ensure_ascii=False).encode() + b'\n'
+        block.append(line)
+        block_size += len(line)
+        if block_size >= EXPORT_BLOCK_SIZE:
+            yield b''.join(block)
+            block = []
+            block_size = 0
+    if block:
+        yield b''.join(block)
+
+
+def gzip_stream(blocks):
+    """
+    Compress a stream of byte blocks into a single gzip member on the fly.
+    """
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for block in blocks:
+        compressed = compressor.compress(block)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+async def aiter_blocks(blocks):
+    """
+    Serve a synchronous stream of blocks as an async iterator, for ASGI.
+
+    Django's ASGI handler reads a synchronous StreamingHttpResponse into a
+    list before sending anything. Here each block is pulled through
+    sync_to_async instead, so only one is held at a time. Every pull runs
+    on the same thread, the one owning the stream's database connection.
+    """
+    iterator = iter(blocks)
+    done = object()
+    while True:
+        block = await sync_to_async(next)(iterator, done)
+        if block is done:
+            return
+        yield block
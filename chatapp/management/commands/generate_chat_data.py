@@ -0,0 +1,237 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from chatapp.models import ChatMembership, ChatRoom, Message
+from chatapp.personal import personal_key
+
+
+@contextmanager
+def explicit_timestamps():
+    """
+    Let bulk_create keep the timestamps set on each Message instead of
+    stamping every row with the current time.
+    """
+    field = Message._meta.get_field('timestamp')
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate synthetic users, chatrooms, memberships and messages for '
+        'benchmarks and load tests. Room sizes and room activity follow a Zipf '
+        'distribution and message timestamps arrive in bursts.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--rooms', type=int, default=100)
+        parser.add_argument('--messages', type=int, default=100_000)
+        parser.add_argument(
+            '--max-room-size', type=int, default=None,
+            help='Members in the largest room. Defaults to all users.'
+        )
+        parser.add_argument(
+            '--zipf', type=float, default=1.1,
+            help='Zipf exponent for room sizes and activity; 0 makes rooms uniform.'
+        )
+        parser.add_argument(
+            '--personal-fraction', type=float, default=0.3,
+            help='Share of rooms that are two-person personal chats.'
+        )
+        parser.add_argument(
+            '--burstiness', type=float, default=0.9,
+            help='Share of messages sent in quick bursts rather than after a lull.'
+        )
+        parser.add_argument('--days', type=float, default=30, help='Span of message timestamps.')
+        parser.add_argument('--chunk-size', type=int, default=50_000, help='Rows per transaction.')
+        parser.add_argument('--username-prefix', default='gen')
+        parser.add_argument('--password', default='password', help='Password shared by every user.')
+        parser.add_argument('--seed', type=int, default=None)
+
+    def handle(self, *args, **options):
+        for name in ('users', 'rooms', 'chunk_size'):
+            if options[name] < 1:
+                raise CommandError(f'--{name.replace("_", "-")} must be positive.')
+        if options['users'] < 2:
+            raise CommandError('--users must be at least 2.')
+        if not 0 <= options['personal_fraction'] <= 1 or not 0 <= options['burstiness'] <= 1:
+            raise CommandError('--personal-fraction and --burstiness must be between 0 and 1.')
+
+        self.random = random.Random(options['seed'])
+        self.chunk_size = options['chunk_size']
+        started = time.perf_counter()
+
+        user_ids = self.create_users(options['users'], options['username_prefix'], options['password'])
+        rooms = self.create_rooms(
+            user_ids,
+            options['rooms'],
+            options['max_room_size'] or len(user_ids),
+            options['zipf'],
+            options['personal_fraction'],
+        )
+        self.create_messages(rooms, options['messages'], options['zipf'], options['burstiness'], options['days'])
+        self.update_summaries([chatroom_id for chatroom_id, _ in rooms])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {len(user_ids)} users, {len(rooms)} rooms and '
+            f'{options["messages"]} messages in {time.perf_counter() - started:.1f}s'
+        ))
+
+    def chunks(self, items):
+        for start in range(0, len(items), self.chunk_size):
+            yield items[start:start + self.chunk_size]
+
+    def bulk_insert(self, model, objects):
+        created = []
+        for chunk in self.chunks(objects):
+            with transaction.atomic():
+                created += model.objects.bulk_create(chunk)
+        return created
+
+    def create_users(self, count, prefix, password):
+        # Hashing is deliberately slow, so every user shares one hash
+        password_hash = make_password(password)
+        users = self.bulk_insert(User, [
+            User(username=f'{prefix}{i}', email=f'{prefix}{i}@example.com', password=password_hash)
+            for i in range(count)
+        ])
+        self.stdout.write(f'Created {len(users)} users')
+        return [user.id for user in users]
+
+    def zipf_weights(self, count, exponent):
+        return [1 / (rank ** exponent) for rank in range(1, count + 1)]
+
+    def create_rooms(self, user_ids, count, max_room_size, exponent, personal_fraction):
+        """
+        Returns ``(chatroom_id, member_ids)`` pairs, largest group room first.
+        """
+        personal_count = round(count * personal_fraction)
+        group_count = count - personal_count
+        max_room_size = max(2, min(max_room_size, len(user_ids)))
+        if personal_count > len(user_ids) * (len(user_ids) - 1) // 2:
+            raise CommandError('Not enough users for that many distinct personal rooms.')
+
+        # Each pair of users has at most one personal room
+        pairs = set()
+        while len(pairs) < personal_count:
+            pairs.add(tuple(sorted(self.random.sample(user_ids, 2))))
+        pairs = sorted(pairs)
+        self.random.shuffle(pairs)
+
+        group_members = [
+            self.random.sample(user_ids, max(2, round(max_room_size * weight)))
+            for weight in self.zipf_weights(group_count, exponent)
+        ]
+        chatrooms = self.bulk_insert(ChatRoom, [
+            ChatRoom(name=f'Personal room {i}', type=ChatRoom.PERSONAL, personal_key=personal_key(*pair))
+            for i, pair in enumerate(pairs)
+        ] + [
+            ChatRoom(name=f'Group room {i}', type=ChatRoom.GROUP)
+            for i in range(personal_count, count)
+        ])
+
+        rooms = [
+            (chatroom.id, list(member_ids))
+            for chatroom, member_ids in zip(chatrooms, pairs + group_members)
+        ]
+        memberships = self.bulk_insert(ChatMembership, [
+            ChatMembership(user_id=user_id, chatroom_id=chatroom_id)
+            for chatroom_id, member_ids in rooms
+            for user_id in member_ids
+        ])
+        self.stdout.write(f'Created {len(rooms)} rooms with {len(memberships)} memberships')
+
+        # Busier rooms are the bigger ones
+        rooms.sort(key=lambda room: len(room[1]), reverse=True)
+        return rooms
+
+    def timestamps(self, count, burstiness, days):
+        """
+        Increasing timestamps ending around now: most gaps are a few seconds
+        (bursts), the rest are long lulls sized so the series spans ``days``.
+        """
+        burst_gap = 5.0
+        mean_gap = days * 86400 / max(count, 1)
+        lull_gap = mean_gap
+        if burstiness < 1:
+            lull_gap = max(burst_gap, (mean_gap - burstiness * burst_gap) / (1 - burstiness))
+
+        moment = timezone.now() - timedelta(days=days)
+        for _ in range(count):
+            gap = burst_gap if self.random.random() < burstiness else lull_gap
+            moment += timedelta(seconds=self.random.expovariate(1 / gap))
+            yield moment
+
+    def create_messages(self, rooms, count, exponent, burstiness, days):
+        if count < 1:
+            return
+        weights = self.zipf_weights(len(rooms), exponent)
+        words = [
+            'deploy', 'lunch', 'review', 'standup', 'release', 'coffee', 'incident',
+            'retro', 'ship', 'bug', 'meeting', 'design', 'docs', 'weekend', 'thanks',
+        ]
+        # A fixed pool of bodies keeps per-message work down to a lookup
+        contents = [
+            ' '.join(self.random.choices(words, k=self.random.randint(3, 12)))
+            for _ in range(1000)
+        ]
+        timestamps = self.timestamps(count, burstiness, days)
+
+        created = 0
+        started = time.perf_counter()
+        while created < count:
+            size = min(self.chunk_size, count - created)
+            picked = self.random.choices(rooms, weights=weights, k=size)
+            messages = [
+                Message(
+                    user_id=self.random.choice(member_ids),
+                    chatroom_id=chatroom_id,
+                    content=self.random.choice(contents),
+                    timestamp=next(timestamps),
+                )
+                for chatroom_id, member_ids in picked
+            ]
+            with transaction.atomic(), explicit_timestamps():
+                Message.objects.bulk_create(messages)
+            created += size
+            rate = created / (time.perf_counter() - started)
+            self.stdout.write(f'Created {created}/{count} messages ({rate:.0f}/s)')
+
+    def update_summaries(self, chatroom_ids):
+        """
+        bulk_create skips the signals that maintain each room's activity
+        summary, so fill it in afterwards for the rooms of this run. Those
+        start out read; rooms that were already there are left alone.
+        """
+        room_messages = Message.objects.filter(chatroom=OuterRef('pk'))
+        latest = room_messages.order_by('-timestamp', '-id')
+        for chunk in self.chunks(chatroom_ids):
+            with transaction.atomic():
+                ChatRoom.objects.filter(id__in=chunk).update(
+                    last_message=Subquery(latest.values('id')[:1]),
+                    last_activity_at=Coalesce(Subquery(latest.values('timestamp')[:1]), F('last_activity_at')),
+                    message_count=Coalesce(
+                        Subquery(room_messages.values('chatroom').annotate(count=Count('id')).values('count')),
+                        0
+                    ),
+                )
+                ChatMembership.objects.filter(chatroom_id__in=chunk).update(
+                    last_read_message=Subquery(
+                        ChatRoom.objects.filter(id=OuterRef('chatroom_id')).values('last_message_id')[:1]
+                    ),
+                    unread_count=0,
+                )
+        self.stdout.write('Updated room activity summaries')
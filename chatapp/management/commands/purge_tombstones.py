@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from chatapp import purge
+
+
+class Command(BaseCommand):
+    help = 'Remove deleted chatrooms and users, and everything that depends on them, in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=purge.PURGE_BATCH_SIZE,
+            help='Number of rows deleted per transaction.'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=None,
+            help='Keep running as a background worker, looking for new tombstones every this many seconds.'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive.')
+        if options['interval'] is not None and options['interval'] <= 0:
+            raise CommandError('--interval must be positive.')
+
+        while True:
+            chatrooms, users, messages = purge.purge_tombstones(options['batch_size'])
+            if chatrooms or users or options['interval'] is None:
+                self.stdout.write(self.style.SUCCESS(
+                    f'Purged {chatrooms} chatrooms and {users} users with {messages} messages'
+                ))
+            if options['interval'] is None:
+                return
+            time.sleep(options['interval'])
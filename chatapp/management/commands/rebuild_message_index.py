@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from chatapp import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text message search index from existing messages, in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Number of messages indexed per transaction.'
+        )
+
+    def handle(self, *args, **options):
+        if not search.is_supported():
+            raise CommandError('Message search requires SQLite with FTS5.')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive.')
+
+        indexed = search.rebuild_index(
+            options['batch_size'],
+            progress=lambda count: self.stdout.write(f'Indexed {count} messages')
+        )
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt search index for {indexed} messages'))
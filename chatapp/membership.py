@@ -0,0 +1,125 @@
+import time
+from functools import partial
+
+from django.core.cache import cache
+from django.db import transaction
+from . import versions
+from .models import ChatMembership
+
+
+MEMBERSHIP_CACHE_TIMEOUT = 60 * 5
+
+
+def _version_key(chatroom_id):
+    return f'membership:version:{chatroom_id}'
+
+
+def _member_key(chatroom_id, version, user_id):
+    return f'membership:member:{chatroom_id}:{version}:{user_id}'
+
+
+def get_version(chatroom_id):
+    """
+    Current membership version of a chatroom.
+
+    Versions are seeded from the clock so a version key that was evicted
+    never comes back with a number an older member set was cached under.
+    """
+    key = _version_key(chatroom_id)
+    version_cache = versions.version_cache()
+    version = version_cache.get(key)
+    if version is None:
+        version_cache.add(key, time.time_ns(), None)
+        version = version_cache.get(key)
+    return version
+
+
+async def aget_version(chatroom_id):
+    key = _version_key(chatroom_id)
+    version_cache = versions.version_cache()
+    version = await version_cache.aget(key)
+    if version is None:
+        await version_cache.aadd(key, time.time_ns(), None)
+        version = await version_cache.aget(key)
+    return version
+
+
+def _bump_version(chatroom_id):
+    key = _version_key(chatroom_id)
+    version_cache = versions.version_cache()
+    try:
+        version_cache.incr(key)
+    except ValueError:
+        version_cache.set(key, time.time_ns(), None)
+
+
+def invalidate(chatroom_id):
+    """
+    Drop every cached membership answer of a chatroom by moving it to a
+    new version. Call it from the transaction that changes the members.
+
+    The version moves right away and once more after commit: a reader on
+    another connection can see the first new version while it still reads
+    the old rows, and what it caches then must not outlive the commit.
+    """
+    _bump_version(chatroom_id)
+    transaction.on_commit(partial(_bump_version, chatroom_id))
+
+
+def is_member(chatroom_id, user_id):
+    """
+    Whether a user belongs to a chatroom.
+
+    Each answer, yes or no, is cached on its own key under the room's
+    membership version, so a lookup costs the same in any room size. A
+    miss costs one EXISTS query on ChatMembership.
+    """
+    key = _member_key(chatroom_id, get_version(chatroom_id), user_id)
+    member = cache.get(key)
+    if member is None:
+        member = ChatMembership.objects.filter(chatroom_id=chatroom_id, user_id=user_id).exists()
+        cache.set(key, member, MEMBERSHIP_CACHE_TIMEOUT)
+    return member
+
+
+async def ais_member(chatroom_id, user_id):
+    """
+    Async variant of is_member, sharing its cache entries.
+    """
+    key = _member_key(chatroom_id, await aget_version(chatroom_id), user_id)
+    member = await cache.aget(key)
+    if member is None:
+        member = await ChatMembership.objects.filter(chatroom_id=chatroom_id, user_id=user_id).aexists()
+        await cache.aset(key, member, MEMBERSHIP_CACHE_TIMEOUT)
+    return member
+
+
+def set_members(chatroom, member_ids):
+    """
+    Make ``member_ids`` the exact member set of a chatroom.
+
+    The difference with the current members is applied as one bulk insert
+    and one bulk delete; call this inside a transaction. Returns the sets
+    of added and removed user ids.
+    """
+    member_ids = set(member_ids)
+    current_ids = set(
+        ChatMembership.objects.filter(chatroom=chatroom).values_list('user_id', flat=True)
+    )
+    added = member_ids - current_ids
+    removed = current_ids - member_ids
+
+    if added:
+        ChatMembership.objects.bulk_create(
+            [ChatMembership(user_id=user_id, chatroom=chatroom) for user_id in added],
+            ignore_conflicts=True
+        )
+    if removed:
+        # Nothing cascades from ChatMembership, so skip the collector and
+        # its per-row signals and issue a single DELETE
+        removed_rows = ChatMembership.objects.filter(chatroom=chatroom, user_id__in=removed)
+        removed_rows._raw_delete(removed_rows.db)
+    if added or removed:
+        invalidate(chatroom.id)
+        versions.bump_chatroom_members(chatroom.id)
+    return added, removed
@@ -0,0 +1,47 @@
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from django.contrib.auth.models import AnonymousUser
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from .authentication import CachedJWTAuthentication
+
+
+@database_sync_to_async
+def get_user_for_token(raw_token):
+    if not raw_token:
+        return AnonymousUser()
+
+    authentication = CachedJWTAuthentication()
+    try:
+        validated_token = authentication.get_validated_token(raw_token)
+        return authentication.get_user(validated_token)
+    except (InvalidToken, TokenError, AuthenticationFailed):
+        return AnonymousUser()
+
+
+class JWTAuthMiddleware(BaseMiddleware):
+    """
+    Populate ``scope['user']`` from a simplejwt access token.
+
+    Browsers cannot set headers on a WebSocket handshake, so the token is
+    read from the ``token`` query parameter, falling back to a
+    ``Authorization: Bearer <token>`` header for other clients.
+    """
+
+    async def __call__(self, scope, receive, send):
+        scope = dict(scope)
+        scope['user'] = await get_user_for_token(self.get_raw_token(scope))
+        return await super().__call__(scope, receive, send)
+
+    def get_raw_token(self, scope):
+        query = parse_qs(scope.get('query_string', b'').decode())
+        if 'token' in query:
+            return query['token'][0]
+
+        headers = dict(scope.get('headers', []))
+        parts = headers.get(b'authorization', b'').decode().split()
+        if len(parts) == 2 and parts[0] == 'Bearer':
+            return parts[1]
+        return None
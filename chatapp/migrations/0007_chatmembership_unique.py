@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:13
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def remove_duplicate_memberships(apps, schema_editor):
+    ChatMembership = apps.get_model('chatapp', 'ChatMembership')
+    keep = (
+        ChatMembership.objects
+        .values('user', 'chatroom')
+        .annotate(keep_id=Min('id'))
+        .values_list('keep_id', flat=True)
+    )
+    ChatMembership.objects.exclude(id__in=list(keep)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatapp', '0006_message_room_timestamp_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_memberships, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='chatmembership',
+            constraint=models.UniqueConstraint(fields=('user', 'chatroom'), name='unique_chatroom_membership'),
+        ),
+    ]
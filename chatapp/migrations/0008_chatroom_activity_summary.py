@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:17
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_activity_summary(apps, schema_editor):
+    ChatRoom = apps.get_model('chatapp', 'ChatRoom')
+    Message = apps.get_model('chatapp', 'Message')
+    room_messages = Message.objects.filter(chatroom=OuterRef('pk'))
+    latest = room_messages.order_by('-timestamp', '-id')
+    ChatRoom.objects.update(
+        last_message=Subquery(latest.values('id')[:1]),
+        last_activity_at=Coalesce(Subquery(latest.values('timestamp')[:1]), F('last_activity_at')),
+        message_count=Coalesce(
+            Subquery(room_messages.values('chatroom').annotate(count=Count('id')).values('count')),
+            0
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatapp', '0007_chatmembership_unique'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatroom',
+            name='last_activity_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='chatroom',
+            name='last_message',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='chatapp.message'),
+        ),
+        migrations.AddField(
+            model_name='chatroom',
+            name='message_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='chatroom',
+            index=models.Index(fields=['-last_activity_at', '-id'], name='chatroom_activity_idx'),
+        ),
+        migrations.RunPython(backfill_activity_summary, migrations.RunPython.noop),
+    ]
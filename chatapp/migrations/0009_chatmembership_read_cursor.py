@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def mark_existing_history_read(apps, schema_editor):
+    # Start every existing member at the end of their room's history
+    # rather than flagging years of messages as unread
+    ChatMembership = apps.get_model('chatapp', 'ChatMembership')
+    ChatRoom = apps.get_model('chatapp', 'ChatRoom')
+    ChatMembership.objects.update(
+        last_read_message=Subquery(
+            ChatRoom.objects.filter(id=OuterRef('chatroom_id')).values('last_message_id')[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatapp', '0008_chatroom_activity_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatmembership',
+            name='last_read_message',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='chatapp.message'),
+        ),
+        migrations.AddField(
+            model_name='chatmembership',
+            name='unread_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(mark_existing_history_read, migrations.RunPython.noop),
+    ]
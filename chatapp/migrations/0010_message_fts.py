@@ -0,0 +1,60 @@
+from django.db import migrations
+
+
+CREATE_SQL = [
+    """
+    CREATE VIRTUAL TABLE chatapp_message_fts USING fts5(
+        content,
+        content='chatapp_message',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER chatapp_message_fts_insert AFTER INSERT ON chatapp_message BEGIN
+        INSERT INTO chatapp_message_fts(rowid, content) VALUES (new.id, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER chatapp_message_fts_delete AFTER DELETE ON chatapp_message BEGIN
+        INSERT INTO chatapp_message_fts(chatapp_message_fts, rowid, content)
+        VALUES ('delete', old.id, old.content);
+    END
+    """,
+    """
+    CREATE TRIGGER chatapp_message_fts_update AFTER UPDATE OF content ON chatapp_message BEGIN
+        INSERT INTO chatapp_message_fts(chatapp_message_fts, rowid, content)
+        VALUES ('delete', old.id, old.content);
+        INSERT INTO chatapp_message_fts(rowid, content) VALUES (new.id, new.content);
+    END
+    """,
+    "INSERT INTO chatapp_message_fts(chatapp_message_fts) VALUES ('rebuild')",
+]
+
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS chatapp_message_fts_update",
+    "DROP TRIGGER IF EXISTS chatapp_message_fts_delete",
+    "DROP TRIGGER IF EXISTS chatapp_message_fts_insert",
+    "DROP TABLE IF EXISTS chatapp_message_fts",
+]
+
+
+def run_sqlite(statements):
+    def run(apps, schema_editor):
+        # Full-text search is built on SQLite's FTS5 extension
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatapp', '0009_chatmembership_read_cursor'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_sqlite(CREATE_SQL), run_sqlite(DROP_SQL)),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatapp', '0011_versions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatroom',
+            name='members_version',
+            field=models.PositiveBigIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,102 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:37
+
+from collections import defaultdict
+
+from django.db import migrations, models
+from django.db.models import Count, F, Q
+
+
+def merge_chatrooms(apps, keep_id, duplicate_ids):
+    """
+    Move the history of ``duplicate_ids`` into ``keep_id`` and delete
+    them. Each member keeps the furthest read cursor they had in any of
+    the rooms, and the room summary and unread counts are recomputed.
+    """
+    ChatRoom = apps.get_model('chatapp', 'ChatRoom')
+    ChatMembership = apps.get_model('chatapp', 'ChatMembership')
+    Message = apps.get_model('chatapp', 'Message')
+    room_ids = [keep_id, *duplicate_ids]
+
+    cursors = {}
+    for user_id, message_id in (
+        ChatMembership.objects.filter(chatroom_id__in=room_ids, last_read_message__isnull=False)
+        .values_list('user_id', 'last_read_message_id')
+    ):
+        message = Message.objects.filter(id=message_id).values('id', 'timestamp').first()
+        if message is None:
+            continue
+        current = cursors.get(user_id)
+        if current is None or (message['timestamp'], message['id']) > (current['timestamp'], current['id']):
+            cursors[user_id] = message
+
+    Message.objects.filter(chatroom_id__in=duplicate_ids).update(chatroom_id=keep_id)
+    ChatRoom.objects.filter(id__in=duplicate_ids).delete()
+
+    messages = Message.objects.filter(chatroom_id=keep_id)
+    latest = messages.order_by('-timestamp', '-id').values('id', 'timestamp').first()
+    summary = {'message_count': messages.count()}
+    if latest is not None:
+        summary.update(last_message_id=latest['id'], last_activity_at=latest['timestamp'])
+    # New versions, so cached payloads and ETags of the room go stale
+    ChatRoom.objects.filter(id=keep_id).update(
+        version=F('version') + 1, members_version=F('members_version') + 1, **summary
+    )
+
+    for membership in ChatMembership.objects.filter(chatroom_id=keep_id):
+        cursor = cursors.get(membership.user_id)
+        unread = messages.exclude(user_id=membership.user_id)
+        if cursor is not None:
+            unread = unread.filter(
+                Q(timestamp__gt=cursor['timestamp']) |
+                Q(timestamp=cursor['timestamp'], id__gt=cursor['id'])
+            )
+        membership.last_read_message_id = cursor['id'] if cursor else None
+        membership.unread_count = unread.count()
+        membership.save(update_fields=['last_read_message', 'unread_count'])
+
+
+def backfill_personal_keys(apps, schema_editor):
+    # Personal rooms of the same two users are merged into the oldest one
+    ChatRoom = apps.get_model('chatapp', 'ChatRoom')
+    ChatMembership = apps.get_model('chatapp', 'ChatMembership')
+
+    two_member_rooms = (
+        ChatMembership.objects.filter(chatroom__type='personal')
+        .values('chatroom_id')
+        .annotate(members=Count('id'))
+        .filter(members=2)
+        .values('chatroom_id')
+    )
+    members = defaultdict(list)
+    for chatroom_id, user_id in (
+        ChatMembership.objects.filter(chatroom_id__in=two_member_rooms)
+        .values_list('chatroom_id', 'user_id')
+    ):
+        members[chatroom_id].append(user_id)
+
+    rooms_by_key = defaultdict(list)
+    for chatroom_id, user_ids in members.items():
+        low, high = sorted(user_ids)
+        rooms_by_key[f'{low}:{high}'].append(chatroom_id)
+
+    for key, chatroom_ids in rooms_by_key.items():
+        keep_id, *duplicate_ids = sorted(chatroom_ids)
+        if duplicate_ids:
+            merge_chatrooms(apps, keep_id, duplicate_ids)
+        ChatRoom.objects.filter(id=keep_id).update(personal_key=key)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatapp', '0012_chatroom_members_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatroom',
+            name='personal_key',
+            field=models.CharField(blank=True, max_length=41, null=True, unique=True),
+        ),
+        migrations.RunPython(backfill_personal_keys, migrations.RunPython.noop),
+    ]
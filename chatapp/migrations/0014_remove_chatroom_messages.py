@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# ChatRoom.messages duplicated Message.chatroom in a join table. The
+# foreign key is NOT NULL, so every message already names its room there:
+# join rows that agree with it are redundant and rows that disagree
+# contradict it, and both go with the table. Going backwards, the table is
+# refilled from the foreign key, one row per message.
+
+REFILL_BATCH_SIZE = 10_000
+
+
+def refill_join_table(apps, schema_editor):
+    ChatRoom = apps.get_model('chatapp', 'ChatRoom')
+    Message = apps.get_model('chatapp', 'Message')
+    Through = ChatRoom.messages.through
+
+    batch = []
+    for message_id, chatroom_id in Message.objects.values_list('id', 'chatroom_id').iterator(REFILL_BATCH_SIZE):
+        batch.append(Through(chatroom_id=chatroom_id, message_id=message_id))
+        if len(batch) >= REFILL_BATCH_SIZE:
+            Through.objects.bulk_create(batch)
+            batch = []
+    Through.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatapp', '0013_chatroom_personal_key'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, refill_join_table),
+        migrations.RemoveField(
+            model_name='chatroom',
+            name='messages',
+        ),
+        migrations.AlterField(
+            model_name='message',
+            name='chatroom',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='messages', to='chatapp.chatroom'),
+        ),
+    ]
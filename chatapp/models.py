@@ -1,5 +1,24 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+
+class LiveChatRoomManager(models.Manager):
+    """
+    Hides tombstoned chatrooms; see chatapp.purge.
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
+class MessageQuerySet(models.QuerySet):
+    def live(self):
+        """
+        Leave out the messages of tombstoned users, which stay in the table
+        until they are purged; see chatapp.purge.
+        """
+        return self.exclude(user_id__in=UserTombstone.objects.values('user_id'))
 
 
 class ChatRoom(models.Model):
@@ -22,10 +41,51 @@ class ChatRoom(models.Model):
         through="ChatMembership",
         related_name="chatroom"
     )
-    messages = models.ManyToManyField(
+
+    # Denormalized activity summary, maintained by chatapp.activity.
+    # last_message is a plain column so deleting messages never has to
+    # touch the chatroom table through the collector.
+    last_message = models.ForeignKey(
         "Message",
-        related_name="chatrooms_messages"
+        null=True,
+        blank=True,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name="+"
     )
+    last_activity_at = models.DateTimeField(default=timezone.now)
+    message_count = models.PositiveIntegerField(default=0)
+
+    # Bumped by every write that changes the room's detail payload: the
+    # room itself, its messages, its members and their profiles. Used for
+    # ETags; see chatapp.versions.
+    version = models.PositiveBigIntegerField(default=1)
+    # Bumped only by changes to the member list: joins, leaves and member
+    # profile edits. Keys the cached member lists in chatapp.response_cache.
+    members_version = models.PositiveBigIntegerField(default=1)
+    # "<lower user id>:<higher user id>" for personal rooms with exactly two
+    # members, NULL otherwise. The unique index allows one such room per
+    # pair; see chatapp.personal.
+    personal_key = models.CharField(max_length=41, null=True, blank=True, unique=True)
+    # Set when the room is deleted. A tombstoned room is hidden from
+    # ChatRoom.objects at once, and its rows are purged in the background.
+    deleted_at = models.DateTimeField(null=True, blank=True)
+
+    objects = LiveChatRoomManager()
+    all_objects = models.Manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['-last_activity_at', '-id'],
+                name='chatroom_activity_idx'
+            ),
+            models.Index(
+                fields=['deleted_at'],
+                condition=models.Q(deleted_at__isnull=False),
+                name='chatroom_tombstone_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -35,12 +95,66 @@ class ChatMembership(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     chatroom = models.ForeignKey("ChatRoom", on_delete=models.CASCADE)
 
+    # Read cursor: every message up to and including this one has been
+    # read. unread_count is maintained by chatapp.activity.
+    last_read_message = models.ForeignKey(
+        "Message",
+        null=True,
+        blank=True,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name="+"
+    )
+    unread_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'chatroom'],
+                name='unique_chatroom_membership'
+            ),
+        ]
+
 
 class Message(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
-    chatroom = models.ForeignKey("ChatRoom", on_delete=models.CASCADE)
+    chatroom = models.ForeignKey("ChatRoom", on_delete=models.CASCADE, related_name="messages")
     content = models.TextField()
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    objects = MessageQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['chatroom', 'timestamp', 'id'],
+                name='message_room_timestamp_idx'
+            ),
+        ]
+
     def __str__(self):
         return self.content
+
+
+class UserTombstone(models.Model):
+    """
+    Marks a deleted account. The user is deactivated at once and purged,
+    messages first, in the background; see chatapp.purge.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name="tombstone")
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f'{self.user_id} deleted at {self.deleted_at}'
+
+
+class Generation(models.Model):
+    """
+    A named counter bumped whenever the data behind it changes, such as
+    ``users`` for the user list.
+    """
+    name = models.CharField(max_length=50, primary_key=True)
+    value = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.name}@{self.value}'
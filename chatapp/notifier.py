@@ -0,0 +1,85 @@
+import asyncio
+import threading
+from collections import defaultdict
+
+
+# chatroom id -> subscriptions waiting for a new message in that room.
+# Only covers this process: messages created by another worker reach
+# long-poll waiters when their timeout runs out.
+_lock = threading.Lock()
+_subscriptions = defaultdict(set)
+
+
+class Subscription:
+    """
+    Interest in new messages of one chatroom, for code running in an
+    event loop. Use as a context manager, and subscribe before checking the
+    database so a message created in between is not missed::
+
+        with notifier.subscribe(chatroom_id) as subscription:
+            ...check for messages...
+            await subscription.wait(timeout)
+
+    An idle subscription is an asyncio.Event in a set; nothing runs until
+    notify() is called for its room.
+    """
+
+    def __init__(self, chatroom_id):
+        self.chatroom_id = chatroom_id
+        self._loop = asyncio.get_running_loop()
+        self._event = asyncio.Event()
+
+    def __enter__(self):
+        with _lock:
+            _subscriptions[self.chatroom_id].add(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        with _lock:
+            waiting = _subscriptions[self.chatroom_id]
+            waiting.discard(self)
+            if not waiting:
+                del _subscriptions[self.chatroom_id]
+
+    async def wait(self, timeout):
+        """
+        Wait until the room is notified or ``timeout`` seconds pass.
+        Returns whether it was notified. A notification that arrived since
+        the last wait returns immediately.
+        """
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self._event.clear()
+
+    def _wake(self):
+        try:
+            self._loop.call_soon_threadsafe(self._event.set)
+        except RuntimeError:
+            # The loop has closed; the subscriber is gone
+            pass
+
+
+def subscribe(chatroom_id):
+    return Subscription(chatroom_id)
+
+
+def notify(chatroom_id):
+    """
+    Wake everything subscribed to ``chatroom_id``. Safe to call from any
+    thread.
+    """
+    with _lock:
+        waiting = list(_subscriptions.get(chatroom_id, ()))
+    for subscription in waiting:
+        subscription._wake()
+
+
+def subscriber_count(chatroom_id=None):
+    with _lock:
+        if chatroom_id is not None:
+            return len(_subscriptions.get(chatroom_id, ()))
+        return sum(len(waiting) for waiting in _subscriptions.values())
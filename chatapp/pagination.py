@@ -0,0 +1,177 @@
+import base64
+import json
+from datetime import datetime
+
+from django.db.models import Q
+
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# How much of a room is embedded in its detail payload
+DETAIL_MESSAGE_LIMIT = 20
+DETAIL_MEMBER_LIMIT = 50
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(*values):
+    """
+    Pack the sort key of a row into an opaque, URL-safe token.
+    """
+    raw = json.dumps(
+        [v.isoformat() if isinstance(v, datetime) else v for v in values],
+        separators=(',', ':')
+    )
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise InvalidCursor('Invalid cursor')
+    if not isinstance(values, list):
+        raise InvalidCursor('Invalid cursor')
+    return values
+
+
+def get_page_size(request, default=DEFAULT_PAGE_SIZE):
+    # request.GET rather than query_params so plain Django requests of the
+    # async views work too
+    try:
+        limit = int(request.GET.get('limit', default))
+    except ValueError:
+        raise InvalidCursor('limit must be an integer')
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def _field(row, name):
+    # Pages hold model instances or, on the read paths, .values() dicts
+    return row[name] if isinstance(row, dict) else getattr(row, name)
+
+
+def message_cursor(message):
+    return encode_cursor(_field(message, 'timestamp'), _field(message, 'id'))
+
+
+def _decode_message_cursor(token):
+    try:
+        timestamp, message_id = decode_cursor(token)
+        return datetime.fromisoformat(timestamp), int(message_id)
+    except (TypeError, ValueError):
+        raise InvalidCursor('Invalid cursor')
+
+
+def _message_page_queryset(queryset, before, after, limit):
+    if before and after:
+        raise InvalidCursor('Use either before or after, not both')
+
+    # SQLite cannot seek into the index on the OR alone, so each keyset
+    # filter carries a redundant range bound on timestamp as well
+    if after:
+        timestamp, message_id = _decode_message_cursor(after)
+        return queryset.filter(
+            Q(timestamp__gt=timestamp) |
+            Q(timestamp=timestamp, id__gt=message_id),
+            timestamp__gte=timestamp,
+        ).order_by('timestamp', 'id')[:limit]
+
+    if before:
+        timestamp, message_id = _decode_message_cursor(before)
+        queryset = queryset.filter(
+            Q(timestamp__lt=timestamp) |
+            Q(timestamp=timestamp, id__lt=message_id),
+            timestamp__lte=timestamp,
+        )
+    return queryset.order_by('-timestamp', '-id')[:limit + 1]
+
+
+def _message_page(rows, before, after, limit):
+    if after:
+        if not rows:
+            return rows, after, after
+        return rows, message_cursor(rows[0]), message_cursor(rows[-1])
+
+    has_more = len(rows) > limit
+    page = rows[:limit][::-1]
+    before_cursor = message_cursor(page[0]) if has_more else None
+    after_cursor = message_cursor(page[-1]) if page else before
+    return page, before_cursor, after_cursor
+
+
+def paginate_messages(queryset, before=None, after=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    Keyset pagination over a single room's messages on (timestamp, id).
+
+    Without cursors the newest page is returned. ``before`` walks towards
+    older messages and ``after`` towards newer ones. Messages in the page
+    are always ordered oldest first. Every page is a bounded range scan
+    on the (chatroom, timestamp, id) index, so deep pages cost the same
+    as the first one.
+
+    Returns ``(messages, before_cursor, after_cursor)``. ``before_cursor``
+    is ``None`` once the start of the history is reached. ``after_cursor``
+    always points at the newest message seen, so clients can keep asking
+    for anything newer.
+    """
+    rows = list(_message_page_queryset(queryset, before, after, limit))
+    return _message_page(rows, before, after, limit)
+
+
+async def apaginate_messages(queryset, before=None, after=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    Async variant of paginate_messages.
+    """
+    rows = [message async for message in _message_page_queryset(queryset, before, after, limit)]
+    return _message_page(rows, before, after, limit)
+
+
+def paginate_by_id(queryset, after=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    Keyset pagination ordered by primary key, for members and chatrooms.
+
+    Returns ``(users, next_cursor)``; ``next_cursor`` is ``None`` on the
+    last page.
+    """
+    if after:
+        try:
+            (user_id,) = decode_cursor(after)
+            queryset = queryset.filter(id__gt=int(user_id))
+        except (TypeError, ValueError):
+            raise InvalidCursor('Invalid cursor')
+    rows = list(queryset.order_by('id')[:limit + 1])
+    page = rows[:limit]
+    next_cursor = encode_cursor(_field(page[-1], 'id')) if len(rows) > limit else None
+    return page, next_cursor
+
+
+def paginate_by_activity(queryset, after=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    Keyset pagination over chatrooms, most recently active first, on the
+    (last_activity_at, id) index.
+
+    Returns ``(chatrooms, next_cursor)``; ``next_cursor`` is ``None`` on the
+    last page.
+    """
+    if after:
+        try:
+            last_activity_at, chatroom_id = decode_cursor(after)
+            last_activity_at = datetime.fromisoformat(last_activity_at)
+            chatroom_id = int(chatroom_id)
+        except (TypeError, ValueError):
+            raise InvalidCursor('Invalid cursor')
+        queryset = queryset.filter(
+            Q(last_activity_at__lt=last_activity_at) |
+            Q(last_activity_at=last_activity_at, id__lt=chatroom_id),
+            last_activity_at__lte=last_activity_at,
+        )
+    rows = list(queryset.order_by('-last_activity_at', '-id')[:limit + 1])
+    page = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = encode_cursor(page[-1].last_activity_at, page[-1].id)
+    return page, next_cursor
@@ -0,0 +1,56 @@
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from .membership import set_members
+from .models import ChatMembership, ChatRoom
+
+
+def personal_key(user_id, other_id):
+    low, high = sorted((int(user_id), int(other_id)))
+    return f'{low}:{high}'
+
+
+def get_or_create_personal_chatroom(user_id, other_id):
+    """
+    The personal chatroom of two users, created if they have none yet.
+    Returns ``(chatroom, created)``, or raises User.DoesNotExist when the
+    room would have to be created for a user that does not exist.
+
+    An existing room costs one lookup on the personal_key index. When two
+    requests create the same pair's room at once, the unique index rejects
+    the second insert and that request returns the first one's room.
+    """
+    key = personal_key(user_id, other_id)
+    chatroom = ChatRoom.objects.filter(personal_key=key).first()
+    if chatroom is not None:
+        return chatroom, False
+
+    if User.objects.filter(id__in={user_id, other_id}, tombstone__isnull=True).count() != len({user_id, other_id}):
+        raise User.DoesNotExist('Personal chatroom member does not exist')
+    try:
+        with transaction.atomic():
+            chatroom = ChatRoom.objects.create(type=ChatRoom.PERSONAL, personal_key=key)
+            set_members(chatroom, {user_id, other_id})
+    except IntegrityError:
+        return ChatRoom.objects.get(personal_key=key), False
+    return chatroom, True
+
+
+def sync_personal_key(chatroom):
+    """
+    Recompute a chatroom's personal_key after its type or members changed.
+    Raises IntegrityError when the two members already have another
+    personal room, so call this inside the transaction that made the
+    change.
+    """
+    key = None
+    if chatroom.type == ChatRoom.PERSONAL:
+        member_ids = list(
+            ChatMembership.objects.filter(chatroom=chatroom).values_list('user_id', flat=True)[:3]
+        )
+        if len(member_ids) == 2:
+            key = personal_key(*member_ids)
+    if key != chatroom.personal_key:
+        # Not part of any payload, so skip the save signals and their
+        # version bumps
+        ChatRoom.objects.filter(id=chatroom.id).update(personal_key=key)
+        chatroom.personal_key = key
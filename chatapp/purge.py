@@ -0,0 +1,172 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import BigIntegerField, Case, Count, F, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+from . import membership, versions
+from .models import ChatMembership, ChatRoom, Message, UserTombstone
+
+
+# Deleting a chatroom or a user only marks a tombstone; the rows that
+# depend on it are removed here, in batches of this many, each batch in
+# its own short transaction so writers are never locked out for long.
+PURGE_BATCH_SIZE = 1000
+
+
+def tombstone_chatroom(chatroom_id):
+    """
+    Hide a chatroom from every read at once. Its personal key is released
+    so the same two users can open a new personal room straight away.
+    """
+    ChatRoom.objects.filter(id=chatroom_id).update(deleted_at=timezone.now(), personal_key=None)
+    membership.invalidate(chatroom_id)
+
+
+def tombstone_user(user):
+    """
+    Deactivate a user and drop their memberships, so they can no longer
+    sign in and disappear from every member list. Their messages stay
+    until purge_user() runs but are hidden from every read at once, so
+    rooms they wrote last fall back to the latest live message.
+    """
+    with transaction.atomic():
+        chatroom_ids = list(
+            ChatMembership.objects.filter(user_id=user.id).values_list('chatroom_id', flat=True)
+        )
+        # Nothing cascades from ChatMembership, so a single DELETE will do
+        memberships = ChatMembership.objects.filter(user_id=user.id)
+        memberships._raw_delete(memberships.db)
+        for chatroom_id in chatroom_ids:
+            membership.invalidate(chatroom_id)
+        versions.bump_chatroom_members(*chatroom_ids)
+        # Their personal rooms are down to one member
+        ChatRoom.objects.filter(id__in=chatroom_ids, personal_key__isnull=False).update(personal_key=None)
+
+        user.is_active = False
+        user.save(update_fields=['is_active'])
+        UserTombstone.objects.get_or_create(user_id=user.id)
+
+        latest = Message.objects.live().filter(chatroom_id=OuterRef('id')).order_by('-timestamp', '-id')
+        ChatRoom.all_objects.filter(last_message__user_id=user.id).update(
+            version=F('version') + 1,
+            last_message_id=Subquery(latest.values('id')[:1]),
+        )
+
+
+def _delete_in_batches(queryset, batch_size, before_delete=None):
+    """
+    Raw DELETE the rows of ``queryset`` in id order, ``batch_size`` at a
+    time. ``before_delete`` gets each batch's queryset first. Returns the
+    number of deleted rows.
+    """
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            ids = list(queryset.order_by('id').values_list('id', flat=True)[:batch_size])
+            if not ids:
+                return deleted
+            batch = queryset.model._base_manager.filter(id__in=ids)
+            if before_delete:
+                before_delete(batch)
+            batch._raw_delete(batch.db)
+        deleted += len(ids)
+
+
+def purge_chatroom(chatroom_id, batch_size=PURGE_BATCH_SIZE):
+    """
+    Remove a tombstoned chatroom: its messages, then its memberships, then
+    the room itself. Safe to run again after an interruption. Returns the
+    number of deleted messages.
+    """
+    if not ChatRoom.all_objects.filter(id=chatroom_id, deleted_at__isnull=False).exists():
+        return 0
+    deleted = _delete_in_batches(Message.objects.filter(chatroom_id=chatroom_id), batch_size)
+    _delete_in_batches(ChatMembership.objects.filter(chatroom_id=chatroom_id), batch_size)
+    # Whatever was added meanwhile goes through the collector
+    ChatRoom.all_objects.filter(id=chatroom_id, deleted_at__isnull=False).delete()
+    return deleted
+
+
+def _forget_messages(batch):
+    """
+    Take a batch of messages about to be deleted out of their chatrooms'
+    activity summaries and their members' unread counts and read cursors,
+    like activity.record_message_deleted does for one message, with one
+    UPDATE each.
+    """
+    ids = list(batch.values_list('id', flat=True))
+    remaining = Message.objects.exclude(id__in=ids)
+    deleted_in_room = (
+        batch.filter(chatroom_id=OuterRef('id'))
+        .values('chatroom_id')
+        .annotate(count=Count('id'))
+        .values('count')
+    )
+    chatroom_ids = batch.values('chatroom_id')
+
+    latest = remaining.filter(chatroom_id=OuterRef('id')).order_by('-timestamp', '-id')
+    ChatRoom.all_objects.filter(id__in=chatroom_ids).update(
+        version=F('version') + 1,
+        message_count=Greatest(F('message_count') - Coalesce(Subquery(deleted_in_room), 0), Value(0)),
+        last_message_id=Case(
+            When(last_message_id__in=ids, then=Subquery(latest.values('id')[:1])),
+            default=F('last_message_id'),
+            output_field=BigIntegerField()
+        ),
+    )
+
+    unread_deleted = (
+        batch.filter(
+            chatroom_id=OuterRef('chatroom_id'),
+            id__gt=Coalesce(OuterRef('last_read_message_id'), Value(0))
+        )
+        .exclude(user_id=OuterRef('user_id'))
+        .values('chatroom_id')
+        .annotate(count=Count('id'))
+        .values('count')
+    )
+    ChatMembership.objects.filter(chatroom_id__in=chatroom_ids, unread_count__gt=0).update(
+        unread_count=Greatest(F('unread_count') - Coalesce(Subquery(unread_deleted), 0), Value(0))
+    )
+
+    ChatMembership.objects.filter(chatroom_id__in=chatroom_ids, last_read_message_id__in=ids).update(
+        last_read_message_id=Subquery(
+            remaining.filter(chatroom_id=OuterRef('chatroom_id'), id__lt=OuterRef('last_read_message_id'))
+            .order_by('-id').values('id')[:1]
+        )
+    )
+
+
+def purge_user(user_id, batch_size=PURGE_BATCH_SIZE):
+    """
+    Remove a tombstoned user: their messages in batches, keeping every
+    room's summary and unread counts right, then the user and whatever
+    little is left pointing at them. Safe to run again after an
+    interruption. Returns the number of deleted messages.
+    """
+    user = User.objects.filter(id=user_id, tombstone__isnull=False).first()
+    if user is None:
+        return 0
+    deleted = _delete_in_batches(
+        Message.objects.filter(user_id=user_id), batch_size, before_delete=_forget_messages
+    )
+    user.delete()
+    return deleted
+
+
+def purge_tombstones(batch_size=PURGE_BATCH_SIZE):
+    """
+    Purge every tombstoned chatroom and user, oldest first. Returns the
+    numbers of purged chatrooms, users and messages.
+    """
+    chatrooms = users = messages = 0
+    for chatroom_id in list(
+        ChatRoom.all_objects.filter(deleted_at__isnull=False)
+        .order_by('deleted_at').values_list('id', flat=True)
+    ):
+        messages += purge_chatroom(chatroom_id, batch_size)
+        chatrooms += 1
+    for user_id in list(UserTombstone.objects.order_by('deleted_at').values_list('user_id', flat=True)):
+        messages += purge_user(user_id, batch_size)
+        users += 1
+    return chatrooms, users, messages
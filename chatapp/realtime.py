@@ -0,0 +1,72 @@
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+
+
+def chatroom_group_name(chatroom_id):
+    return f'chatroom_{chatroom_id}'
+
+
+def user_group_name(user_id):
+    return f'user_{user_id}'
+
+
+async def _agroup_send(*sends):
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    for group, event in sends:
+        await channel_layer.group_send(group, event)
+
+
+def _group_send(*sends):
+    """
+    Deliver ``(group, event)`` pairs, crossing into async code only once.
+    """
+    if sends:
+        async_to_sync(_agroup_send)(*sends)
+
+
+def _message_sends(event, messages):
+    return [
+        (chatroom_group_name(message['chatroom']), {
+            'type': 'chat.message',
+            'event': event,
+            'message': message,
+        })
+        for message in messages
+    ]
+
+
+def broadcast_message(event, message):
+    """
+    Push a message event (``message.created``, ``message.updated`` or
+    ``message.deleted``) to every socket subscribed to its chatroom.
+    """
+    broadcast_messages(event, [message])
+
+
+def broadcast_messages(event, messages):
+    _group_send(*_message_sends(event, messages))
+
+
+async def abroadcast_message(event, message):
+    """
+    Async variant of broadcast_message, for async views.
+    """
+    await _agroup_send(*_message_sends(event, [message]))
+
+
+def notify_membership(chatroom_id, joined=(), left=()):
+    """
+    Tell connected users they were added to or removed from a chatroom so
+    their sockets can join or leave its group without reconnecting.
+    """
+    _group_send(*(
+        (user_group_name(user_id), {
+            'type': 'chat.membership',
+            'chatroom': chatroom_id,
+            'joined': is_joined,
+        })
+        for user_ids, is_joined in ((joined, True), (left, False))
+        for user_id in user_ids
+    ))
@@ -0,0 +1,40 @@
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer that encodes with orjson when it is installed, producing
+    the same bytes as the stdlib renderer for the compact, UTF-8 output
+    DRF uses by default.
+
+    Datetimes are encoded natively, with UTC as ``Z`` like DRF's encoder.
+    Decimals, lazy strings and the other types orjson does not know go
+    through DRF's encoder. Indented output (the browsable API, or an
+    ``indent`` media type parameter) uses the stdlib renderer.
+    """
+    options = (orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if (
+            orjson is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=self.options)
+        except orjson.JSONEncodeError:
+            # Integers beyond 64 bits and the like
+            return super().render(data, accepted_media_type, renderer_context)
+        # Same escaping as JSONRenderer, which keeps the output a strict
+        # javascript subset
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
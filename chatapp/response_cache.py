@@ -0,0 +1,86 @@
+import threading
+
+from django.core.cache import caches
+
+
+CACHE_ALIAS = 'responses'
+
+_lock = threading.Lock()
+_hits = 0
+_misses = 0
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def users_key(generation):
+    return f'users:{generation}'
+
+
+def members_key(chatroom_id, members_version):
+    return f'members:{chatroom_id}:{members_version}'
+
+
+def _count(hits, misses):
+    global _hits, _misses
+    with _lock:
+        _hits += hits
+        _misses += misses
+
+
+def get_or_build(key, build):
+    """
+    Cached value for ``key``, or the result of ``build()``, which is then
+    stored. Keys carry a version, so entries are never invalidated in
+    place; superseded ones just age out of the cache.
+    """
+    value = _cache().get(key)
+    if value is not None:
+        _count(1, 0)
+        return value
+    _count(0, 1)
+    value = build()
+    _cache().set(key, value)
+    return value
+
+
+def get_many_or_build(keys, build):
+    """
+    Like get_or_build for several keys at once. ``build(missing)`` gets
+    the keys that were not cached and returns a dict of their values.
+    Returns a dict covering every key in ``keys``.
+    """
+    values = _cache().get_many(keys)
+    missing = [key for key in keys if key not in values]
+    _count(len(values), len(missing))
+    if missing:
+        built = build(missing)
+        _cache().set_many(built)
+        values.update(built)
+    return values
+
+
+def stats():
+    with _lock:
+        hits, misses = _hits, _misses
+    lookups = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': hits / lookups if lookups else 0.0,
+    }
+
+
+def reset_stats():
+    global _hits, _misses
+    with _lock:
+        _hits = _misses = 0
+
+
+def clear():
+    """
+    Drop every cached response and zero the counters. Used by the tests.
+    """
+    _cache().clear()
+    reset_stats()
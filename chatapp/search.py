@@ -0,0 +1,195 @@
+import html
+import re
+
+from django.db import connection, transaction
+from .models import Message
+
+
+FTS_TABLE = 'chatapp_message_fts'
+# rebuild_index() builds a fresh index here and swaps it in when done
+REBUILD_TABLE = f'{FTS_TABLE}_rebuild'
+
+SNIPPET_TOKENS = 16
+# FTS5 marks matches with these control characters, which survive HTML
+# escaping and are only then turned into <mark> tags
+MATCH_START = '\x02'
+MATCH_END = '\x03'
+
+_TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def is_supported():
+    return connection.vendor == 'sqlite'
+
+
+def build_match_query(text):
+    """
+    Turn free text into an FTS5 query matching every word in it.
+
+    Words are quoted so user input can never be read as FTS5 syntax. The
+    last word also matches as a prefix, for search-as-you-type.
+    Returns ``None`` when the text has no searchable words.
+    """
+    terms = _TERM_RE.findall(text)
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def search_messages(user_id, text, limit, offset=0, chatroom_id=None):
+    """
+    Rank messages in the user's chatrooms against ``text`` with bm25,
+    leaving out those of tombstoned users.
+
+    Returns Message instances annotated with a ``snippet``: HTML-escaped
+    message text in which the matched words are wrapped in ``<mark>``
+    tags.
+    """
+    match = build_match_query(text)
+    if match is None:
+        return []
+
+    params = [user_id, match]
+    chatroom_filter = ''
+    if chatroom_id is not None:
+        chatroom_filter = 'AND m.chatroom_id = %s'
+        params.append(chatroom_id)
+    params += [limit, offset]
+
+    messages = list(Message.objects.raw(
+        f"""
+        SELECT m.id, m.user_id, m.chatroom_id, m.content, m.timestamp,
+               snippet({FTS_TABLE}, 0, char(2), char(3), '…', {SNIPPET_TOKENS}) AS snippet
+        FROM {FTS_TABLE}
+        JOIN chatapp_message m ON m.id = {FTS_TABLE}.rowid
+        JOIN chatapp_chatmembership cm ON cm.chatroom_id = m.chatroom_id AND cm.user_id = %s
+        JOIN chatapp_chatroom c ON c.id = m.chatroom_id AND c.deleted_at IS NULL
+        LEFT JOIN chatapp_usertombstone t ON t.user_id = m.user_id
+        WHERE {FTS_TABLE} MATCH %s AND t.user_id IS NULL {chatroom_filter}
+        ORDER BY {FTS_TABLE}.rank, m.id DESC
+        LIMIT %s OFFSET %s
+        """,
+        params
+    ))
+    for message in messages:
+        message.snippet = highlight(message.snippet)
+    return messages
+
+
+def highlight(snippet):
+    """
+    Escape a snippet for HTML and turn its match markers into ``<mark>``
+    tags, so message text can never inject markup of its own.
+    """
+    return (
+        html.escape(snippet)
+        .replace(MATCH_START, '<mark>')
+        .replace(MATCH_END, '</mark>')
+    )
+
+
+def _create_table_sql(table):
+    return f"""
+        CREATE VIRTUAL TABLE {table} USING fts5(
+            content,
+            content='chatapp_message',
+            content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    """
+
+
+def _trigger_sql(table):
+    """
+    Triggers keeping ``table`` in step with chatapp_message, as created by
+    migration 0010. An external-content index must only be sent 'delete'
+    for rows it holds, so while an index is being filled in the old row
+    is only removed when its ``_docsize`` shadow table lists it.
+    """
+    indexed = '' if table == FTS_TABLE else f'WHERE EXISTS (SELECT 1 FROM {table}_docsize WHERE id = old.id)'
+    return [
+        f"""
+        CREATE TRIGGER {table}_insert AFTER INSERT ON chatapp_message BEGIN
+            INSERT INTO {table}(rowid, content) VALUES (new.id, new.content);
+        END
+        """,
+        f"""
+        CREATE TRIGGER {table}_delete AFTER DELETE ON chatapp_message BEGIN
+            INSERT INTO {table}({table}, rowid, content)
+            SELECT 'delete', old.id, old.content {indexed};
+        END
+        """,
+        f"""
+        CREATE TRIGGER {table}_update AFTER UPDATE OF content ON chatapp_message BEGIN
+            INSERT INTO {table}({table}, rowid, content)
+            SELECT 'delete', old.id, old.content {indexed};
+            INSERT INTO {table}(rowid, content) VALUES (new.id, new.content);
+        END
+        """,
+    ]
+
+
+def _drop_triggers_sql(table):
+    return [f'DROP TRIGGER IF EXISTS {table}_{event}' for event in ('update', 'delete', 'insert')]
+
+
+def rebuild_index(batch_size, progress=None):
+    """
+    Build a fresh full-text index from chatapp_message and swap it in for
+    the current one.
+
+    The new index is filled in id order, one committed batch at a time so
+    writers are never locked out for long, up to the highest id at the
+    start. Triggers keep it current meanwhile, so messages written during
+    the rebuild are indexed exactly once. Searches keep using the old
+    index until the swap. Returns the number of messages the batches
+    indexed.
+    """
+    with connection.cursor() as cursor:
+        # Left over from an interrupted rebuild
+        for statement in _drop_triggers_sql(REBUILD_TABLE):
+            cursor.execute(statement)
+        cursor.execute(f'DROP TABLE IF EXISTS {REBUILD_TABLE}')
+        with transaction.atomic():
+            cursor.execute(_create_table_sql(REBUILD_TABLE))
+            for statement in _trigger_sql(REBUILD_TABLE):
+                cursor.execute(statement)
+            cursor.execute("SELECT COALESCE(MAX(id), 0) FROM chatapp_message")
+            (snapshot_id,) = cursor.fetchone()
+
+        indexed = 0
+        last_id = 0
+        while True:
+            with transaction.atomic():
+                cursor.execute(
+                    "SELECT MAX(id), COUNT(*) FROM ("
+                    "SELECT id FROM chatapp_message WHERE id > %s AND id <= %s ORDER BY id LIMIT %s)",
+                    [last_id, snapshot_id, batch_size]
+                )
+                upper_id, count = cursor.fetchone()
+                if not count:
+                    break
+                # Rows that were written to since the rebuild began are in
+                # already
+                cursor.execute(
+                    f"INSERT INTO {REBUILD_TABLE}(rowid, content) "
+                    "SELECT id, content FROM chatapp_message WHERE id > %s AND id <= %s "
+                    f"AND id NOT IN (SELECT id FROM {REBUILD_TABLE}_docsize WHERE id > %s AND id <= %s)",
+                    [last_id, upper_id, last_id, upper_id]
+                )
+                indexed += cursor.rowcount
+            last_id = upper_id
+            if progress:
+                progress(indexed)
+
+        with transaction.atomic():
+            for statement in _drop_triggers_sql(FTS_TABLE) + _drop_triggers_sql(REBUILD_TABLE):
+                cursor.execute(statement)
+            cursor.execute(f'DROP TABLE {FTS_TABLE}')
+            cursor.execute(f"ALTER TABLE {REBUILD_TABLE} RENAME TO {FTS_TABLE}")
+            for statement in _trigger_sql(FTS_TABLE):
+                cursor.execute(statement)
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+    return indexed
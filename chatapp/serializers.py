@@ -1,7 +1,15 @@
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer as BaseTokenRefreshSerializer
 from .models import ChatRoom, ChatMembership, Message
+from .pagination import (
+    DETAIL_MEMBER_LIMIT, DETAIL_MESSAGE_LIMIT, paginate_by_id, paginate_messages
+)
+from . import response_cache
+from .tokens import RefreshToken
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate
+from django.db.models import F
+from django.urls import reverse
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -23,6 +31,36 @@ class UserListSerializer(serializers.ModelSerializer):
         }
 
 
+USER_ROW_FIELDS = ('id', 'username', 'email')
+MESSAGE_ROW_FIELDS = ('id', 'user_id', 'chatroom_id', 'content', 'timestamp')
+
+
+def user_rows(rows):
+    """
+    What ``UserListSerializer(many=True).data`` returns, built from
+    ``.values(*USER_ROW_FIELDS)`` rows without a serializer per row.
+    """
+    return [{'id': row['id'], 'username': row['username'], 'email': row['email']} for row in rows]
+
+
+def message_rows(rows):
+    """
+    What ``MessageSerializer(many=True).data`` returns, built from
+    ``.values(*MESSAGE_ROW_FIELDS)`` rows without a serializer per row.
+    """
+    timestamp = serializers.DateTimeField().to_representation
+    return [
+        {
+            'id': row['id'],
+            'user': row['user_id'],
+            'chatroom': row['chatroom_id'],
+            'content': row['content'],
+            'timestamp': timestamp(row['timestamp']),
+        }
+        for row in rows
+    ]
+
+
 class LoginSerializer(serializers.Serializer):
     username = serializers.CharField()
     password = serializers.CharField()
@@ -48,20 +86,85 @@ class MessageSerializer(serializers.ModelSerializer):
         }
 
 
+class MessageBatchItemSerializer(serializers.Serializer):
+    chatroom = serializers.IntegerField()
+    content = serializers.CharField()
+
+
 class ChatRoomDetailSerializer(serializers.ModelSerializer):
-    members = UserListSerializer(many=True, read_only=True)
-    messages = MessageSerializer(many=True, read_only=True)
+    """
+    Bounded room detail: the latest messages, the member count and the
+    first page of members, with links to the paged endpoints for the rest.
+    Costs the same fixed number of queries however large the room is.
+    """
 
     class Meta:
         model = ChatRoom
-        fields = ['id', 'name', 'type', 'members', 'messages']
+        fields = ['id', 'name', 'type']
         extra_kwargs = {
             'id': {'read_only': True},
         }
 
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+
+        members, next_members = paginate_by_id(
+            User.objects.filter(chatmembership__chatroom=instance).values(*USER_ROW_FIELDS),
+            limit=DETAIL_MEMBER_LIMIT
+        )
+        messages, before, _ = paginate_messages(
+            Message.objects.live().filter(chatroom=instance).values(*MESSAGE_ROW_FIELDS),
+            limit=DETAIL_MESSAGE_LIMIT
+        )
+
+        data['member_count'] = ChatMembership.objects.filter(chatroom=instance).count()
+        data['members'] = user_rows(members)
+        data['messages'] = message_rows(messages)
+        data['links'] = {
+            'members': self._link('chatroom_members', instance, 'after', next_members),
+            'messages': self._link('chatroom_messages', instance, 'before', before),
+        }
+        return data
+
+    def _link(self, name, instance, param, cursor):
+        if cursor is None:
+            return None
+        url = f"{reverse(name, args=[instance.id])}?{param}={cursor}"
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+
+def serialize_member_lists(chatrooms):
+    """
+    Serialized member list of each chatroom, keyed by chatroom id.
+
+    Lists come from the response cache under the room's members_version;
+    the rooms that miss are filled with one query between them.
+    """
+    keys = {response_cache.members_key(c.id, c.members_version): c.id for c in chatrooms}
+
+    def build(missing):
+        chatroom_ids = {keys[key]: key for key in missing}
+        built = {key: [] for key in missing}
+        members = (
+            User.objects.filter(chatmembership__chatroom_id__in=chatroom_ids)
+            .order_by('id')
+            .values_list('chatmembership__chatroom_id', *USER_ROW_FIELDS)
+        )
+        for chatroom_id, *fields in members:
+            built[chatroom_ids[chatroom_id]].append(dict(zip(USER_ROW_FIELDS, fields)))
+        return built
+
+    cached = response_cache.get_many_or_build(list(keys), build)
+    return {chatroom_id: cached[key] for key, chatroom_id in keys.items()}
+
 
 class ChatRoomSerializer(serializers.ModelSerializer):
-    members = UserListSerializer(many=True, read_only=True)
+    """
+    Member lists are read from ``context['member_lists']`` when the caller
+    has fetched them for the whole page with serialize_member_lists.
+    """
+    members = serializers.SerializerMethodField()
 
     class Meta:
         model = ChatRoom
@@ -70,6 +173,42 @@ class ChatRoomSerializer(serializers.ModelSerializer):
             'id': {'read_only': True},
         }
 
+    def get_members(self, obj):
+        member_lists = self.context.get('member_lists')
+        if member_lists is None:
+            member_lists = serialize_member_lists([obj])
+        return member_lists[obj.id]
+
+
+class ChatRoomListSerializer(ChatRoomSerializer):
+    """
+    Chatroom as seen by one member. Expects the queryset to be annotated
+    with that member's ``unread_count``.
+    """
+    unread_count = serializers.IntegerField(read_only=True)
+
+    class Meta(ChatRoomSerializer.Meta):
+        fields = ChatRoomSerializer.Meta.fields + ['unread_count']
+
+
+class MessagePreviewSerializer(MessageSerializer):
+    PREVIEW_LENGTH = 100
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        data['content'] = data['content'][:self.PREVIEW_LENGTH]
+        return data
+
+
+class InboxSerializer(serializers.ModelSerializer):
+    last_message = MessagePreviewSerializer(read_only=True)
+    unread_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = ChatRoom
+        fields = ['id', 'name', 'type', 'last_activity_at', 'message_count', 'unread_count', 'last_message']
+        read_only_fields = fields
+
 
 class UserDetailSerializer(serializers.ModelSerializer):
     chatrooms = serializers.SerializerMethodField()
@@ -82,8 +221,12 @@ class UserDetailSerializer(serializers.ModelSerializer):
         }
 
     def get_chatrooms(self, obj):
-        chatrooms = ChatRoom.objects.filter(members=obj)
-        return ChatRoomSerializer(chatrooms, many=True).data
+        chatrooms = list(
+            ChatRoom.objects.filter(chatmembership__user=obj)
+            .annotate(unread_count=F('chatmembership__unread_count'))
+        )
+        context = {'member_lists': serialize_member_lists(chatrooms)}
+        return ChatRoomListSerializer(chatrooms, many=True, context=context).data
 
 
 class ChatMembershipSerializer(serializers.ModelSerializer):
@@ -98,3 +241,7 @@ class ChatMembershipSerializer(serializers.ModelSerializer):
         extra_kwargs = {
             'id': {'read_only': True},
         }
+
+
+class TokenRefreshSerializer(BaseTokenRefreshSerializer):
+    token_class = RefreshToken
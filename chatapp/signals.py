@@ -0,0 +1,99 @@
+import atexit
+
+from django.contrib.auth.models import User
+from django.core.signals import request_finished
+from django.db import close_old_connections, transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from . import activity, authentication, membership, sqlite, tokens, versions
+from .models import ChatMembership, ChatRoom, Message
+
+
+@receiver(connection_created)
+def configure_connection(sender, connection, **kwargs):
+    sqlite.configure_connection(connection)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user(sender, instance, **kwargs):
+    authentication.invalidate_user(instance.pk)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def bump_user_versions(sender, instance, created=False, **kwargs):
+    versions.bump_generation(versions.USERS)
+    # On delete the membership rows cascade and bump the rooms themselves
+    if kwargs['signal'] is post_save and not created:
+        versions.bump_user_chatrooms(instance.pk)
+
+
+@receiver(post_save, sender=ChatMembership)
+@receiver(post_delete, sender=ChatMembership)
+def invalidate_membership(sender, instance, **kwargs):
+    membership.invalidate(instance.chatroom_id)
+    versions.bump_chatroom_members(instance.chatroom_id)
+
+
+@receiver(post_save, sender=ChatRoom)
+def bump_chatroom(sender, instance, created, **kwargs):
+    if not created:
+        versions.bump_chatrooms(instance.id)
+
+
+@receiver(m2m_changed, sender=ChatRoom.members.through)
+def invalidate_membership_m2m(sender, instance, action, reverse, pk_set, **kwargs):
+    # chatroom.members.add() and friends bulk insert the through model
+    # without sending post_save, so catch them here as well
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            membership.invalidate(instance.id)
+            versions.bump_chatroom_members(instance.id)
+        return
+
+    # user.chatroom.clear() does not say which rooms it touched
+    if action == 'pre_clear':
+        pk_set = list(ChatMembership.objects.filter(user=instance).values_list('chatroom_id', flat=True))
+    elif action not in ('post_add', 'post_remove'):
+        return
+    for chatroom_id in pk_set:
+        membership.invalidate(chatroom_id)
+    versions.bump_chatroom_members(*pk_set)
+
+
+@receiver(post_save, sender=Message)
+def record_message_saved(sender, instance, created, **kwargs):
+    if created:
+        activity.record_message_created(instance)
+    else:
+        # Edits show up in the room detail's latest messages
+        versions.bump_chatrooms(instance.chatroom_id)
+
+
+@receiver(post_delete, sender=Message)
+def record_message_deleted(sender, instance, **kwargs):
+    activity.record_message_deleted(instance)
+
+
+@receiver(post_save, sender=BlacklistedToken)
+def bump_blacklist_version(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(tokens.bump_blacklist_version)
+
+
+@receiver(request_finished)
+def flush_outstanding_tokens(sender, **kwargs):
+    tokens.flush_outstanding_tokens(force=False)
+
+
+# Django connects close_old_connections first; move it behind the flush so
+# the flush writes on the request's connection and does not reopen one
+# that then lingers until the next request
+request_finished.disconnect(close_old_connections)
+request_finished.connect(close_old_connections)
+
+# Tokens still buffered when the process stops
+atexit.register(tokens.flush_outstanding_tokens)
@@ -0,0 +1,43 @@
+from django.conf import settings
+
+
+# Applied to every new SQLite connection, in this order. Override any of
+# them with the SQLITE_PRAGMAS setting; a value of None skips the pragma.
+DEFAULT_PRAGMAS = {
+    # Wait for locks instead of failing with "database is locked"
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    # Negative values are in KiB
+    'cache_size': -64 * 1024,
+}
+
+# Added when the SQLITE_WAL setting is on. WAL mode is stored in the
+# database file itself, so it is opt-in rather than a default.
+WAL_PRAGMAS = {
+    # Readers no longer block the writer, and the other way around
+    'journal_mode': 'wal',
+    # In WAL mode this only gives up durability of the last commits on
+    # power loss, never consistency
+    'synchronous': 'normal',
+}
+
+
+def get_pragmas():
+    pragmas = dict(DEFAULT_PRAGMAS)
+    if getattr(settings, 'SQLITE_WAL', False):
+        pragmas.update(WAL_PRAGMAS)
+    pragmas.update(getattr(settings, 'SQLITE_PRAGMAS', {}))
+    return pragmas
+
+
+def configure_connection(connection):
+    """
+    Apply the configured pragmas to a freshly opened SQLite connection.
+    Other database vendors are left alone.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in get_pragmas().items():
+            if value is not None:
+                cursor.execute(f'PRAGMA {name} = {value}')
@@ -1,10 +1,25 @@
 import pytest
+from django.core.cache import cache
 from rest_framework.test import APIClient
 from django.contrib.auth.models import User
 from rest_framework_simplejwt.tokens import RefreshToken
+from .. import response_cache, tokens, versions
 from ..models import ChatRoom
 
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    versions.version_cache().clear()
+    response_cache.clear()
+    tokens.reset()
+    yield
+    cache.clear()
+    versions.version_cache().clear()
+    response_cache.clear()
+    tokens.reset()
+
+
 @pytest.fixture
 def api_client():
     return APIClient()
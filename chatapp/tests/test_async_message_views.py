@@ -0,0 +1,241 @@
+import asyncio
+
+import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+from django.test import AsyncClient
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from django.contrib.auth.models import User
+from .. import notifier
+from ..models import ChatRoom, Message
+from ..views import async_message_views
+
+
+@pytest.fixture
+def chatroom(auth_client):
+    _, user = auth_client
+    chatroom = ChatRoom.objects.create(name="Test Chatroom", type=ChatRoom.GROUP)
+    chatroom.members.add(user)
+    return chatroom
+
+
+@pytest.mark.django_db
+def test_async_create_message(auth_client, chatroom):
+    # Setup
+    api_client, user = auth_client
+    url = reverse('async_chatroom_messages', args=[chatroom.id])
+
+    # Action
+    response = api_client.post(url, {"content": "Test message"}, format='json')
+    message = response.json()
+
+    # Validation
+    assert response.status_code == status.HTTP_201_CREATED
+    assert Message.objects.get().id == message['id']
+    assert message['content'] == "Test message"
+    assert message['user'] == user.id
+    assert message['chatroom'] == chatroom.id
+    chatroom.refresh_from_db()
+    assert chatroom.last_message_id == message['id']
+
+
+@pytest.mark.django_db
+def test_async_create_message_errors(auth_client, chatroom):
+    # Setup
+    api_client, _ = auth_client
+    other = ChatRoom.objects.create(name="Other Chatroom", type=ChatRoom.GROUP)
+
+    # Action
+    missing_room = api_client.post(
+        reverse('async_chatroom_messages', args=[9999]), {"content": "Hi"}, format='json'
+    )
+    not_member = api_client.post(
+        reverse('async_chatroom_messages', args=[other.id]), {"content": "Hi"}, format='json'
+    )
+    blank = api_client.post(
+        reverse('async_chatroom_messages', args=[chatroom.id]), {"content": ""}, format='json'
+    )
+
+    # Validation
+    assert missing_room.status_code == status.HTTP_404_NOT_FOUND
+    assert not_member.status_code == status.HTTP_400_BAD_REQUEST
+    assert blank.status_code == status.HTTP_400_BAD_REQUEST
+    assert 'content' in blank.json()
+    assert not Message.objects.exists()
+
+
+@pytest.mark.django_db
+def test_async_list_messages_matches_sync_view(auth_client, chatroom):
+    # Setup
+    api_client, user = auth_client
+    Message.objects.bulk_create([
+        Message(user=user, chatroom=chatroom, content=f"Message {i}") for i in range(5)
+    ])
+    params = {'limit': 2}
+
+    # Action
+    sync_page = api_client.get(reverse('chatroom_messages', args=[chatroom.id]), params)
+    async_page = api_client.get(reverse('async_chatroom_messages', args=[chatroom.id]), params)
+    older = api_client.get(
+        reverse('async_chatroom_messages', args=[chatroom.id]),
+        {**params, 'before': async_page.json()['before']}
+    )
+
+    # Validation
+    assert async_page.status_code == status.HTTP_200_OK
+    assert async_page.json() == sync_page.json()
+    assert [m['content'] for m in older.json()['messages']] == ["Message 1", "Message 2"]
+
+
+@pytest.mark.django_db
+def test_async_views_require_authentication(chatroom):
+    # Setup
+    url = reverse('async_chatroom_messages', args=[chatroom.id])
+    client = APIClient()
+
+    # Action
+    anonymous = client.get(url)
+    client.credentials(HTTP_AUTHORIZATION='Bearer not-a-token')
+    invalid = client.get(url)
+
+    # Validation
+    assert anonymous.status_code == status.HTTP_401_UNAUTHORIZED
+    assert anonymous['WWW-Authenticate'].startswith('Bearer')
+    assert invalid.status_code == status.HTTP_401_UNAUTHORIZED
+    assert invalid.json()['code'] == 'token_not_valid'
+
+
+@pytest.mark.django_db
+def test_async_list_messages_user_not_member(auth_client):
+    # Setup
+    api_client, _ = auth_client
+    outsider = User.objects.create_user(username='outsider', password='testpassword')
+    chatroom = ChatRoom.objects.create(name="Private Chatroom", type=ChatRoom.GROUP)
+    chatroom.members.add(outsider)
+
+    # Action
+    response = api_client.get(reverse('async_chatroom_messages', args=[chatroom.id]))
+
+    # Validation
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.django_db
+def test_poll_returns_new_messages_at_once(auth_client, chatroom):
+    # Setup
+    api_client, user = auth_client
+    seen = Message.objects.create(user=user, chatroom=chatroom, content="Seen")
+    new = Message.objects.create(user=user, chatroom=chatroom, content="New")
+    url = reverse('async_poll_messages', args=[chatroom.id])
+
+    # Action
+    response = api_client.get(url, {'after_id': seen.id, 'timeout': 30})
+
+    # Validation
+    assert response.status_code == status.HTTP_200_OK
+    assert [message['id'] for message in response.json()['messages']] == [new.id]
+    assert response.json()['after_id'] == new.id
+
+
+@pytest.mark.django_db
+def test_poll_times_out_with_empty_delta(auth_client, chatroom):
+    # Setup
+    api_client, user = auth_client
+    seen = Message.objects.create(user=user, chatroom=chatroom, content="Seen")
+    url = reverse('async_poll_messages', args=[chatroom.id])
+
+    # Action
+    response = api_client.get(url, {'after_id': seen.id, 'timeout': 0.05})
+
+    # Validation
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {'messages': [], 'after_id': seen.id}
+    assert notifier.subscriber_count() == 0
+
+
+@pytest.mark.django_db
+def test_poll_is_woken_by_new_message(auth_client, chatroom, get_token, django_capture_on_commit_callbacks):
+    # Setup
+    api_client, user = auth_client
+    seen = Message.objects.create(user=user, chatroom=chatroom, content="Seen")
+    url = reverse('async_poll_messages', args=[chatroom.id])
+    headers = {'Authorization': f"Bearer {get_token(user)['access']}"}
+
+    def post_message():
+        # The test transaction never commits, so run the commit hooks here
+        with django_capture_on_commit_callbacks(execute=True):
+            return api_client.post(reverse('chatroom_messages', args=[chatroom.id]), {"content": "Hi"}, format='json')
+
+    async def scenario():
+        poll = asyncio.create_task(AsyncClient().get(url, {'after_id': seen.id, 'timeout': 30}, headers=headers))
+        while not notifier.subscriber_count(chatroom.id):
+            await asyncio.sleep(0.01)
+        created = await sync_to_async(post_message)()
+        return created, await asyncio.wait_for(poll, 5)
+
+    # Action
+    created, response = async_to_sync(scenario)()
+
+    # Validation
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()['messages'] == [created.data]
+
+
+@pytest.mark.django_db
+def test_woken_polls_share_one_query(
+    auth_client, chatroom, get_token, monkeypatch, django_capture_on_commit_callbacks
+):
+    # Setup
+    api_client, user = auth_client
+    seen = Message.objects.create(user=user, chatroom=chatroom, content="Seen")
+    url = reverse('async_poll_messages', args=[chatroom.id])
+    headers = {'Authorization': f"Bearer {get_token(user)['access']}"}
+    queries = []
+    new_messages = async_message_views._new_messages
+
+    async def counted_new_messages(*args):
+        queries.append(args)
+        return await new_messages(*args)
+
+    def post_message():
+        with django_capture_on_commit_callbacks(execute=True):
+            return api_client.post(reverse('chatroom_messages', args=[chatroom.id]), {"content": "Hi"}, format='json')
+
+    async def scenario():
+        polls = [
+            asyncio.create_task(AsyncClient().get(url, {'after_id': seen.id, 'timeout': 30}, headers=headers))
+            for _ in range(5)
+        ]
+        # Parked, with their first checks done
+        while notifier.subscriber_count(chatroom.id) < len(polls) or async_message_views._poll_queries:
+            await asyncio.sleep(0.01)
+        monkeypatch.setattr(async_message_views, '_new_messages', counted_new_messages)
+        created = await sync_to_async(post_message)()
+        return created, await asyncio.wait_for(asyncio.gather(*polls), 5)
+
+    # Action
+    created, responses = async_to_sync(scenario)()
+
+    # Validation
+    assert all(response.json()['messages'] == [created.data] for response in responses)
+    assert len(queries) == 1
+
+
+@pytest.mark.django_db
+def test_poll_errors(auth_client, chatroom):
+    # Setup
+    api_client, _ = auth_client
+    other = ChatRoom.objects.create(name="Other Chatroom", type=ChatRoom.GROUP)
+
+    # Action
+    missing_cursor = api_client.get(reverse('async_poll_messages', args=[chatroom.id]))
+    bad_timeout = api_client.get(
+        reverse('async_poll_messages', args=[chatroom.id]), {'after_id': 0, 'timeout': 'nan'}
+    )
+    not_member = api_client.get(reverse('async_poll_messages', args=[other.id]), {'after_id': 0})
+
+    # Validation
+    assert missing_cursor.status_code == status.HTTP_400_BAD_REQUEST
+    assert bad_timeout.status_code == status.HTTP_400_BAD_REQUEST
+    assert not_member.status_code == status.HTTP_403_FORBIDDEN
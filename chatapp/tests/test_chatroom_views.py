@@ -1,7 +1,19 @@
+import gzip
+import json
+import tracemalloc
+
 import pytest
+from asgiref.sync import async_to_sync
+from django.db.models import QuerySet
+from django.test import AsyncClient
 from django.urls import reverse
 from rest_framework import status
-from ..models import ChatRoom, ChatMembership
+from rest_framework.test import APIClient
+from ..models import ChatRoom, ChatMembership, Message
+from ..pagination import DETAIL_MEMBER_LIMIT, DETAIL_MESSAGE_LIMIT
+from ..personal import get_or_create_personal_chatroom, personal_key
+from ..serializers import MessageSerializer
+from ..versions import chatroom_etag
 from django.contrib.auth.models import User
 
 
@@ -63,3 +75,642 @@ def test_update_chatroom(auth_client):
     assert chatroom.type == ChatRoom.GROUP
     assert len(chatroom.members.all()) == 2
     assert ChatMembership.objects.count() == 2
+
+
+def _populate_chatroom(chatroom, user, members, messages):
+    others = User.objects.bulk_create([
+        User(username=f"member{chatroom.id}-{i}", email=f"member{i}@example.com")
+        for i in range(members)
+    ])
+    ChatMembership.objects.bulk_create([
+        ChatMembership(user=other, chatroom=chatroom) for other in [user, *others]
+    ])
+    Message.objects.bulk_create([
+        Message(user=user, chatroom=chatroom, content=f"Message {i}")
+        for i in range(messages)
+    ])
+
+
+@pytest.mark.django_db
+def test_get_chatroom_is_bounded(auth_client):
+    # Setup
+    api_client, user = auth_client
+    chatroom = ChatRoom.objects.create(name="Big Chatroom", type=ChatRoom.GROUP)
+    _populate_chatroom(chatroom, user, members=DETAIL_MEMBER_LIMIT + 10, messages=DETAIL_MESSAGE_LIMIT + 10)
+    url = reverse('chatrooms_detail', args=[chatroom.id])
+
+    # Action
+    response = api_client.get(url)
+
+    # Validation
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['member_count'] == DETAIL_MEMBER_LIMIT + 11
+    assert len(response.data['members']) == DETAIL_MEMBER_LIMIT
+    assert len(response.data['messages']) == DETAIL_MESSAGE_LIMIT
+    assert response.data['messages'][-1]['content'] == f"Message {DETAIL_MESSAGE_LIMIT + 9}"
+    assert response.data['links']['members'] is not None
+    assert response.data['links']['messages'] is not None
+
+
+@pytest.mark.django_db
+def test_get_chatroom_query_count_is_constant(auth_client, django_assert_num_queries):
+    # Setup
+    api_client, user = auth_client
+    small = ChatRoom.objects.create(name="Small Chatroom", type=ChatRoom.GROUP)
+    large = ChatRoom.objects.create(name="Large Chatroom", type=ChatRoom.GROUP)
+    _populate_chatroom(small, user, members=1, messages=1)
+    _populate_chatroom(large, user, members=200, messages=500)
+
+    # Resolve the user and their memberships once so they are served from
+    # the caches
+    for chatroom in (small, large):
+        api_client.get(reverse('chatrooms_detail', args=[chatroom.id]))
+
+    # Action / Validation
+    # Room, members page, messages page and member count
+    for chatroom in (small, large):
+        with django_assert_num_queries(4):
+            response = api_client.get(reverse('chatrooms_detail', args=[chatroom.id]))
+        assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+def test_list_members_pages(auth_client):
+    # Setup
+    api_client, user = auth_client
+    chatroom = ChatRoom.objects.create(name="Test Chatroom", type=ChatRoom.GROUP)
+    _populate_chatroom(chatroom, user, members=4, messages=0)
+    url = reverse('chatroom_members', args=[chatroom.id])
+
+    # Action
+    first_page = api_client.get(url, {'limit': 3})
+    second_page = api_client.get(url, {'limit': 3, 'after': first_page.data['next']})
+
+    # Validation
+    assert first_page.status_code == status.HTTP_200_OK
+    assert len(first_page.data['members']) == 3
+    assert len(second_page.data['members']) == 2
+    assert second_page.data['next'] is None
+
+
+@pytest.mark.django_db
+def test_create_chatroom_invalid_member_ids(auth_client):
+    # Setup
+    api_client, user = auth_client
+    url = reverse('chatrooms_list')
+    data = {
+        "name": "Test Chatroom",
+        "type": ChatRoom.GROUP,
+        "member_ids": [user.id + 100]
+    }
+
+    # Action
+    response = api_client.post(url, data, format='json')
+
+    # Validation
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert ChatRoom.objects.count() == 0
+    assert ChatMembership.objects.count() == 0
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('member_ids', [5, "5", None, {"id": 5}])
+def test_create_chatroom_member_ids_not_a_list(auth_client, member_ids):
+    # Setup
+    api_client, _ = auth_client
+    url = reverse('chatrooms_list')
+    data = {"name": "Test Chatroom", "type": ChatRoom.GROUP, "member_ids": member_ids}
+
+    # Action
+    response = api_client.post(url, data, format='json')
+
+    # Validation
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert ChatRoom.objects.count() == 0
+
+
+@pytest.mark.django_db
+def test_create_chatroom_with_creator_in_member_ids(auth_client):
+    # Setup
+    api_client, user = auth_client
+    url = reverse('chatrooms_list')
+    data = {
+        "name": "Test Chatroom",
+        "type": ChatRoom.GROUP,
+        "member_ids": [user.id]
+    }
+
+    # Action
+    response = api_client.post(url, data, format='json')
+
+    # Validation
+    assert response.status_code == status.HTTP_201_CREATED
+    assert ChatMembership.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_update_chatroom_removes_members(auth_client):
+    # Setup
+    api_client, user = auth_client
+    chatroom = ChatRoom.objects.create(name="Test Chatroom", type=ChatRoom.GROUP)
+    _populate_chatroom(chatroom, user, members=3, messages=0)
+    url = reverse('chatrooms_detail', args=[chatroom.id])
+    data = {
+        "name": "Test Chatroom",
+        "type": ChatRoom.GROUP,
+        "member_ids": [user.id]
+    }
+
+    # Action
+    response = api_client.put(url, data, format='json')
+
+    # Validation
+    assert response.status_code == status.HTTP_200_OK
+    assert list(ChatMembership.objects.values_list('user_id', flat=True)) == [user.id]
+
+
+@pytest.mark.django_db
+def test_update_chatroom_without_member_ids_keeps_members(auth_client):
+    # Setup
+    api_client, user = auth_client
+    chatroom = ChatRoom.objects.create(name="Test Chatroom", type=ChatRoom.GROUP)
+    _populate_chatroom(chatroom, user, members=3, messages=0)
+    url = reverse('chatrooms_detail', args=[chatroom.id])
+    data = {
+        "name": "Renamed Chatroom",
+        "type": ChatRoom.GROUP,
+    }
+
+    # Action
+    response = api_client.put(url, data, format='json')
+
+    # Validation
+    assert response.status_code == status.HTTP_200_OK
+    assert ChatMembership.objects.filter(chatroom=chatroom).count() == 4
+
+
+@pytest.mark.django_db
+def test_list_chatrooms_only_returns_own_chatrooms(auth_client):
+    # Setup
+    api_client, user = auth_client
+    own = ChatRoom.objects.create(name="Own Chatroom", type=ChatRoom.GROUP)
+    own.members.add(user)
+    ChatRoom.objects.create(name="Other Chatroom", type=ChatRoom.GROUP)
+    url = reverse('chatrooms_list')
+
+    # Action
+    response = api_client.get(url)
+
+    # Validation
+    assert response.status_code == status.HTTP_200_OK
+    assert [room['id'] for room in response.data['chatrooms']] == [own.id]
+    assert response.data['chatrooms'][0]['members'][0]['username'] == user.username
+    assert response.data['next'] is None
+
+
+@pytest.mark.django_db
+def test_list_chatrooms_pages(auth_client):
+    # Setup
+    api_client, user = auth_client
+    chatrooms = ChatRoom.objects.bulk_create([
+        ChatRoom(name=f"Chatroom {i}", type=ChatRoom.GROUP) for i in range(3)
+    ])
+    ChatMembership.objects.bulk_create([
+        ChatMembership(user=user, chatroom=chatroom) for chatroom in chatrooms
+    ])
+    url = reverse('chatrooms_list')
+
+    # Action
+    first_page = api_client.get(url, {'limit': 2})
+    second_page = api_client.get(url, {'limit': 2, 'after': first_page.data['next']})
+
+    # Validation
+    assert [room['id'] for room in first_page.data['chatrooms']] == [c.id for c in chatrooms[:2]]
+    assert [room['id'] for room in second_page.data['chatrooms']] == [chatrooms[2].id]
+    assert second_page.data['next'] is None
+
+
+@pytest.mark.django_db
+def test_list_chatrooms_query_count_is_constant(auth_client, django_assert_num_queries):
+    # Setup
+    api_client, user = auth_client
+    url = reverse('chatrooms_list')
+    # Resolve the user once so it is served from the auth cache
+    api_client.get(url)
+    for count in (1, 20):
+        chatrooms = ChatRoom.objects.bulk_create([
+            ChatRoom(name=f"Chatroom {i}", type=ChatRoom.GROUP) for i in range(count)
+        ])
+        for chatroom in chatrooms:
+            _populate_chatroom(chatroom, user, members=3, messages=0)
+
+        # Action / Validation
+        # Chatrooms page and one prefetch for all members
+        with django_assert_num_queries(2):
+            response = api_client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+def test_inbox_sorted_by_activity(auth_client, django_assert_num_queries):
+    # Setup
+    api_client, user = auth_client
+    quiet = ChatRoom.objects.create(name="Quiet Chatroom", type=ChatRoom.GROUP)
+    busy = ChatRoom.objects.create(name="Busy Chatroom", type=ChatRoom.GROUP)
+    quiet.members.add(user)
+    busy.members.add(user)
+    Message.objects.create(user=user, chatroom=quiet, content="First")
+    Message.objects.create(user=user, chatroom=busy, content="Second")
+    latest = Message.objects.create(user=user, chatroom=busy, content="x" * 500)
+    url = reverse('inbox')
+
+    # Action
+    # Auth and a single query for the page of chatrooms
+    with django_assert_num_queries(2):
+        response = api_client.get(url)
+
+    # Validation
+    assert response.status_code == status.HTTP_200_OK
+    assert [room['id'] for room in response.data['chatrooms']] == [busy.id, quiet.id]
+    assert response.data['chatrooms'][0]['message_count'] == 2
+    assert response.data['chatrooms'][0]['last_message']['id'] == latest.id
+    assert len(response.data['chatrooms'][0]['last_message']['content']) == 100
+
+
+@pytest.mark.django_db
+def test_inbox_updated_on_message_delete(auth_client):
+    # Setup
+    api_client, user = auth_client
+    chatroom = ChatRoom.objects.create(name="Test Chatroom", type=ChatRoom.GROUP)
+    chatroom.members.add(user)
+    first = Message.objects.create(user=user, chatroom=chatroom, content="First")
+    second = Message.objects.create(user=user, chatroom=chatroom, content="Second")
+
+    # Action
+    second.delete()
+    chatroom.refresh_from_db()
+
+    # Validation
+    assert chatroom.message_count == 1
+    assert chatroom.last_message_id == first.id
+
+
+@pytest.mark.django_db
+def test_unread_count_and_mark_read(auth_client):
+    # Setup
+    api_client, user = auth_client
+    other = User.objects.create(username="other", email="other@example.com")
+    chatroom = ChatRoom.objects.create(name="Test Chatroom", type=ChatRoom.GROUP)
+    chatroom.members.add(user, other)
+    first = Message.objects.create(user=other, chatroom=chatroom, content="First")
+    Message.objects.create(user=other, chatroom=chatroom, content="Second")
+    Message.objects.create(user=user, chatroom=chatroom, content="Own message")
+    Message.objects.create(user=other, chatroom=chatroom, content="Third")
+
+    # Action
+    listed = api_client.get(reverse('chatrooms_list'))
+    partially_read = api_client.post(
+        reverse('chatroom_read', args=[chatroom.id]), {'message_id': first.id}, format='json'
+    )
+    fully_read = api_client.post(reverse('chatroom_read', args=[chatroom.id]), {}, format='json')
+    moved_back = api_client.post(
+        reverse('chatroom_read', args=[chatroom.id]), {'message_id': first.id}, format='json'
+    )
+
+    # Validation
+    assert listed.data['chatrooms'][0]['unread_count'] == 3
+    assert partially_read.data['unread_count'] == 2
+    assert fully_read.data['unread_count'] == 0
+    assert moved_back.data['last_read_message'] == fully_read.data['last_read_message']
+    assert ChatMembership.objects.get(user=other).unread_count == 1
+
+
+@pytest.mark.django_db
+def test_unread_count_drops_when_unread_message_deleted(auth_client):
+    # Setup
+    api_client, user = auth_client
+    other = User.objects.create(username="other", email="other@example.com")
+    chatroom = ChatRoom.objects.create(name="Test Chatroom", type=ChatRoom.GROUP)
+    chatroom.members.add(user, other)
+    message = Message.objects.create(user=other, chatroom=chatroom, content="Unread")
+
+    # Action
+    message.delete()
+
+    # Validation
+    assert ChatMembership.objects.get(user=user).unread_count == 0
+
+
+@pytest.mark.django_db
+def test_mark_read_message_from_other_chatroom(auth_client):
+    # Setup
+    api_client, user = auth_client
+    chatroom = ChatRoom.objects.create(name="Test Chatroom", type=ChatRoom.GROUP)
+    other_chatroom = ChatRoom.objects.create(name="Other Chatroom", type=ChatRoom.GROUP)
+    chatroom.members.add(user)
+    message = Message.objects.create(user=user, chatroom=other_chatroom, content="Elsewhere")
+
+    # Action
+    response = api_client.post(
+        reverse('chatroom_read', args=[chatroom.id]), {'message_id': message.id}, format='json'
+    )
+
+    # Validation
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('body', [[1, 2], 7, 'message'])
+def test_mark_read_rejects_non_object_body(auth_client, body):
+    # Setup
+    api_client, user = auth_client
+    chatroom = ChatRoom.objects.create(name="Test Chatroom", type=ChatRoom.GROUP)
+    chatroom.members.add(user)
+
+    # Action
+    response = api_client.post(reverse('chatroom_read', args=[chatroom.id]), body, format='json')
+
+    # Validation
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+def _export_peak_memory(api_client, chatroom):
+    tracemalloc.start()
+    try:
+        response = api_client.get(reverse('chatroom_export', args=[chatroom.id]))
+        size = sum(len(block) for block in response.streaming_content)
+        return size, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def _asgi_export_peak_memory(headers, chatroom):
+    async def export():
+        response = await AsyncClient().get(reverse('chatroom_export', args=[chatroom.id]), headers=headers)
+        # Iterated like ASGIHandler.send_response, which buffers
+        # synchronous streams into a list
+        size = 0
+        async for block in response:
+            size += len(block)
+        return response, size
+
+    tracemalloc.start()
+    try:
+        response, size = async_to_sync(export)()
+        return response, size, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.mark.django_db
+def test_export_chatroom_streams_ndjson(auth_client):
+    # Setup
+    api_client, user = auth_client
+    chatroom = ChatRoom.objects.create(name="Export Chatroom", type=ChatRoom.GROUP)
+    _populate_chatroom(chatroom, user, members=1, messages=5)
+    url = reverse('chatroom_export', args=[chatroom.id])
+
+    # Action
+    response = api_client.get(url)
+    content = b''.join(response.streaming_content)
+    gzipped = api_client.get(url, {'compress': 'gzip'})
+    gzipped_content = b''.join(gzipped.streaming_content)
+
+    # Validation
+    assert response.status_code == status.HTTP_200_OK
+    assert response['Content-Type'] == 'application/x-ndjson'
+    assert 'chatroom-%d.ndjson' % chatroom.id in response['Content-Disposition']
+    lines = [json.loads(line) for line in content.decode().splitlines()]
+    expected = MessageSerializer(
+        Message.objects.filter(chatroom=chatroom).order_by('timestamp', 'id'), many=True
+    ).data
+    assert lines == [dict(message) for message in expected]
+    assert gzipped['Content-Type'] == 'application/gzip'
+    assert gzip.decompress(gzipped_content) == content
+
+
+@pytest.mark.django_db
+def test_export_chatroom_requires_membership(auth_client):
+    # Setup
+    api_client, _ = auth_client
+    chatroom = ChatRoom.objects.create(name="Private Chatroom", type=ChatRoom.GROUP)
+
+    # Action
+    response = api_client.get(reverse('chatroom_export', args=[chatroom.id]))
+    missing = api_client.get(reverse('chatroom_export', args=[9999]))
+
+    # Validation
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+    assert missing.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+def test_export_chatroom_memory_is_flat(auth_client):
+    # Setup
+    # benchmarks.bench_export runs the same measurement on a million messages
+    api_client, user = auth_client
+    small = ChatRoom.objects.create(name="Small Chatroom", type=ChatRoom.GROUP)
+    large = ChatRoom.objects.create(name="Large Chatroom", type=ChatRoom.GROUP)
+    _populate_chatroom(small, user, members=1, messages=2_000)
+    _populate_chatroom(large, user, members=1, messages=20_000)
+    _export_peak_memory(api_client, small)
+
+    # Action
+    small_size, small_peak = _export_peak_memory(api_client, small)
+    large_size, large_peak = _export_peak_memory(api_client, large)
+
+    # Validation
+    assert large_size > 8 * small_size
+    assert large_peak < 2 * small_peak
+    assert large_peak < 5 * 1024 * 1024
+
+
+@pytest.mark.django_db
+def test_export_chatroom_memory_is_flat_under_asgi(auth_client, get_token):
+    # Setup
+    _, user = auth_client
+    headers = {'Authorization': 'Bearer ' + get_token(user)['access']}
+    small = ChatRoom.objects.create(name="Small Chatroom", type=ChatRoom.GROUP)
+    large = ChatRoom.objects.create(name="Large Chatroom", type=ChatRoom.GROUP)
+    _populate_chatroom(small, user, members=1, messages=2_000)
+    _populate_chatroom(large, user, members=1, messages=20_000)
+    _asgi_export_peak_memory(headers, small)
+
+    # Action
+    response, small_size, small_peak = _asgi_export_peak_memory(headers, small)
+    _, large_size, large_peak = _asgi_export_peak_memory(headers, large)
+
+    # Validation
+    assert response.status_code == status.HTTP_200_OK
+    assert response.is_async
+    assert large_size > 8 * small_size
+    assert large_peak < 2 * small_peak
+    assert large_peak < 5 * 1024 * 1024
+
+
+@pytest.mark.django_db
+def test_get_chatroom_etag(auth_client, django_assert_num_queries):
+    # Setup
+    api_client, user = auth_client
+    other = User.objects.create_user(username='otheruser', password='testpassword')
+    chatroom = ChatRoom.objects.create(name="Test Chatroom", type=ChatRoom.GROUP)
+    chatroom.members.add(user, other)
+    url = reverse('chatrooms_detail', args=[chatroom.id])
+    etag = api_client.get(url)['ETag']
+
+    def revalidate():
+        return api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    # Action / Validation
+    # One indexed lookup, no serialization
+    with django_assert_num_queries(1):
+        response = revalidate()
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response['ETag'] == etag
+    assert not response.content
+
+    changes = [
+        lambda: Message.objects.create(user=user, chatroom=chatroom, content="Hello"),
+        lambda: Message.objects.filter(chatroom=chatroom).get().save(),
+        lambda: chatroom.members.remove(other),
+        lambda: ChatMembership.objects.create(user=other, chatroom=chatroom),
+        lambda: ChatRoom.objects.get(id=chatroom.id).save(),
+        lambda: User.objects.filter(id=other.id).get().save(),
+        lambda: Message.objects.filter(chatroom=chatroom).delete(),
+    ]
+    for change in changes:
+        change()
+        response = revalidate()
+        assert response.status_code == status.HTTP_200_OK
+        assert response['ETag'] != etag
+        etag = response['ETag']
+
+
+@pytest.mark.django_db
+def test_personal_chatroom_get_or_create(auth_client, create_user, get_token):
+    # Setup
+    api_client, user = auth_client
+    other = create_user(username='other', password='testpassword')
+    other_client = APIClient()
+    other_client.credentials(HTTP_AUTHORIZATION='Bearer ' + get_token(other)['access'])
+    url = reverse('personal_chatroom')
+
+    # Action
+    created = api_client.post(url, {'user_id': other.id}, format='json')
+    existing = other_client.post(url, {'user_id': user.id}, format='json')
+
+    # Validation
+    assert created.status_code == status.HTTP_201_CREATED
+    assert existing.status_code == status.HTTP_200_OK
+    assert existing.data['id'] == created.data['id']
+    chatroom = ChatRoom.objects.get()
+    assert chatroom.type == ChatRoom.PERSONAL
+    assert chatroom.personal_key == personal_key(user.id, other.id)
+    assert set(chatroom.members.values_list('id', flat=True)) == {user.id, other.id}
+
+
+@pytest.mark.django_db
+def test_personal_chatroom_lookup_is_one_query(create_user, django_assert_num_queries):
+    # Setup
+    user = create_user(username='user', password='testpassword')
+    other = create_user(username='other', password='testpassword')
+    chatroom, _ = get_or_create_personal_chatroom(user.id, other.id)
+
+    # Action / Validation
+    with django_assert_num_queries(1):
+        assert get_or_create_personal_chatroom(other.id, user.id) == (chatroom, False)
+
+
+@pytest.mark.django_db
+def test_personal_chatroom_lost_race(create_user, monkeypatch):
+    # Setup
+    user = create_user(username='user', password='testpassword')
+    other = create_user(username='other', password='testpassword')
+    chatroom, _ = get_or_create_personal_chatroom(user.id, other.id)
+    # Miss the first lookup, as if the room was created just after it
+    first = QuerySet.first
+    misses = [None]
+    monkeypatch.setattr(QuerySet, 'first', lambda qs: misses.pop() if misses else first(qs))
+
+    # Action
+    result = get_or_create_personal_chatroom(user.id, other.id)
+
+    # Validation
+    assert result == (chatroom, False)
+    assert ChatRoom.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_personal_chatroom_errors(auth_client):
+    # Setup
+    api_client, user = auth_client
+    url = reverse('personal_chatroom')
+
+    # Action
+    with_self = api_client.post(url, {'user_id': user.id}, format='json')
+    missing_user = api_client.post(url, {'user_id': 9999}, format='json')
+    not_an_id = api_client.post(url, {'user_id': 'someone'}, format='json')
+
+    # Validation
+    assert with_self.status_code == status.HTTP_400_BAD_REQUEST
+    assert missing_user.status_code == status.HTTP_404_NOT_FOUND
+    assert not_an_id.status_code == status.HTTP_400_BAD_REQUEST
+    assert not ChatRoom.objects.exists()
+
+
+@pytest.mark.django_db
+def test_personal_key_follows_create_and_update(auth_client, create_user):
+    # Setup
+    api_client, user = auth_client
+    other = create_user(username='other', password='testpassword')
+    third = create_user(username='third', password='testpassword')
+    url = reverse('chatrooms_list')
+    data = {"name": "DM", "type": ChatRoom.PERSONAL, "member_ids": [other.id]}
+
+    # Action
+    created = api_client.post(url, data, format='json')
+    duplicate = api_client.post(url, data, format='json')
+    detail = reverse('chatrooms_detail', args=[created.data['id']])
+    updated = api_client.put(detail, {**data, "member_ids": [user.id, third.id]}, format='json')
+
+    # Validation
+    assert created.status_code == status.HTTP_201_CREATED
+    assert duplicate.status_code == status.HTTP_400_BAD_REQUEST
+    assert updated.status_code == status.HTTP_200_OK
+    assert ChatRoom.objects.get().personal_key == personal_key(user.id, third.id)
+
+
+@pytest.mark.django_db
+def test_get_chatroom_requires_membership(auth_client):
+    # Setup
+    api_client, user = auth_client
+    other = User.objects.create_user(username='otheruser', password='testpassword')
+    chatroom = ChatRoom.objects.create(name="Private Chatroom", type=ChatRoom.GROUP)
+    chatroom.members.add(other)
+    Message.objects.create(user=other, chatroom=chatroom, content="Secret")
+    url = reverse('chatrooms_detail', args=[chatroom.id])
+
+    # Action
+    response = api_client.get(url)
+    revalidated = api_client.get(url, HTTP_IF_NONE_MATCH=chatroom_etag(chatroom))
+
+    # Validation
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+    assert 'messages' not in response.data
+    assert revalidated.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.django_db
+def test_get_chatroom_includes_messages_posted_through_api(auth_client):
+    # Setup
+    api_client, user = auth_client
+    chatroom = ChatRoom.objects.create(name="Chatroom", type=ChatRoom.GROUP)
+    chatroom.members.add(user)
+    posted = api_client.post(reverse('chatroom_messages', args=[chatroom.id]), {"content": "Hello"}, format='json')
+
+    # Action
+    response = api_client.get(reverse('chatrooms_detail', args=[chatroom.id]))
+
+    # Validation
+    assert response.data['messages'] == [posted.data]
+    assert list(chatroom.messages.values_list('id', flat=True)) == [posted.data['id']]
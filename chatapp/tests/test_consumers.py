@@ -0,0 +1,94 @@
+import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.urls import reverse
+from ChatApplication.asgi import application
+from ..models import ChatRoom, Message
+
+
+def connect(token):
+    return WebsocketCommunicator(
+        application,
+        f'/ws/chat/?token={token}',
+        headers=[(b'origin', b'http://localhost')]
+    )
+
+
+@pytest.mark.django_db
+def test_websocket_rejects_anonymous_user():
+    async def scenario():
+        communicator = connect('not-a-token')
+        connected, _ = await communicator.connect()
+        return connected
+
+    # Action / Validation
+    assert async_to_sync(scenario)() is False
+
+
+@pytest.mark.django_db
+def test_websocket_receives_message_events(auth_client, get_token):
+    # Setup
+    api_client, user = auth_client
+    chatroom = ChatRoom.objects.create(name="Test Chatroom", type=ChatRoom.GROUP)
+    chatroom.members.add(user)
+    url = reverse('chatroom_messages', args=[chatroom.id])
+    token = get_token(user)['access']
+
+    async def scenario():
+        communicator = connect(token)
+        connected, _ = await communicator.connect()
+        assert connected
+
+        response = await sync_to_async(api_client.post)(url, {"content": "Hello"}, format='json')
+        created = await communicator.receive_json_from()
+
+        message = await sync_to_async(Message.objects.get)()
+        await sync_to_async(api_client.delete)(reverse('message_detail', args=[message.id]))
+        deleted = await communicator.receive_json_from()
+
+        await communicator.disconnect()
+        return response, created, deleted
+
+    # Action
+    response, created, deleted = async_to_sync(scenario)()
+
+    # Validation
+    assert created == {'type': 'message.created', 'message': response.data}
+    assert deleted['type'] == 'message.deleted'
+    assert deleted['message'] == {'id': response.data['id'], 'chatroom': chatroom.id}
+
+
+@pytest.mark.django_db
+def test_websocket_joins_new_chatroom(auth_client, get_token):
+    # Setup
+    api_client, user = auth_client
+    token = get_token(user)['access']
+
+    async def scenario():
+        communicator = connect(token)
+        connected, _ = await communicator.connect()
+        assert connected
+
+        response = await sync_to_async(api_client.post)(
+            reverse('chatrooms_list'),
+            {"name": "New Chatroom", "type": ChatRoom.GROUP, "member_ids": []},
+            format='json'
+        )
+        joined = await communicator.receive_json_from()
+
+        await sync_to_async(api_client.post)(
+            reverse('chatroom_messages', args=[response.data['id']]),
+            {"content": "Hello"},
+            format='json'
+        )
+        created = await communicator.receive_json_from()
+
+        await communicator.disconnect()
+        return response, joined, created
+
+    # Action
+    response, joined, created = async_to_sync(scenario)()
+
+    # Validation
+    assert joined == {'type': 'chatroom.joined', 'chatroom': response.data['id']}
+    assert created['message']['content'] == "Hello"
@@ -0,0 +1,84 @@
+import io
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.contrib.auth.models import User
+from ..activity import mark_read
+from ..models import ChatMembership, ChatRoom, Message
+
+
+def _generate(**options):
+    call_command('generate_chat_data', stdout=io.StringIO(), **options)
+
+
+@pytest.mark.django_db
+def test_generate_chat_data_creates_requested_volumes():
+    # Action
+    _generate(users=50, rooms=10, messages=500, chunk_size=64, seed=7)
+
+    # Validation
+    assert User.objects.count() == 50
+    assert ChatRoom.objects.count() == 10
+    assert ChatRoom.objects.filter(type=ChatRoom.PERSONAL).count() == 3
+    assert ChatRoom.objects.filter(type=ChatRoom.PERSONAL, personal_key__isnull=False).count() == 3
+    assert Message.objects.count() == 500
+    assert User.objects.first().check_password('password')
+
+    sizes = sorted(
+        (room.members.count() for room in ChatRoom.objects.filter(type=ChatRoom.GROUP)),
+        reverse=True
+    )
+    assert sizes[0] == 50
+    assert sizes[-1] < sizes[0]
+
+    # Every author belongs to the room they wrote in
+    memberships = set(ChatMembership.objects.values_list('user_id', 'chatroom_id'))
+    assert set(Message.objects.values_list('user_id', 'chatroom_id')) <= memberships
+
+
+@pytest.mark.django_db
+def test_generate_chat_data_fills_in_activity_summaries():
+    # Action
+    _generate(users=20, rooms=5, messages=300, chunk_size=50, seed=1)
+
+    # Validation
+    timestamps = list(Message.objects.order_by('id').values_list('timestamp', flat=True))
+    assert timestamps == sorted(timestamps)
+
+    for room in ChatRoom.objects.all():
+        latest = Message.objects.filter(chatroom=room).order_by('-timestamp', '-id').first()
+        assert room.message_count == Message.objects.filter(chatroom=room).count()
+        assert room.last_message_id == (latest.id if latest else None)
+        if latest:
+            assert room.last_activity_at == latest.timestamp
+    assert not ChatMembership.objects.filter(unread_count__gt=0).exists()
+
+
+@pytest.mark.django_db
+def test_generate_chat_data_leaves_existing_rooms_alone(create_user):
+    # Setup
+    user = create_user(username='existing', password='testpassword')
+    other = create_user(username='other', password='testpassword')
+    chatroom = ChatRoom.objects.create(name="Existing", type=ChatRoom.GROUP)
+    chatroom.members.add(user, other)
+    first = Message.objects.create(user=other, chatroom=chatroom, content="Read")
+    Message.objects.create(user=other, chatroom=chatroom, content="Unread")
+    mark_read(ChatMembership.objects.get(chatroom=chatroom, user=user), first)
+
+    # Action
+    _generate(users=10, rooms=3, messages=50, seed=3, username_prefix='more')
+
+    # Validation
+    membership = ChatMembership.objects.get(chatroom=chatroom, user=user)
+    assert membership.last_read_message_id == first.id
+    assert membership.unread_count == 1
+
+
+@pytest.mark.django_db
+def test_generate_chat_data_rejects_bad_options():
+    # Action / Validation
+    with pytest.raises(CommandError):
+        _generate(users=1)
+    with pytest.raises(CommandError):
+        _generate(burstiness=2)
@@ -0,0 +1,82 @@
+import io
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+import pytest
+from django.urls import reverse
+from django.utils.translation import gettext_lazy
+from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from .. import parsers, renderers
+from ..models import ChatRoom
+
+
+PAYLOAD = {
+    'utc': datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=dt_timezone.utc),
+    'offset': datetime(2024, 5, 1, 12, 30, tzinfo=dt_timezone(timedelta(hours=2))),
+    'naive': datetime(2024, 5, 1, 12, 30),
+    'price': Decimal('12.50'),
+    'lazy': gettext_lazy('Chatroom'),
+    'text': 'héllo 世界 \u2028\u2029 "quoted"',
+    'counts': {1: 2},
+    'nested': [None, True, 1.5, {'empty': []}],
+}
+
+
+def test_renderer_matches_stdlib_renderer():
+    # Action
+    rendered = renderers.FastJSONRenderer().render(PAYLOAD)
+
+    # Validation
+    assert rendered == JSONRenderer().render(PAYLOAD)
+
+
+def test_renderer_without_orjson(monkeypatch):
+    # Setup
+    monkeypatch.setattr(renderers, 'orjson', None)
+
+    # Action
+    rendered = renderers.FastJSONRenderer().render(PAYLOAD)
+
+    # Validation
+    assert rendered == JSONRenderer().render(PAYLOAD)
+
+
+def test_renderer_honours_indent():
+    # Action
+    rendered = renderers.FastJSONRenderer().render({'a': 1}, 'application/json; indent=2')
+
+    # Validation
+    assert rendered == b'{\n  "a": 1\n}'
+
+
+@pytest.mark.parametrize('orjson', [parsers.orjson, None])
+def test_parser(monkeypatch, orjson):
+    # Setup
+    monkeypatch.setattr(parsers, 'orjson', orjson)
+    parser = parsers.FastJSONParser()
+
+    # Action
+    data = parser.parse(io.BytesIO('{"content": "héllo", "n": [1, 2.5]}'.encode()))
+
+    # Validation
+    assert data == {'content': 'héllo', 'n': [1, 2.5]}
+    with pytest.raises(ParseError):
+        parser.parse(io.BytesIO(b'{"content": NaN}'))
+
+
+@pytest.mark.django_db
+def test_malformed_body_is_rejected(auth_client):
+    # Setup
+    api_client, user = auth_client
+    chatroom = ChatRoom.objects.create(name="Chatroom", type=ChatRoom.GROUP)
+    chatroom.members.add(user)
+    url = reverse('chatroom_messages', args=[chatroom.id])
+
+    # Action
+    response = api_client.post(url, '{"content": ', content_type='application/json')
+
+    # Validation
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.data['detail'].startswith('JSON parse error')
@@ -0,0 +1,123 @@
+import pytest
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from ..membership import _member_key, get_version, is_member
+from ..models import ChatRoom, ChatMembership
+
+
+@pytest.mark.django_db
+def test_is_member_caches_positive_lookups(django_assert_num_queries):
+    # Setup
+    user = User.objects.create(username="member", email="member@example.com")
+    chatroom = ChatRoom.objects.create(name="Test Chatroom", type=ChatRoom.GROUP)
+    ChatMembership.objects.create(user=user, chatroom=chatroom)
+
+    # Action / Validation
+    with django_assert_num_queries(1):
+        assert is_member(chatroom.id, user.id)
+    with django_assert_num_queries(0):
+        assert is_member(chatroom.id, user.id)
+
+
+@pytest.mark.django_db
+def test_is_member_caches_negative_lookups(django_assert_num_queries):
+    # Setup
+    user = User.objects.create(username="outsider", email="outsider@example.com")
+    chatroom = ChatRoom.objects.create(name="Test Chatroom", type=ChatRoom.GROUP)
+
+    # Action / Validation
+    with django_assert_num_queries(1):
+        assert not is_member(chatroom.id, user.id)
+    with django_assert_num_queries(0):
+        assert not is_member(chatroom.id, user.id)
+
+
+@pytest.mark.django_db
+def test_is_member_answers_for_many_users_stay_cached(django_assert_num_queries):
+    # Setup
+    users = User.objects.bulk_create([User(username=f"user{i}") for i in range(1000)])
+    chatroom = ChatRoom.objects.create(name="Test Chatroom", type=ChatRoom.GROUP)
+    ChatMembership.objects.bulk_create([ChatMembership(user=user, chatroom=chatroom) for user in users])
+
+    # Action
+    for user in users:
+        is_member(chatroom.id, user.id)
+
+    # Validation
+    with django_assert_num_queries(0):
+        assert all(is_member(chatroom.id, user.id) for user in users)
+
+
+@pytest.mark.django_db
+def test_membership_version_outlives_default_cache():
+    # Setup
+    chatroom = ChatRoom.objects.create(name="Test Chatroom", type=ChatRoom.GROUP)
+    version = get_version(chatroom.id)
+
+    # Action
+    cache.clear()
+
+    # Validation
+    assert get_version(chatroom.id) == version
+
+
+@pytest.mark.django_db
+def test_is_member_invalidated_by_membership_create():
+    # Setup
+    user = User.objects.create(username="joiner", email="joiner@example.com")
+    chatroom = ChatRoom.objects.create(name="Test Chatroom", type=ChatRoom.GROUP)
+    assert not is_member(chatroom.id, user.id)
+
+    # Action
+    ChatMembership.objects.create(user=user, chatroom=chatroom)
+
+    # Validation
+    assert is_member(chatroom.id, user.id)
+
+
+@pytest.mark.django_db
+def test_is_member_invalidated_by_membership_delete():
+    # Setup
+    user = User.objects.create(username="member", email="member@example.com")
+    chatroom = ChatRoom.objects.create(name="Test Chatroom", type=ChatRoom.GROUP)
+    membership = ChatMembership.objects.create(user=user, chatroom=chatroom)
+    assert is_member(chatroom.id, user.id)
+
+    # Action
+    membership.delete()
+
+    # Validation
+    assert not is_member(chatroom.id, user.id)
+
+
+@pytest.mark.django_db
+def test_is_member_invalidated_by_members_remove():
+    # Setup
+    user = User.objects.create(username="member", email="member@example.com")
+    chatroom = ChatRoom.objects.create(name="Test Chatroom", type=ChatRoom.GROUP)
+    chatroom.members.add(user)
+    assert is_member(chatroom.id, user.id)
+
+    # Action
+    chatroom.members.remove(user)
+
+    # Validation
+    assert not is_member(chatroom.id, user.id)
+
+
+@pytest.mark.django_db
+def test_is_member_not_poisoned_by_reader_during_removal(django_capture_on_commit_callbacks):
+    # Setup
+    user = User.objects.create(username="member", email="member@example.com")
+    chatroom = ChatRoom.objects.create(name="Test Chatroom", type=ChatRoom.GROUP)
+    membership = ChatMembership.objects.create(user=user, chatroom=chatroom)
+
+    # Action
+    with django_capture_on_commit_callbacks(execute=True):
+        membership.delete()
+        # A reader on another connection does not see the delete yet and
+        # caches the old answer under the version it finds
+        cache.set(_member_key(chatroom.id, get_version(chatroom.id), user.id), True)
+
+    # Validation
+    assert not is_member(chatroom.id, user.id)
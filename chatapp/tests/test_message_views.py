@@ -3,6 +3,7 @@ from django.urls import reverse
 from rest_framework import status
 from django.contrib.auth.models import User
 from ..models import ChatRoom, Message
+from ..pagination import _message_page_queryset, message_cursor
 
 
 @pytest.mark.django_db
@@ -19,7 +20,7 @@ def test_create_message(auth_client):
     response = api_client.post(url, data, format='json')
     chatroom = ChatRoom.objects.get()
 
-    url = reverse('create_message', args=[chatroom.id])
+    url = reverse('chatroom_messages', args=[chatroom.id])
     data = {
         "content": "Test message",
     }
@@ -41,7 +42,7 @@ def test_create_message(auth_client):
 def test_create_message_chatroom_does_not_exist(auth_client):
     # Setup
     api_client, _ = auth_client
-    url = reverse('create_message', args=[1])
+    url = reverse('chatroom_messages', args=[1])
     data = {
         "content": "Test message"
     }
@@ -62,7 +63,7 @@ def test_create_message_user_not_member(auth_client):
         type=ChatRoom.GROUP
     )
 
-    url = reverse('create_message', args=[chatroom.id])
+    url = reverse('chatroom_messages', args=[chatroom.id])
     data = {
         "content": "Test message"
     }
@@ -181,3 +182,178 @@ def test_delete_message(auth_client):
     # Validation
     assert response.status_code == status.HTTP_204_NO_CONTENT
     assert Message.objects.count() == 0
+
+
+@pytest.mark.django_db
+def test_list_messages_pages_backwards(auth_client):
+    # Setup
+    api_client, user = auth_client
+    chatroom = ChatRoom.objects.create(
+        name="Test Chatroom",
+        type=ChatRoom.GROUP
+    )
+    chatroom.members.add(user)
+    messages = [
+        Message.objects.create(user=user, chatroom=chatroom, content=f"Message {i}")
+        for i in range(5)
+    ]
+    url = reverse('chatroom_messages', args=[chatroom.id])
+
+    # Action
+    first_page = api_client.get(url, {'limit': 2})
+    second_page = api_client.get(url, {'limit': 2, 'before': first_page.data['before']})
+    last_page = api_client.get(url, {'limit': 2, 'before': second_page.data['before']})
+
+    # Validation
+    assert first_page.status_code == status.HTTP_200_OK
+    assert [m['id'] for m in first_page.data['messages']] == [m.id for m in messages[3:]]
+    assert [m['id'] for m in second_page.data['messages']] == [m.id for m in messages[1:3]]
+    assert [m['id'] for m in last_page.data['messages']] == [messages[0].id]
+    assert last_page.data['before'] is None
+
+
+@pytest.mark.django_db
+def test_list_messages_after_cursor(auth_client):
+    # Setup
+    api_client, user = auth_client
+    chatroom = ChatRoom.objects.create(
+        name="Test Chatroom",
+        type=ChatRoom.GROUP
+    )
+    chatroom.members.add(user)
+    Message.objects.create(user=user, chatroom=chatroom, content="Old message")
+    url = reverse('chatroom_messages', args=[chatroom.id])
+    after = api_client.get(url).data['after']
+    new_message = Message.objects.create(user=user, chatroom=chatroom, content="New message")
+
+    # Action
+    response = api_client.get(url, {'after': after})
+
+    # Validation
+    assert response.status_code == status.HTTP_200_OK
+    assert [m['id'] for m in response.data['messages']] == [new_message.id]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('direction, bound', [('before', 'timestamp<?'), ('after', 'timestamp>?')])
+def test_list_messages_cursor_seeks_the_index(auth_client, direction, bound):
+    # Setup
+    _, user = auth_client
+    chatroom = ChatRoom.objects.create(name="Test Chatroom", type=ChatRoom.GROUP)
+    Message.objects.bulk_create([
+        Message(user=user, chatroom=chatroom, content=f"Message {i}") for i in range(100)
+    ])
+    cursor = message_cursor(Message.objects.order_by('id')[50])
+    pages = {'before': None, 'after': None, direction: cursor}
+
+    # Action
+    plan = _message_page_queryset(Message.objects.filter(chatroom=chatroom), limit=20, **pages).explain()
+
+    # Validation
+    # A deep page starts at the cursor instead of scanning to it
+    assert f'(chatroom_id=? AND {bound})' in plan
+
+
+@pytest.mark.django_db
+def test_list_messages_invalid_cursor(auth_client):
+    # Setup
+    api_client, user = auth_client
+    chatroom = ChatRoom.objects.create(
+        name="Test Chatroom",
+        type=ChatRoom.GROUP
+    )
+    chatroom.members.add(user)
+    url = reverse('chatroom_messages', args=[chatroom.id])
+
+    # Action
+    response = api_client.get(url, {'before': 'not-a-cursor'})
+
+    # Validation
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+def test_list_messages_user_not_member(auth_client):
+    # Setup
+    api_client, _ = auth_client
+    chatroom = ChatRoom.objects.create(
+        name="Test Chatroom",
+        type=ChatRoom.GROUP
+    )
+    url = reverse('chatroom_messages', args=[chatroom.id])
+
+    # Action
+    response = api_client.get(url)
+
+    # Validation
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.django_db
+def test_create_messages_batch(auth_client):
+    # Setup
+    api_client, user = auth_client
+    chatroom = ChatRoom.objects.create(name="Test Chatroom", type=ChatRoom.GROUP)
+    other_chatroom = ChatRoom.objects.create(name="Other Chatroom", type=ChatRoom.GROUP)
+    chatroom.members.add(user)
+    url = reverse('create_messages_batch')
+    data = {
+        "messages": [
+            {"chatroom": chatroom.id, "content": "First"},
+            {"chatroom": other_chatroom.id, "content": "Not a member"},
+            {"chatroom": chatroom.id, "content": "Second"},
+            {"chatroom": other_chatroom.id + 100, "content": "No such chatroom"},
+            {"chatroom": chatroom.id},
+        ]
+    }
+
+    # Action
+    response = api_client.post(url, data, format='json')
+    chatroom.refresh_from_db()
+
+    # Validation
+    assert response.status_code == status.HTTP_207_MULTI_STATUS
+    assert [result['status'] for result in response.data['results']] == [
+        status.HTTP_201_CREATED,
+        status.HTTP_403_FORBIDDEN,
+        status.HTTP_201_CREATED,
+        status.HTTP_404_NOT_FOUND,
+        status.HTTP_400_BAD_REQUEST,
+    ]
+    assert response.data['results'][2]['message']['content'] == "Second"
+    assert Message.objects.count() == 2
+    assert chatroom.message_count == 2
+    assert chatroom.last_message_id == response.data['results'][2]['message']['id']
+
+
+@pytest.mark.django_db
+def test_create_messages_batch_query_count(auth_client, django_assert_num_queries):
+    # Setup
+    api_client, user = auth_client
+    chatroom = ChatRoom.objects.create(name="Test Chatroom", type=ChatRoom.GROUP)
+    chatroom.members.add(user)
+    url = reverse('create_messages_batch')
+    data = {"messages": [{"chatroom": chatroom.id, "content": f"Message {i}"} for i in range(100)]}
+
+    # Action
+    # Auth, chatroom lookup, membership, insert, activity summary and
+    # unread counts, plus the transaction savepoints
+    with django_assert_num_queries(8):
+        response = api_client.post(url, data, format='json')
+
+    # Validation
+    assert response.status_code == status.HTTP_201_CREATED
+    assert Message.objects.count() == 100
+
+
+@pytest.mark.django_db
+def test_create_messages_batch_rejects_empty_batch(auth_client):
+    # Setup
+    api_client, _ = auth_client
+    url = reverse('create_messages_batch')
+
+    # Action
+    response = api_client.post(url, {"messages": []}, format='json')
+
+    # Validation
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
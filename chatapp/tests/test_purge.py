@@ -0,0 +1,133 @@
+import io
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from ..activity import mark_read
+from ..models import ChatMembership, ChatRoom, Message, UserTombstone
+
+
+def _purge(**options):
+    call_command('purge_tombstones', stdout=io.StringIO(), **options)
+
+
+@pytest.mark.django_db
+def test_delete_chatroom_hides_it_until_purged(auth_client, create_user):
+    # Setup
+    api_client, user = auth_client
+    other = create_user(username='other', password='testpassword')
+    chatroom = ChatRoom.objects.create(name="Doomed", type=ChatRoom.GROUP)
+    chatroom.members.add(user, other)
+    for i in range(5):
+        Message.objects.create(user=other, chatroom=chatroom, content=f"Message {i}")
+    url = reverse('chatrooms_detail', args=[chatroom.id])
+
+    # Action
+    response = api_client.delete(url)
+    hidden = api_client.get(url)
+    listed = api_client.get(reverse('chatrooms_list'))
+    found = api_client.get(reverse('search_messages'), {'q': 'message'})
+    left_behind = Message.objects.filter(chatroom_id=chatroom.id).count()
+    _purge(batch_size=2)
+
+    # Validation
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    assert hidden.status_code == status.HTTP_404_NOT_FOUND
+    assert listed.data['chatrooms'] == []
+    assert found.data['results'] == []
+    assert left_behind == 5
+    assert not ChatRoom.all_objects.filter(id=chatroom.id).exists()
+    assert not Message.objects.filter(chatroom_id=chatroom.id).exists()
+    assert not ChatMembership.objects.filter(chatroom_id=chatroom.id).exists()
+
+
+@pytest.mark.django_db
+def test_messages_of_deleted_chatroom_cannot_be_changed(auth_client):
+    # Setup
+    api_client, user = auth_client
+    chatroom = ChatRoom.objects.create(name="Doomed", type=ChatRoom.GROUP)
+    chatroom.members.add(user)
+    message = Message.objects.create(user=user, chatroom=chatroom, content="Original")
+    api_client.delete(reverse('chatrooms_detail', args=[chatroom.id]))
+    url = reverse('message_detail', args=[message.id])
+
+    # Action
+    updated = api_client.put(url, {'content': "Edited"}, format='json')
+    deleted = api_client.delete(url)
+
+    # Validation
+    assert updated.status_code == status.HTTP_404_NOT_FOUND
+    assert deleted.status_code == status.HTTP_404_NOT_FOUND
+    assert Message.objects.get(id=message.id).content == "Original"
+
+
+@pytest.mark.django_db
+def test_deleted_user_messages_hidden_until_purged(auth_client, create_user, get_token):
+    # Setup
+    api_client, user = auth_client
+    reader = create_user(username='reader', password='testpassword')
+    chatroom = ChatRoom.objects.create(name="Survivor", type=ChatRoom.GROUP)
+    chatroom.members.add(user, reader)
+    kept = Message.objects.create(user=reader, chatroom=chatroom, content="Kept message")
+    Message.objects.create(user=user, chatroom=chatroom, content="Gone message")
+    reader_client = APIClient()
+    reader_client.credentials(HTTP_AUTHORIZATION='Bearer ' + get_token(reader)['access'])
+
+    # Action
+    api_client.delete(reverse('users'))
+    history = reader_client.get(reverse('chatroom_messages', args=[chatroom.id]))
+    detail = reader_client.get(reverse('chatrooms_detail', args=[chatroom.id]))
+    found = reader_client.get(reverse('search_messages'), {'q': 'message'})
+    export = reader_client.get(reverse('chatroom_export', args=[chatroom.id]))
+    exported = b''.join(export.streaming_content).decode().splitlines()
+    inbox = reader_client.get(reverse('inbox'))
+
+    # Validation
+    assert [message['id'] for message in history.data['messages']] == [kept.id]
+    assert [message['id'] for message in detail.data['messages']] == [kept.id]
+    assert [message['id'] for message in found.data['results']] == [kept.id]
+    assert len(exported) == 1
+    assert inbox.data['chatrooms'][0]['last_message']['id'] == kept.id
+    assert Message.objects.filter(user_id=user.id).exists()
+
+
+@pytest.mark.django_db
+def test_purged_user_leaves_room_summaries_right(auth_client, create_user, get_token):
+    # Setup
+    api_client, user = auth_client
+    other = create_user(username='other', password='testpassword')
+    reader = create_user(username='reader', password='testpassword')
+    chatroom = ChatRoom.objects.create(name="Survivor", type=ChatRoom.GROUP)
+    chatroom.members.add(user, other, reader)
+    kept_first = Message.objects.create(user=other, chatroom=chatroom, content="First")
+    read = Message.objects.create(user=user, chatroom=chatroom, content="Read")
+    Message.objects.create(user=user, chatroom=chatroom, content="Unread")
+    kept_last = Message.objects.create(user=other, chatroom=chatroom, content="Last")
+    mark_read(ChatMembership.objects.get(chatroom=chatroom, user=reader), read)
+    reader_client = APIClient()
+    reader_client.credentials(HTTP_AUTHORIZATION='Bearer ' + get_token(reader)['access'])
+
+    # Action
+    response = api_client.delete(reverse('users'))
+    listed = {row['id'] for row in reader_client.get(reverse('list_users')).data}
+    _purge(batch_size=1)
+
+    # Validation
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    assert user.id not in listed
+    assert not User.objects.filter(id=user.id).exists()
+    assert not UserTombstone.objects.exists()
+    chatroom = ChatRoom.objects.get(id=chatroom.id)
+    assert chatroom.message_count == 2
+    assert chatroom.last_message_id == kept_last.id
+    memberships = {
+        membership.user_id: membership for membership in ChatMembership.objects.filter(chatroom=chatroom)
+    }
+    assert set(memberships) == {other.id, reader.id}
+    assert memberships[other.id].unread_count == 0
+    # The reader's cursor falls back to the message before the deleted one
+    assert memberships[reader.id].last_read_message_id == kept_first.id
+    assert memberships[reader.id].unread_count == 1
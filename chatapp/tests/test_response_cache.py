@@ -0,0 +1,105 @@
+import pytest
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from .. import response_cache
+from ..models import ChatRoom
+
+
+def _responses_cache(backend, location, **options):
+    return {
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        'responses': {'BACKEND': backend, 'LOCATION': location, 'OPTIONS': options},
+    }
+
+
+@pytest.mark.django_db
+def test_member_lists_are_cached_until_membership_changes(auth_client, create_user):
+    # Setup
+    api_client, user = auth_client
+    chatroom = ChatRoom.objects.create(name="Chatroom", type=ChatRoom.GROUP)
+    chatroom.members.add(user)
+    url = reverse('chatrooms_list')
+    api_client.get(url)
+
+    # Action
+    cached = api_client.get(url)
+    chatroom.members.add(create_user(username='newcomer', password='testpassword'))
+    refreshed = api_client.get(url)
+
+    # Validation
+    assert [m['username'] for m in cached.data['chatrooms'][0]['members']] == [user.username]
+    assert [m['username'] for m in refreshed.data['chatrooms'][0]['members']] == [user.username, 'newcomer']
+    assert response_cache.stats()['hits'] == 1
+    assert response_cache.stats()['misses'] == 2
+
+
+@pytest.mark.django_db
+def test_user_list_follows_profile_changes(auth_client):
+    # Setup
+    api_client, user = auth_client
+    url = reverse('list_users')
+    api_client.get(url)
+
+    # Action
+    api_client.put(reverse('users'), {"email": "changed@example.com"}, format='json')
+    response = api_client.get(url)
+
+    # Validation
+    assert response.data[0]['email'] == "changed@example.com"
+    assert response_cache.stats() == {'hits': 0, 'misses': 2, 'hit_rate': 0.0}
+
+
+@pytest.mark.django_db
+def test_file_based_backend(auth_client, tmp_path):
+    # Setup
+    api_client, user = auth_client
+    url = reverse('list_users')
+    backend = 'django.core.cache.backends.filebased.FileBasedCache'
+
+    # Action
+    with override_settings(CACHES=_responses_cache(backend, str(tmp_path))):
+        first = api_client.get(url)
+        second = api_client.get(url)
+
+    # Validation
+    assert first.data == second.data == [{'id': user.id, 'username': user.username, 'email': user.email}]
+    assert response_cache.stats()['hits'] == 1
+    assert list(tmp_path.iterdir())
+
+
+def test_entries_are_evicted_when_full():
+    # Setup
+    backend = 'django.core.cache.backends.locmem.LocMemCache'
+    built = []
+
+    def build(key):
+        built.append(key)
+        return key
+
+    # Action
+    with override_settings(CACHES=_responses_cache(backend, 'eviction', MAX_ENTRIES=2, CULL_FREQUENCY=2)):
+        for key in ('a', 'b', 'c', 'c', 'a'):
+            response_cache.get_or_build(key, lambda: build(key))
+
+    # Validation
+    # Storing 'c' culled the oldest entry
+    assert built == ['a', 'b', 'c', 'a']
+
+
+@pytest.mark.django_db
+def test_cache_stats_is_staff_only(auth_client):
+    # Setup
+    api_client, user = auth_client
+    url = reverse('cache_stats')
+
+    # Action
+    forbidden = api_client.get(url)
+    user.is_staff = True
+    user.save()
+    allowed = api_client.get(url)
+
+    # Validation
+    assert forbidden.status_code == status.HTTP_403_FORBIDDEN
+    assert allowed.status_code == status.HTTP_200_OK
+    assert set(allowed.data) == {'hits', 'misses', 'hit_rate'}
@@ -0,0 +1,159 @@
+import io
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.urls import reverse
+from rest_framework import status
+from django.contrib.auth.models import User
+from .. import search
+from ..models import ChatRoom, Message
+
+
+@pytest.fixture
+def chatroom(auth_client):
+    _, user = auth_client
+    chatroom = ChatRoom.objects.create(name="Test Chatroom", type=ChatRoom.GROUP)
+    chatroom.members.add(user)
+    return chatroom
+
+
+@pytest.mark.django_db
+def test_search_messages_ranked_with_snippets(auth_client, chatroom):
+    # Setup
+    api_client, user = auth_client
+    Message.objects.create(user=user, chatroom=chatroom, content="the deploy went fine")
+    best = Message.objects.create(user=user, chatroom=chatroom, content="deploy deploy deploy")
+    Message.objects.create(user=user, chatroom=chatroom, content="lunch anyone?")
+    url = reverse('search_messages')
+
+    # Action
+    response = api_client.get(url, {'q': 'deploy'})
+
+    # Validation
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.data['results']) == 2
+    assert response.data['results'][0]['id'] == best.id
+    assert '<mark>deploy</mark>' in response.data['results'][0]['snippet']
+    assert response.data['next'] is None
+
+
+@pytest.mark.django_db
+def test_search_snippets_escape_message_html(auth_client, chatroom):
+    # Setup
+    api_client, user = auth_client
+    Message.objects.create(user=user, chatroom=chatroom, content='<img src=x onerror=alert(1)> hello there')
+
+    # Action
+    response = api_client.get(reverse('search_messages'), {'q': 'hello'})
+
+    # Validation
+    assert response.data['results'][0]['snippet'] == (
+        '&lt;img src=x onerror=alert(1)&gt; <mark>hello</mark> there'
+    )
+
+
+@pytest.mark.django_db
+def test_search_messages_scoped_to_own_chatrooms(auth_client, chatroom):
+    # Setup
+    api_client, user = auth_client
+    other = User.objects.create(username="other", email="other@example.com")
+    other_chatroom = ChatRoom.objects.create(name="Other Chatroom", type=ChatRoom.GROUP)
+    other_chatroom.members.add(other)
+    Message.objects.create(user=other, chatroom=other_chatroom, content="secret plans")
+    url = reverse('search_messages')
+
+    # Action
+    response = api_client.get(url, {'q': 'secret'})
+
+    # Validation
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['results'] == []
+
+
+@pytest.mark.django_db
+def test_search_index_follows_updates_and_deletes(auth_client, chatroom):
+    # Setup
+    api_client, user = auth_client
+    edited = Message.objects.create(user=user, chatroom=chatroom, content="typo in here")
+    deleted = Message.objects.create(user=user, chatroom=chatroom, content="typo again")
+    url = reverse('search_messages')
+
+    # Action
+    edited.content = "fixed now"
+    edited.save()
+    deleted.delete()
+
+    # Validation
+    assert api_client.get(url, {'q': 'typo'}).data['results'] == []
+    assert [m['id'] for m in api_client.get(url, {'q': 'fix'}).data['results']] == [edited.id]
+
+
+@pytest.mark.django_db
+def test_search_query_syntax_is_escaped(auth_client, chatroom):
+    # Setup
+    api_client, user = auth_client
+    Message.objects.create(user=user, chatroom=chatroom, content="NEAR the OR gate")
+    url = reverse('search_messages')
+
+    # Action
+    response = api_client.get(url, {'q': 'NEAR( "OR'})
+
+    # Validation
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.data['results']) == 1
+
+
+@pytest.mark.django_db
+def test_rebuild_message_index(auth_client, chatroom):
+    # Setup
+    api_client, user = auth_client
+    Message.objects.bulk_create([
+        Message(user=user, chatroom=chatroom, content=f"indexed message {i}") for i in range(5)
+    ])
+    with connection.cursor() as cursor:
+        cursor.execute("INSERT INTO chatapp_message_fts(chatapp_message_fts) VALUES ('delete-all')")
+    url = reverse('search_messages')
+    assert api_client.get(url, {'q': 'indexed'}).data['results'] == []
+
+    # Action
+    call_command('rebuild_message_index', batch_size=2, stdout=io.StringIO())
+
+    # Validation
+    assert len(api_client.get(url, {'q': 'indexed'}).data['results']) == 5
+
+
+@pytest.mark.django_db
+def test_rebuild_message_index_follows_writes_between_batches(auth_client, chatroom):
+    # Setup
+    api_client, user = auth_client
+    messages = Message.objects.bulk_create([
+        Message(user=user, chatroom=chatroom, content=f"before {i}") for i in range(6)
+    ])
+    url = reverse('search_messages')
+    searched_during = []
+
+    def write(indexed):
+        if indexed != 2:
+            return
+        # One batch in: the first two rows are in the new index, the
+        # rest are not
+        Message.objects.create(user=user, chatroom=chatroom, content="during new")
+        Message.objects.filter(id=messages[0].id).update(content="during edited indexed")
+        Message.objects.filter(id=messages[4].id).update(content="during edited pending")
+        Message.objects.filter(id=messages[5].id).delete()
+        searched_during.append(len(api_client.get(url, {'q': 'before'}).data['results']))
+
+    # Action
+    indexed = search.rebuild_index(2, progress=write)
+
+    # Validation
+    assert searched_during == [3]
+    assert indexed == 4
+    with connection.cursor() as cursor:
+        # Raises if the index and the messages table disagree
+        cursor.execute("INSERT INTO chatapp_message_fts(chatapp_message_fts, rank) VALUES ('integrity-check', 1)")
+        cursor.execute("SELECT COUNT(*) FROM chatapp_message_fts_docsize")
+        assert cursor.fetchone() == (6,)
+    assert len(api_client.get(url, {'q': 'during'}).data['results']) == 3
+    assert len(api_client.get(url, {'q': 'before'}).data['results']) == 3
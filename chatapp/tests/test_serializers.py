@@ -0,0 +1,48 @@
+from datetime import datetime, timezone as dt_timezone
+
+import pytest
+from django.contrib.auth.models import User
+from django.test import override_settings
+from rest_framework.renderers import JSONRenderer
+from ..models import ChatRoom, Message
+from ..serializers import (
+    MESSAGE_ROW_FIELDS, USER_ROW_FIELDS, MessageSerializer, UserListSerializer, message_rows, user_rows
+)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('time_zone', ['UTC', 'Europe/Paris'])
+def test_message_rows_match_serializer(create_user, time_zone):
+    # Setup
+    user = create_user(username='author', password='testpassword')
+    chatroom = ChatRoom.objects.create(name="Chatroom", type=ChatRoom.GROUP)
+    Message.objects.bulk_create([
+        Message(user=user, chatroom=chatroom, content='héllo "world"'),
+        Message(user=user, chatroom=chatroom, content=''),
+    ])
+    # One timestamp with microseconds and one without
+    Message.objects.filter(content='').update(timestamp=datetime(2024, 1, 1, tzinfo=dt_timezone.utc))
+    messages = Message.objects.order_by('id')
+
+    # Action
+    with override_settings(TIME_ZONE=time_zone):
+        expected = JSONRenderer().render(MessageSerializer(messages, many=True).data)
+        rendered = JSONRenderer().render(message_rows(messages.values(*MESSAGE_ROW_FIELDS)))
+
+    # Validation
+    assert rendered == expected
+
+
+@pytest.mark.django_db
+def test_user_rows_match_serializer(create_user):
+    # Setup
+    create_user(username='alice', email='alice@example.com', password='testpassword')
+    create_user(username='bob', password='testpassword')
+    users = User.objects.order_by('id')
+
+    # Action
+    expected = JSONRenderer().render(UserListSerializer(users, many=True).data)
+    rendered = JSONRenderer().render(user_rows(users.values(*USER_ROW_FIELDS)))
+
+    # Validation
+    assert rendered == expected
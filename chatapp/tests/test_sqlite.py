@@ -0,0 +1,50 @@
+import pytest
+from django.db import connection
+from django.test import override_settings
+from ..sqlite import configure_connection, get_pragmas
+
+
+def _pragma(name):
+    with connection.cursor() as cursor:
+        cursor.execute(f'PRAGMA {name}')
+        return cursor.fetchone()[0]
+
+
+@pytest.mark.django_db
+def test_new_connections_get_default_pragmas():
+    # Validation
+    assert _pragma('busy_timeout') == 5000
+    assert _pragma('cache_size') == -64 * 1024
+
+
+def test_wal_is_opt_in():
+    # Action
+    default = get_pragmas()
+    with override_settings(SQLITE_WAL=True):
+        wal = get_pragmas()
+    with override_settings(SQLITE_WAL=True, SQLITE_PRAGMAS={'synchronous': 'full'}):
+        overridden = get_pragmas()
+
+    # Validation
+    assert 'journal_mode' not in default
+    assert wal['journal_mode'] == 'wal'
+    assert wal['synchronous'] == 'normal'
+    assert overridden['synchronous'] == 'full'
+
+
+@pytest.mark.django_db
+def test_pragmas_are_configurable():
+    # Setup
+    pragmas = {'busy_timeout': 250, 'cache_size': None}
+
+    # Action
+    with override_settings(SQLITE_PRAGMAS=pragmas):
+        configure_connection(connection)
+
+    # Validation
+    assert _pragma('busy_timeout') == 250
+    assert _pragma('cache_size') == -64 * 1024
+
+    # Cleanup
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA busy_timeout = 5000')
@@ -0,0 +1,115 @@
+import pytest
+from django.core.signals import request_finished
+from django.db import close_old_connections
+from django.urls import reverse
+from rest_framework import status
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from .. import signals, tokens
+from ..tokens import RefreshToken
+
+
+@pytest.mark.django_db
+def test_login_buffers_outstanding_tokens(auth_client):
+    # Setup
+    api_client, user = auth_client
+    url = reverse('login')
+    data = {"username": user.username, "password": "testpassword"}
+    OutstandingToken.objects.all().delete()
+
+    # Action
+    responses = [api_client.post(url, data, format='json') for _ in range(3)]
+    buffered = OutstandingToken.objects.count()
+    flushed = tokens.flush_outstanding_tokens()
+
+    # Validation
+    assert all(response.status_code == status.HTTP_200_OK for response in responses)
+    assert buffered == 0
+    assert flushed == 3
+    assert OutstandingToken.objects.filter(user=user).count() == 3
+
+
+@pytest.mark.django_db
+def test_outstanding_tokens_flush_when_batch_is_full(create_user, monkeypatch):
+    # Setup
+    monkeypatch.setattr(tokens, 'OUTSTANDING_TOKEN_BATCH_SIZE', 2)
+    user = create_user(username='batchuser', email='batch@example.com', password='testpassword')
+    gone = create_user(username='goneuser', email='gone@example.com', password='testpassword')
+
+    # Action
+    RefreshToken.for_user(gone)
+    gone.delete()
+    RefreshToken.for_user(user)
+
+    # Validation
+    # The deleted user's token is kept without a user, like SET_NULL would
+    assert OutstandingToken.objects.filter(user=user).count() == 1
+    assert OutstandingToken.objects.filter(user__isnull=True).count() == 1
+
+
+def test_outstanding_tokens_flush_before_connections_close():
+    # Action
+    receivers = request_finished._live_receivers(None)[0]
+
+    # Validation
+    assert receivers.index(signals.flush_outstanding_tokens) < receivers.index(close_old_connections)
+
+
+@pytest.mark.django_db
+def test_refresh_skips_blacklist_query_for_valid_tokens(api_client, create_user, django_assert_num_queries):
+    # Setup
+    user = create_user(username='refreshuser', email='refresh@example.com', password='testpassword')
+    refresh = str(RefreshToken.for_user(user))
+    url = reverse('token_refresh')
+    api_client.post(url, {'refresh': refresh}, format='json')
+
+    # Action / Validation
+    # Only the user lookup of TokenRefreshSerializer
+    with django_assert_num_queries(1):
+        response = api_client.post(url, {'refresh': refresh}, format='json')
+    assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+def test_blacklisted_token_is_rejected(
+    api_client, create_user, django_capture_on_commit_callbacks
+):
+    # Setup
+    user = create_user(username='revokeduser', email='revoked@example.com', password='testpassword')
+    revoked = RefreshToken.for_user(user)
+    kept = RefreshToken.for_user(user)
+    url = reverse('token_refresh')
+    api_client.post(url, {'refresh': str(kept)}, format='json')
+
+    # Action
+    with django_capture_on_commit_callbacks(execute=True):
+        revoked.blacklist()
+    tokens.flush_outstanding_tokens()
+    revoked_response = api_client.post(url, {'refresh': str(revoked)}, format='json')
+    kept_response = api_client.post(url, {'refresh': str(kept)}, format='json')
+
+    # Validation
+    assert BlacklistedToken.objects.count() == 1
+    assert revoked_response.status_code == status.HTTP_401_UNAUTHORIZED
+    assert kept_response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+def test_blacklist_from_another_process_is_picked_up(api_client, create_user, monkeypatch):
+    # Setup
+    user = create_user(username='elsewhere', email='elsewhere@example.com', password='testpassword')
+    revoked = RefreshToken.for_user(user)
+    tokens.flush_outstanding_tokens()
+    url = reverse('token_refresh')
+    api_client.post(url, {'refresh': str(revoked)}, format='json')
+    # Blacklisted without the version bump, as when another process has
+    # its own cache
+    BlacklistedToken.objects.bulk_create([
+        BlacklistedToken(token=OutstandingToken.objects.get(jti=revoked['jti']))
+    ])
+
+    # Action
+    monkeypatch.setattr(tokens, 'BLACKLIST_SYNC_INTERVAL', 0)
+    response = api_client.post(url, {'refresh': str(revoked)}, format='json')
+
+    # Validation
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
@@ -1,7 +1,9 @@
 import pytest
 from django.urls import reverse
 from rest_framework import status
+from rest_framework.test import APIClient
 from django.contrib.auth.models import User
+from ..models import ChatRoom, Message, UserTombstone
 
 
 @pytest.mark.django_db
@@ -157,4 +159,126 @@ def test_delete_user(auth_client):
 
     # Validation
     assert response.status_code == status.HTTP_204_NO_CONTENT
-    assert User.objects.count() == 0
+    # Deactivated at once, removed by the purger
+    assert not User.objects.get().is_active
+    assert UserTombstone.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_retrieve_user_includes_unread_counts(auth_client):
+    # Setup
+    api_client, user = auth_client
+    other = User.objects.create(username="other", email="other@example.com")
+    chatroom = ChatRoom.objects.create(name="Test Chatroom", type=ChatRoom.GROUP)
+    chatroom.members.add(user, other)
+    Message.objects.create(user=other, chatroom=chatroom, content="Hello")
+    url = reverse('users')
+
+    # Action
+    response = api_client.get(url)
+
+    # Validation
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['chatrooms'][0]['unread_count'] == 1
+
+
+@pytest.mark.django_db
+def test_authenticated_user_is_cached(auth_client, django_assert_num_queries):
+    # Setup
+    api_client, _ = auth_client
+    url = reverse('list_users')
+    api_client.get(url)
+
+    # Action / Validation
+    # Only the ETag's generation lookup; the token's user and the list
+    # itself come from the caches
+    with django_assert_num_queries(1):
+        response = api_client.get(url)
+    assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+def test_user_cache_follows_updates(auth_client):
+    # Setup
+    api_client, user = auth_client
+    url = reverse('users')
+    api_client.get(url)
+
+    # Action
+    api_client.put(url, {"email": "changed@example.com"}, format='json')
+    response = api_client.get(url)
+    user.refresh_from_db()
+
+    # Validation
+    assert response.data['email'] == "changed@example.com"
+    # Saving the cached user must not touch the fields it does not carry
+    assert user.check_password('testpassword')
+
+
+@pytest.mark.django_db
+def test_user_cache_follows_deactivation_and_deletion(auth_client, create_user, get_token):
+    # Setup
+    api_client, user = auth_client
+    url = reverse('users')
+    api_client.get(url)
+    other = create_user(username='otheruser', email='other@example.com', password='testpassword')
+    other_client = APIClient()
+    other_client.credentials(HTTP_AUTHORIZATION='Bearer ' + get_token(other)['access'])
+    other_client.get(url)
+
+    # Action
+    user.is_active = False
+    user.save()
+    deactivated = api_client.get(url)
+    other_client.delete(url)
+    deleted = other_client.get(url)
+
+    # Validation
+    assert deactivated.status_code == status.HTTP_401_UNAUTHORIZED
+    assert deleted.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.django_db
+def test_list_users_etag(auth_client, django_assert_num_queries):
+    # Setup
+    api_client, _ = auth_client
+    url = reverse('list_users')
+    etag = api_client.get(url)['ETag']
+
+    # Action
+    with django_assert_num_queries(1):
+        not_modified = api_client.get(url, HTTP_IF_NONE_MATCH=f'"other", W/{etag}')
+    User.objects.create_user(username='newuser', password='testpassword')
+    modified = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    # Validation
+    assert not_modified.status_code == status.HTTP_304_NOT_MODIFIED
+    assert modified.status_code == status.HTTP_200_OK
+    assert len(modified.data) == 2
+    assert modified['ETag'] != etag
+
+
+@pytest.mark.django_db
+def test_retrieve_user_etag(auth_client, django_assert_num_queries):
+    # Setup
+    api_client, user = auth_client
+    other = User.objects.create_user(username='otheruser', password='testpassword')
+    chatroom = ChatRoom.objects.create(name="Test Chatroom", type=ChatRoom.GROUP)
+    chatroom.members.add(user, other)
+    url = reverse('users')
+    etag = api_client.get(url)['ETag']
+
+    # Action
+    with django_assert_num_queries(1):
+        not_modified = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    Message.objects.create(user=other, chatroom=chatroom, content="Unread")
+    after_message = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    api_client.put(url, {"email": "changed@example.com"}, format='json')
+    after_update = api_client.get(url, HTTP_IF_NONE_MATCH=after_message['ETag'])
+
+    # Validation
+    assert not_modified.status_code == status.HTTP_304_NOT_MODIFIED
+    assert after_message.status_code == status.HTTP_200_OK
+    assert after_message.data['chatrooms'][0]['unread_count'] == 1
+    assert after_update.status_code == status.HTTP_200_OK
+    assert after_update.data['email'] == "changed@example.com"
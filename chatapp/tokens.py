@@ -0,0 +1,161 @@
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import BlacklistMixin, RefreshToken as BaseRefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+from .versions import version_cache
+
+
+OUTSTANDING_TOKEN_BATCH_SIZE = 100
+OUTSTANDING_TOKEN_FLUSH_INTERVAL = 5
+
+BLACKLIST_VERSION_KEY = 'token_blacklist:version'
+# The blacklist is re-read from the table at least this often, so a token
+# blacklisted where the version bump cannot be seen (another process
+# without a shared cache) is rejected within this many seconds
+BLACKLIST_SYNC_INTERVAL = 5
+
+_lock = threading.Lock()
+_pending = []
+_pending_since = None
+_blacklisted = set()
+_blacklist_version = None
+_blacklist_last_id = 0
+_blacklist_synced_at = None
+
+
+def flush_outstanding_tokens(force=True):
+    """
+    Write buffered OutstandingToken rows with one bulk insert.
+
+    Without ``force`` this only flushes once the oldest buffered token has
+    waited OUTSTANDING_TOKEN_FLUSH_INTERVAL seconds, so it is cheap to call
+    after every request.
+    """
+    global _pending, _pending_since
+    with _lock:
+        if not _pending:
+            return 0
+        if not force and time.monotonic() - _pending_since < OUTSTANDING_TOKEN_FLUSH_INTERVAL:
+            return 0
+        rows, _pending, _pending_since = _pending, [], None
+
+    # OutstandingToken.user is SET_NULL, so do the same for users deleted
+    # while their token sat in the buffer
+    existing = set(
+        User.objects.filter(id__in={row.user_id for row in rows}).values_list('id', flat=True)
+    )
+    for row in rows:
+        if row.user_id not in existing:
+            row.user_id = None
+    # blacklist() may already have created the row with get_or_create
+    OutstandingToken.objects.bulk_create(rows, ignore_conflicts=True)
+    return len(rows)
+
+
+def bump_blacklist_version():
+    try:
+        version_cache().incr(BLACKLIST_VERSION_KEY)
+    except ValueError:
+        version_cache().set(BLACKLIST_VERSION_KEY, time.time_ns(), None)
+
+
+def _sync_blacklist():
+    """
+    Bring the in-process set of blacklisted jtis up to date. Costs one
+    cache read, plus one query for the new rows when the version in the
+    cache has moved or BLACKLIST_SYNC_INTERVAL has passed since the last
+    query.
+
+    The version only reaches other processes through a shared cache such
+    as Redis or Memcached. With the default per-process LocMemCache a
+    token blacklisted elsewhere is picked up by the periodic query.
+    """
+    global _blacklist_version, _blacklist_last_id, _blacklist_synced_at
+    version = version_cache().get(BLACKLIST_VERSION_KEY)
+    if version is None:
+        version_cache().add(BLACKLIST_VERSION_KEY, time.time_ns(), None)
+        version = version_cache().get(BLACKLIST_VERSION_KEY)
+    now = time.monotonic()
+    if (
+        version == _blacklist_version
+        and _blacklist_synced_at is not None
+        and now - _blacklist_synced_at < BLACKLIST_SYNC_INTERVAL
+    ):
+        return
+
+    rows = BlacklistedToken.objects.filter(
+        id__gt=_blacklist_last_id,
+        token__expires_at__gt=timezone.now(),
+    ).values_list('id', 'token__jti')
+    with _lock:
+        for row_id, jti in rows:
+            _blacklisted.add(jti)
+            _blacklist_last_id = max(_blacklist_last_id, row_id)
+        _blacklist_version = version
+        _blacklist_synced_at = now
+
+
+def is_blacklisted(jti):
+    """
+    Whether the token with ``jti`` is blacklisted.
+
+    Tokens missing from the in-process set are accepted without a query.
+    A jti in the set is confirmed against the table, since rows removed by
+    flushexpiredtokens stay in the set until the process restarts.
+    """
+    _sync_blacklist()
+    if jti not in _blacklisted:
+        return False
+    return BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+
+def reset():
+    """
+    Forget buffered tokens and the blacklist set. Used by the tests.
+    """
+    global _pending, _pending_since, _blacklisted, _blacklist_version, _blacklist_last_id, _blacklist_synced_at
+    with _lock:
+        _pending, _pending_since = [], None
+        _blacklisted, _blacklist_version, _blacklist_last_id = set(), None, 0
+        _blacklist_synced_at = None
+
+
+class RefreshToken(BaseRefreshToken):
+    """
+    Refresh token that buffers its OutstandingToken row instead of
+    inserting it right away, and checks the blacklist through
+    is_blacklisted.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        global _pending_since
+        # Skip BlacklistMixin.for_user, which inserts the row immediately
+        token = super(BlacklistMixin, cls).for_user(user)
+
+        row = OutstandingToken(
+            user_id=user.pk,
+            jti=token[api_settings.JTI_CLAIM],
+            token=str(token),
+            created_at=token.current_time,
+            expires_at=datetime_from_epoch(token['exp']),
+        )
+        with _lock:
+            if not _pending:
+                _pending_since = time.monotonic()
+            _pending.append(row)
+            full = len(_pending) >= OUTSTANDING_TOKEN_BATCH_SIZE
+        if full:
+            flush_outstanding_tokens()
+        return token
+
+    def check_blacklist(self):
+        if is_blacklisted(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_('Token is blacklisted'))
@@ -2,6 +2,8 @@ from django.urls import path
 from .views import user_views as UserViews
 from .views import chatroom_views as ChatroomViews
 from .views import message_views as MessageViews
+from .views import async_message_views as AsyncMessageViews
+from .views import cache_views as CacheViews
 from rest_framework_simplejwt.views import TokenRefreshView
 
 
@@ -15,21 +17,63 @@ urlpatterns = [
 
     # Chatroom URLs
     path('chatrooms/', ChatroomViews.chatrooms_list, name='chatrooms_list'),
+    path('chatrooms/inbox/', ChatroomViews.inbox, name='inbox'),
+    path('chatrooms/personal/', ChatroomViews.personal_chatroom, name='personal_chatroom'),
     path(
         'chatrooms/<int:chatroom_id>/',
         ChatroomViews.chatroom_detail,
         name='chatrooms_detail'
     ),
+    path(
+        'chatrooms/<int:chatroom_id>/members/',
+        ChatroomViews.list_members,
+        name='chatroom_members'
+    ),
+    path(
+        'chatrooms/<int:chatroom_id>/read/',
+        ChatroomViews.mark_chatroom_read,
+        name='chatroom_read'
+    ),
+    path(
+        'chatrooms/<int:chatroom_id>/export/',
+        ChatroomViews.export_chatroom,
+        name='chatroom_export'
+    ),
 
     # Message URLs
     path(
         'messages/chatrooms/<int:chatroom_id>/',
-        MessageViews.create_message,
-        name='create_message'
+        MessageViews.chatroom_messages,
+        name='chatroom_messages'
+    ),
+    path(
+        'messages/batch/',
+        MessageViews.create_messages_batch,
+        name='create_messages_batch'
+    ),
+    path(
+        'messages/search/',
+        MessageViews.search_messages,
+        name='search_messages'
     ),
     path(
         'messages/<int:message_id>/',
         MessageViews.message_detail,
         name='message_detail'
     ),
+
+    # Async message URLs
+    path(
+        'async/messages/chatrooms/<int:chatroom_id>/',
+        AsyncMessageViews.chatroom_messages,
+        name='async_chatroom_messages'
+    ),
+    path(
+        'async/messages/chatrooms/<int:chatroom_id>/poll/',
+        AsyncMessageViews.poll_messages,
+        name='async_poll_messages'
+    ),
+
+    # Cache URLs
+    path('cache/stats/', CacheViews.cache_stats, name='cache_stats'),
 ]
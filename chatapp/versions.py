@@ -0,0 +1,96 @@
+import hashlib
+
+from django.core.cache import caches
+from django.db.models import F
+from django.utils.http import parse_etags, quote_etag
+from .models import ChatMembership, ChatRoom, Generation
+
+
+USERS = 'users'
+
+VERSION_CACHE_ALIAS = 'versions'
+
+
+def version_cache():
+    """
+    The cache holding version counters that other cache keys embed, kept
+    out of 'default' so its culling cannot evict them.
+    """
+    return caches[VERSION_CACHE_ALIAS]
+
+
+def bump_chatrooms(*chatroom_ids):
+    """
+    Move chatrooms to a new version after a change to their detail
+    payload, with one UPDATE.
+    """
+    if chatroom_ids:
+        ChatRoom.objects.filter(id__in=chatroom_ids).update(version=F('version') + 1)
+
+
+def bump_chatroom_members(*chatroom_ids):
+    """
+    Like bump_chatrooms, for changes to the member list; also moves the
+    rooms' members_version.
+    """
+    if chatroom_ids:
+        ChatRoom.objects.filter(id__in=chatroom_ids).update(
+            version=F('version') + 1,
+            members_version=F('members_version') + 1,
+        )
+
+
+def bump_user_chatrooms(user_id):
+    """
+    Every room lists its members' profiles, so a profile change moves all
+    of the user's rooms to a new version.
+    """
+    ChatRoom.objects.filter(chatmembership__user_id=user_id).update(
+        version=F('version') + 1,
+        members_version=F('members_version') + 1,
+    )
+
+
+def get_generation(name):
+    value = Generation.objects.filter(name=name).values_list('value', flat=True).first()
+    return value or 0
+
+
+def bump_generation(name):
+    if not Generation.objects.filter(name=name).update(value=F('value') + 1):
+        Generation.objects.bulk_create([Generation(name=name, value=1)], ignore_conflicts=True)
+
+
+def chatroom_etag(chatroom):
+    return quote_etag(f'chatroom-{chatroom.id}-{chatroom.version}')
+
+
+def users_etag(generation):
+    return quote_etag(f'users-{generation}')
+
+
+def user_detail_etag(user):
+    """
+    Digest of everything a user's detail payload is built from: their own
+    profile plus, per membership, the room's version and their unread
+    count. Costs one query over the user's memberships.
+    """
+    rows = (
+        ChatMembership.objects.filter(user_id=user.id, chatroom__deleted_at__isnull=True)
+        .order_by('chatroom_id')
+        .values_list('chatroom_id', 'chatroom__version', 'unread_count')
+    )
+    digest = hashlib.sha1(repr((user.id, user.username, user.email, list(rows))).encode()).hexdigest()
+    return quote_etag(f'user-{digest}')
+
+
+def etag_matches(request, etag):
+    """
+    Whether ``etag`` satisfies the request's If-None-Match header, using
+    the weak comparison RFC 9110 prescribes for it.
+    """
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    etags = parse_etags(header)
+    return '*' in etags or etag in (tag.removeprefix('W/') for tag in etags)
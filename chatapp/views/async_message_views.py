@@ -0,0 +1,164 @@
+import asyncio
+import json
+import math
+
+from django.http import JsonResponse
+from rest_framework import status
+from .. import notifier
+from ..decorators import async_api_view
+from ..membership import ais_member
+from ..models import ChatRoom, Message
+from ..pagination import InvalidCursor, apaginate_messages, get_page_size
+from ..realtime import abroadcast_message
+from ..serializers import MESSAGE_ROW_FIELDS, MessageBatchItemSerializer, MessageSerializer, message_rows
+
+
+# Native async versions of the message hot path in message_views. They
+# answer the same requests with the same payloads, but never hold a worker
+# thread while waiting on the database or the channel layer.
+
+LONG_POLL_TIMEOUT = 25
+MAX_LONG_POLL_TIMEOUT = 60
+
+# (event loop, chatroom id, after_id, limit) -> task running that poll
+# query. Waiters woken by the same message share one query instead of
+# queueing one each on the database thread.
+_poll_queries = {}
+
+
+@async_api_view(['POST', 'GET'])
+async def chatroom_messages(request, chatroom_id):
+    if request.method == 'POST':
+        return await create_message(request, chatroom_id)
+    elif request.method == 'GET':
+        return await list_messages(request, chatroom_id)
+
+
+async def list_messages(request, chatroom_id):
+    if not await ChatRoom.objects.filter(id=chatroom_id).aexists():
+        return JsonResponse({'error': 'Chatroom does not exist'}, status=status.HTTP_404_NOT_FOUND)
+
+    if not await ais_member(chatroom_id, request.user.id):
+        return JsonResponse({'error': 'You are not a member of this chatroom'}, status=status.HTTP_403_FORBIDDEN)
+
+    try:
+        messages, before, after = await apaginate_messages(
+            Message.objects.live().filter(chatroom_id=chatroom_id).values(*MESSAGE_ROW_FIELDS),
+            before=request.GET.get('before'),
+            after=request.GET.get('after'),
+            limit=get_page_size(request),
+        )
+    except InvalidCursor as e:
+        return JsonResponse({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    return JsonResponse(
+        {'messages': message_rows(messages), 'before': before, 'after': after},
+        status=status.HTTP_200_OK
+    )
+
+
+async def create_message(request, chatroom_id):
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'error': 'Malformed JSON'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        chatroom = await ChatRoom.objects.aget(id=chatroom_id)
+    except ChatRoom.DoesNotExist:
+        return JsonResponse({'error': 'Chatroom does not exist'}, status=status.HTTP_404_NOT_FOUND)
+
+    if not await ais_member(chatroom.id, request.user.id):
+        return JsonResponse({'error': 'You are not a member of this chatroom'}, status=status.HTTP_400_BAD_REQUEST)
+
+    # MessageSerializer would look up the user and chatroom again, with
+    # sync queries; both are known to exist here
+    serializer = MessageBatchItemSerializer(data={
+        'chatroom': chatroom.id,
+        'content': data.get('content') if isinstance(data, dict) else None,
+    })
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    message = await Message.objects.acreate(
+        user=request.user, chatroom=chatroom, content=serializer.validated_data['content']
+    )
+    data = MessageSerializer(message).data
+    await abroadcast_message('message.created', data)
+    return JsonResponse(data, status=status.HTTP_201_CREATED)
+
+
+async def _new_messages(chatroom_id, after_id, limit):
+    return [
+        row async for row in
+        Message.objects.live().filter(chatroom_id=chatroom_id, id__gt=after_id)
+        .order_by('id')
+        .values(*MESSAGE_ROW_FIELDS)[:limit]
+    ]
+
+
+async def _shared_new_messages(chatroom_id, after_id, limit):
+    """
+    The rows of _new_messages(), from a query already running for the
+    same arguments when there is one. The returned list is shared and must
+    not be changed.
+    """
+    key = (asyncio.get_running_loop(), chatroom_id, after_id, limit)
+    query = _poll_queries.get(key)
+    if query is None:
+        query = asyncio.ensure_future(_new_messages(chatroom_id, after_id, limit))
+        _poll_queries[key] = query
+        query.add_done_callback(lambda _: _poll_queries.pop(key, None))
+    # A waiter that goes away must not cancel the query for the others
+    return await asyncio.shield(query)
+
+
+@async_api_view(['GET'])
+async def poll_messages(request, chatroom_id):
+    """
+    Long-polling fallback for clients that cannot keep a WebSocket open.
+
+    Returns the room's messages with an id above ``after_id``, oldest
+    first, as soon as there are any, or an empty list once ``timeout``
+    seconds (LONG_POLL_TIMEOUT by default) pass. ``after_id`` in the
+    response is the value to send with the next poll. While waiting the
+    request is parked on chatapp.notifier and runs no queries; once woken,
+    the waiters of a room share one query.
+    """
+    try:
+        after_id = int(request.GET['after_id'])
+        timeout = float(request.GET.get('timeout', LONG_POLL_TIMEOUT))
+        limit = get_page_size(request)
+    except (KeyError, ValueError, InvalidCursor):
+        return JsonResponse(
+            {'error': 'after_id is required; after_id, timeout and limit must be numbers'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if not math.isfinite(timeout):
+        return JsonResponse({'error': 'timeout must be a finite number'}, status=status.HTTP_400_BAD_REQUEST)
+    timeout = max(0.0, min(timeout, MAX_LONG_POLL_TIMEOUT))
+
+    if not await ChatRoom.objects.filter(id=chatroom_id).aexists():
+        return JsonResponse({'error': 'Chatroom does not exist'}, status=status.HTTP_404_NOT_FOUND)
+
+    if not await ais_member(chatroom_id, request.user.id):
+        return JsonResponse({'error': 'You are not a member of this chatroom'}, status=status.HTTP_403_FORBIDDEN)
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    # Subscribe before the first check so a message created in between
+    # still wakes the wait
+    with notifier.subscribe(chatroom_id) as subscription:
+        while True:
+            rows = await _shared_new_messages(chatroom_id, after_id, limit)
+            remaining = deadline - loop.time()
+            if rows or remaining <= 0:
+                break
+            # Check again whether woken or not; after a timeout that picks
+            # up messages created by other processes
+            await subscription.wait(remaining)
+
+    return JsonResponse(
+        {'messages': message_rows(rows), 'after_id': rows[-1]['id'] if rows else after_id},
+        status=status.HTTP_200_OK
+    )
@@ -0,0 +1,14 @@
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from .. import response_cache
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def cache_stats(request):
+    """
+    Hit and miss counts of the response cache in this process.
+    """
+    return Response(response_cache.stats(), status=status.HTTP_200_OK)
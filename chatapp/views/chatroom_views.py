@@ -1,11 +1,28 @@
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.parsers import JSONParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from ..models import ChatRoom, ChatMembership
-from ..serializers import ChatRoomDetailSerializer, ChatRoomSerializer
+from ..membership import is_member, set_members
+from ..activity import mark_read
+from ..export import aiter_blocks, export_lines, gzip_stream
+from ..models import ChatRoom, ChatMembership, Message
+from ..personal import get_or_create_personal_chatroom, sync_personal_key
+from ..purge import tombstone_chatroom
+from ..pagination import InvalidCursor, get_page_size, paginate_by_activity, paginate_by_id
+from ..realtime import notify_membership
+from ..versions import chatroom_etag, etag_matches
+from ..serializers import (
+    USER_ROW_FIELDS, ChatRoomDetailSerializer, ChatRoomListSerializer, ChatRoomSerializer, InboxSerializer,
+    serialize_member_lists, user_rows
+)
 from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIRequest
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.http import StreamingHttpResponse
+
+
+PERSONAL_CHATROOM_EXISTS = 'These users already have a personal chatroom'
 
 
 @api_view(['POST', 'GET'])
@@ -17,33 +34,66 @@ def chatrooms_list(request):
         return list_chatrooms(request)
 
 
+def _validate_member_ids(member_ids):
+    """
+    Return ``member_ids`` as a set, or ``None`` if any of them is not an
+    existing user.
+    """
+    if not isinstance(member_ids, list):
+        return None
+    try:
+        member_ids = {int(member_id) for member_id in member_ids}
+    except (TypeError, ValueError):
+        return None
+    if User.objects.filter(id__in=member_ids, tombstone__isnull=True).count() != len(member_ids):
+        return None
+    return member_ids
+
+
 def create_chatroom(request):
-    data = JSONParser().parse(request)
+    data = request.data.copy()
     member_ids = data.pop('member_ids', [])
-    member_ids.append(request.user.id)
 
     serializer = ChatRoomSerializer(data=data)
     if serializer.is_valid():
 
-        chatroom = serializer.save()
-
-        members = User.objects.filter(id__in=member_ids)
-        if len(members) != len(member_ids):
+        member_ids = _validate_member_ids(member_ids)
+        if member_ids is None:
             return Response({'error': 'One or more member_ids are invalid'}, status=status.HTTP_400_BAD_REQUEST)
+        member_ids.add(request.user.id)
 
-        for user in members:
-            ChatMembership.objects.create(user=user, chatroom=chatroom)
+        try:
+            with transaction.atomic():
+                chatroom = serializer.save()
+                joined, _ = set_members(chatroom, member_ids)
+                sync_personal_key(chatroom)
+        except IntegrityError:
+            return Response({'error': PERSONAL_CHATROOM_EXISTS}, status=status.HTTP_400_BAD_REQUEST)
+        notify_membership(chatroom.id, joined=joined)
 
         chatroom.refresh_from_db()
-        response_serializer = ChatRoomDetailSerializer(chatroom)
+        response_serializer = ChatRoomDetailSerializer(chatroom, context={'request': request})
         return Response(response_serializer.data, status=status.HTTP_201_CREATED)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
 def list_chatrooms(request):
-    chatrooms = ChatRoom.objects.all()
-    serializer = ChatRoomSerializer(chatrooms, many=True)
-    return Response(serializer.data, safe=False, status=status.HTTP_200_OK)
+    chatrooms = (
+        ChatRoom.objects.filter(chatmembership__user=request.user)
+        .annotate(unread_count=F('chatmembership__unread_count'))
+    )
+    try:
+        chatrooms, next_cursor = paginate_by_id(
+            chatrooms,
+            after=request.query_params.get('after'),
+            limit=get_page_size(request),
+        )
+    except InvalidCursor as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    context = {'member_lists': serialize_member_lists(chatrooms)}
+    serializer = ChatRoomListSerializer(chatrooms, many=True, context=context)
+    return Response({'chatrooms': serializer.data, 'next': next_cursor}, status=status.HTTP_200_OK)
 
 
 @api_view(['GET', 'PUT', 'DELETE'])
@@ -63,36 +113,34 @@ def update_chatroom(request, chatroom_id):
     except ChatRoom.DoesNotExist:
         return Response({'error': 'ChatRoom not found'}, status=status.HTTP_404_NOT_FOUND)
 
-    if request.user not in chatroom.members.all():
+    if not is_member(chatroom.id, request.user.id):
         return Response({'error': 'You are not a member of this chatroom'}, status=status.HTTP_403_FORBIDDEN)
 
-    data = JSONParser().parse(request)
-    member_ids = data.pop('member_ids', [])
+    data = request.data.copy()
+    member_ids = data.pop('member_ids', None)
 
     serializer = ChatRoomSerializer(chatroom, data=data)
     if serializer.is_valid():
 
-        chatroom = serializer.save()
-
-        # Validate member_ids
-        new_members = User.objects.filter(id__in=member_ids)
-        if len(new_members) != len(member_ids):
-            return Response({'error': 'One or more member_ids are invalid'}, status=status.HTTP_400_BAD_REQUEST)
-
-        current_members = set(chatroom.members.all())
-        new_members_set = set(new_members)
-
-        # Add new members
-        for user in new_members_set - current_members:
-            ChatMembership.objects.create(user=user, chatroom=chatroom)
-
-        # Remove old members
-        for user in current_members - new_members_set:
-            ChatMembership.objects.filter(
-                user=user, chatroom=chatroom).delete()
+        # Membership is left alone when member_ids is not sent
+        if member_ids is not None:
+            member_ids = _validate_member_ids(member_ids)
+            if member_ids is None:
+                return Response({'error': 'One or more member_ids are invalid'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            with transaction.atomic():
+                chatroom = serializer.save()
+                joined, left = set(), set()
+                if member_ids is not None:
+                    joined, left = set_members(chatroom, member_ids)
+                sync_personal_key(chatroom)
+        except IntegrityError:
+            return Response({'error': PERSONAL_CHATROOM_EXISTS}, status=status.HTTP_400_BAD_REQUEST)
+        notify_membership(chatroom.id, joined=joined, left=left)
 
         chatroom.refresh_from_db()
-        response_serializer = ChatRoomDetailSerializer(chatroom)
+        response_serializer = ChatRoomDetailSerializer(chatroom, context={'request': request})
         return Response(response_serializer.data, status=status.HTTP_200_OK)
 
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -104,8 +152,15 @@ def get_chatroom(request, chatroom_id):
     except ChatRoom.DoesNotExist:
         return Response({'error': 'ChatRoom not found'}, status=status.HTTP_404_NOT_FOUND)
 
-    serializer = ChatRoomDetailSerializer(chatroom)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    if not is_member(chatroom.id, request.user.id):
+        return Response({'error': 'You are not a member of this chatroom'}, status=status.HTTP_403_FORBIDDEN)
+
+    etag = chatroom_etag(chatroom)
+    if etag_matches(request, etag):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+    serializer = ChatRoomDetailSerializer(chatroom, context={'request': request})
+    return Response(serializer.data, status=status.HTTP_200_OK, headers={'ETag': etag})
 
 
 def delete_chatroom(request, chatroom_id):
@@ -114,8 +169,144 @@ def delete_chatroom(request, chatroom_id):
     except ChatRoom.DoesNotExist:
         return Response({'error': 'ChatRoom not found'}, status=status.HTTP_404_NOT_FOUND)
 
-    if request.user not in chatroom.members.all():
+    if not is_member(chatroom.id, request.user.id):
         return Response({'error': 'You are not a member of this chatroom'}, status=status.HTTP_403_FORBIDDEN)
 
-    chatroom.delete()
+    # The messages and memberships are removed in the background
+    tombstone_chatroom(chatroom.id)
     return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def list_members(request, chatroom_id):
+    if not ChatRoom.objects.filter(id=chatroom_id).exists():
+        return Response({'error': 'ChatRoom not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    if not is_member(chatroom_id, request.user.id):
+        return Response({'error': 'You are not a member of this chatroom'}, status=status.HTTP_403_FORBIDDEN)
+
+    try:
+        members, next_cursor = paginate_by_id(
+            User.objects.filter(chatmembership__chatroom_id=chatroom_id).values(*USER_ROW_FIELDS),
+            after=request.query_params.get('after'),
+            limit=get_page_size(request),
+        )
+    except InvalidCursor as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({'members': user_rows(members), 'next': next_cursor}, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def personal_chatroom(request):
+    """
+    Get or create the caller's personal chatroom with ``user_id``. Answers
+    201 with the room detail when the room was created and 200 when it
+    already existed.
+    """
+    other_id = request.data.get('user_id') if isinstance(request.data, dict) else None
+    try:
+        other_id = int(other_id)
+    except (TypeError, ValueError):
+        return Response({'error': 'user_id must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    if other_id == request.user.id:
+        return Response({'error': 'Cannot start a personal chat with yourself'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        chatroom, created = get_or_create_personal_chatroom(request.user.id, other_id)
+    except User.DoesNotExist:
+        return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
+    if created:
+        notify_membership(chatroom.id, joined={request.user.id, other_id})
+
+    serializer = ChatRoomDetailSerializer(chatroom, context={'request': request})
+    return Response(serializer.data, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def inbox(request):
+    chatrooms = (
+        ChatRoom.objects.filter(chatmembership__user=request.user)
+        .annotate(unread_count=F('chatmembership__unread_count'))
+        .select_related('last_message')
+    )
+    try:
+        chatrooms, next_cursor = paginate_by_activity(
+            chatrooms,
+            after=request.query_params.get('after'),
+            limit=get_page_size(request),
+        )
+    except InvalidCursor as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    serializer = InboxSerializer(chatrooms, many=True)
+    return Response({'chatrooms': serializer.data, 'next': next_cursor}, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def mark_chatroom_read(request, chatroom_id):
+    try:
+        membership = ChatMembership.objects.select_related('chatroom').get(
+            chatroom_id=chatroom_id, chatroom__deleted_at__isnull=True, user=request.user
+        )
+    except ChatMembership.DoesNotExist:
+        if not ChatRoom.objects.filter(id=chatroom_id).exists():
+            return Response({'error': 'ChatRoom not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({'error': 'You are not a member of this chatroom'}, status=status.HTTP_403_FORBIDDEN)
+
+    if not isinstance(request.data, dict):
+        return Response({'error': 'Request body must be a JSON object'}, status=status.HTTP_400_BAD_REQUEST)
+    # Without a message_id the whole history is marked as read
+    message_id = request.data.get('message_id', membership.chatroom.last_message_id)
+    if message_id is not None:
+        try:
+            message = Message.objects.get(id=message_id, chatroom_id=chatroom_id)
+        except (Message.DoesNotExist, TypeError, ValueError):
+            return Response({'error': 'Message not found in this chatroom'}, status=status.HTTP_400_BAD_REQUEST)
+        mark_read(membership, message)
+        membership.refresh_from_db(fields=['last_read_message', 'unread_count'])
+
+    return Response(
+        {
+            'chatroom': membership.chatroom_id,
+            'last_read_message': membership.last_read_message_id,
+            'unread_count': membership.unread_count,
+        },
+        status=status.HTTP_200_OK
+    )
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def export_chatroom(request, chatroom_id):
+    """
+    Stream a chatroom's full history as newline-delimited JSON, oldest
+    first. ``?compress=gzip`` gzips the stream on the fly.
+    """
+    if not ChatRoom.objects.filter(id=chatroom_id).exists():
+        return Response({'error': 'ChatRoom not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    if not is_member(chatroom_id, request.user.id):
+        return Response({'error': 'You are not a member of this chatroom'}, status=status.HTTP_403_FORBIDDEN)
+
+    compress = request.query_params.get('compress')
+    if compress not in (None, 'gzip'):
+        return Response({'error': 'compress must be gzip'}, status=status.HTTP_400_BAD_REQUEST)
+
+    content = export_lines(chatroom_id)
+    filename = f'chatroom-{chatroom_id}.ndjson'
+    content_type = 'application/x-ndjson'
+    if compress == 'gzip':
+        content = gzip_stream(content)
+        filename += '.gz'
+        content_type = 'application/gzip'
+    if isinstance(request._request, ASGIRequest):
+        content = aiter_blocks(content)
+
+    response = StreamingHttpResponse(content, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
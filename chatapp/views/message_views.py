@@ -1,23 +1,61 @@
+from collections import defaultdict
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.parsers import JSONParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from django.db import transaction
+from .. import search
+from ..activity import record_messages_created
+from ..membership import is_member
 from ..models import ChatRoom, Message
-from ..serializers import MessageSerializer
+from ..pagination import InvalidCursor, get_page_size, paginate_messages
+from ..realtime import broadcast_message, broadcast_messages
+from ..serializers import MESSAGE_ROW_FIELDS, MessageBatchItemSerializer, MessageSerializer, message_rows
 
+MAX_BATCH_SIZE = 1000
 
-@api_view(['POST'])
+
+@api_view(['POST', 'GET'])
 @permission_classes([IsAuthenticated])
+def chatroom_messages(request, chatroom_id):
+    if request.method == 'POST':
+        return create_message(request, chatroom_id)
+    elif request.method == 'GET':
+        return list_messages(request, chatroom_id)
+
+
+def list_messages(request, chatroom_id):
+    if not ChatRoom.objects.filter(id=chatroom_id).exists():
+        return Response({'error': 'Chatroom does not exist'}, status=status.HTTP_404_NOT_FOUND)
+
+    if not is_member(chatroom_id, request.user.id):
+        return Response({'error': 'You are not a member of this chatroom'}, status=status.HTTP_403_FORBIDDEN)
+
+    try:
+        messages, before, after = paginate_messages(
+            Message.objects.live().filter(chatroom_id=chatroom_id).values(*MESSAGE_ROW_FIELDS),
+            before=request.query_params.get('before'),
+            after=request.query_params.get('after'),
+            limit=get_page_size(request),
+        )
+    except InvalidCursor as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response(
+        {'messages': message_rows(messages), 'before': before, 'after': after},
+        status=status.HTTP_200_OK
+    )
+
+
 def create_message(request, chatroom_id):
-    data = JSONParser().parse(request)
+    data = request.data
     try:
         chatroom = ChatRoom.objects.get(id=chatroom_id)
     except ChatRoom.DoesNotExist:
         return Response({'error': 'Chatroom does not exist'}, status=status.HTTP_404_NOT_FOUND)
 
-    if request.user not in chatroom.members.all():
-        return Response({'error': f'You are not a member of this chatroom {chatroom.members.all()}'}, status=status.HTTP_400_BAD_REQUEST)
+    if not is_member(chatroom.id, request.user.id):
+        return Response({'error': 'You are not a member of this chatroom'}, status=status.HTTP_400_BAD_REQUEST)
 
     message = {
         'user': request.user.id,
@@ -28,10 +66,114 @@ def create_message(request, chatroom_id):
     serializer = MessageSerializer(data=message)
     if serializer.is_valid():
         serializer.save()
+        broadcast_message('message.created', serializer.data)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def create_messages_batch(request):
+    """
+    Create many messages, possibly across chatrooms, in one request.
+
+    Membership is checked once per chatroom and every accepted message is
+    inserted with a single bulk_create in one transaction. The response
+    carries one result per submitted item, in order.
+    """
+    items = request.data.get('messages') if isinstance(request.data, dict) else None
+    if not isinstance(items, list) or not items:
+        return Response({'error': 'messages must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(items) > MAX_BATCH_SIZE:
+        return Response(
+            {'error': f'At most {MAX_BATCH_SIZE} messages can be sent in one batch'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    results = [None] * len(items)
+    accepted = []
+    for index, item in enumerate(items):
+        serializer = MessageBatchItemSerializer(data=item)
+        if serializer.is_valid():
+            accepted.append((index, serializer.validated_data))
+        else:
+            results[index] = {'status': status.HTTP_400_BAD_REQUEST, 'errors': serializer.errors}
+
+    chatroom_ids = {data['chatroom'] for _, data in accepted}
+    existing_ids = set(ChatRoom.objects.filter(id__in=chatroom_ids).values_list('id', flat=True))
+    member_of = {chatroom_id for chatroom_id in existing_ids if is_member(chatroom_id, request.user.id)}
+
+    pending = []
+    for index, data in accepted:
+        if data['chatroom'] not in existing_ids:
+            results[index] = {'status': status.HTTP_404_NOT_FOUND, 'error': 'Chatroom does not exist'}
+        elif data['chatroom'] not in member_of:
+            results[index] = {'status': status.HTTP_403_FORBIDDEN, 'error': 'You are not a member of this chatroom'}
+        else:
+            pending.append((index, Message(
+                user=request.user, chatroom_id=data['chatroom'], content=data['content']
+            )))
+
+    created = []
+    if pending:
+        with transaction.atomic():
+            created = Message.objects.bulk_create([message for _, message in pending])
+            by_chatroom = defaultdict(list)
+            for message in created:
+                by_chatroom[message.chatroom_id].append(message)
+            for chatroom_id, messages in by_chatroom.items():
+                record_messages_created(chatroom_id, messages)
+
+    created_data = MessageSerializer(created, many=True).data
+    for (index, _), data in zip(pending, created_data):
+        results[index] = {'status': status.HTTP_201_CREATED, 'message': data}
+    broadcast_messages('message.created', created_data)
+
+    all_created = len(created) == len(items)
+    return Response(
+        {'results': results},
+        status=status.HTTP_201_CREATED if all_created else status.HTTP_207_MULTI_STATUS
+    )
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def search_messages(request):
+    """
+    Full-text search over the messages of the caller's chatrooms, best
+    matches first, with highlighted snippets. ``chatroom`` narrows the
+    search to one room.
+    """
+    if not search.is_supported():
+        return Response({'error': 'Search is not available'}, status=status.HTTP_501_NOT_IMPLEMENTED)
+
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return Response({'error': 'q is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        page = max(1, int(request.query_params.get('page', 1)))
+        chatroom_id = request.query_params.get('chatroom')
+        chatroom_id = int(chatroom_id) if chatroom_id is not None else None
+        limit = get_page_size(request)
+    except (ValueError, InvalidCursor):
+        return Response({'error': 'page, limit and chatroom must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+
+    messages = search.search_messages(
+        request.user.id, query, limit=limit + 1, offset=(page - 1) * limit, chatroom_id=chatroom_id
+    )
+    has_more = len(messages) > limit
+    messages = messages[:limit]
+
+    results = MessageSerializer(messages, many=True).data
+    for result, message in zip(results, messages):
+        result['snippet'] = message.snippet
+    return Response(
+        {'results': results, 'page': page, 'next': page + 1 if has_more else None},
+        status=status.HTTP_200_OK
+    )
+
+
 @api_view(['DELETE', 'PUT'])
 @permission_classes([IsAuthenticated])
 def message_detail(request, message_id):
@@ -43,29 +185,32 @@ def message_detail(request, message_id):
 
 def delete_message(request, message_id):
     try:
-        message = Message.objects.get(id=message_id)
+        message = Message.objects.get(id=message_id, chatroom__deleted_at__isnull=True)
     except Message.DoesNotExist:
         return Response({'error': 'Message does not exist'}, status=status.HTTP_404_NOT_FOUND)
 
     if request.user != message.user:
         return Response({'error': 'You are not the author of this message'}, status=status.HTTP_403_FORBIDDEN)
 
+    deleted = {'id': message.id, 'chatroom': message.chatroom_id}
     message.delete()
+    broadcast_message('message.deleted', deleted)
     return Response(status=status.HTTP_204_NO_CONTENT)
 
 
 def update_message(request, message_id):
     try:
-        message = Message.objects.get(id=message_id)
+        message = Message.objects.get(id=message_id, chatroom__deleted_at__isnull=True)
     except Message.DoesNotExist:
         return Response({'error': 'Message does not exist'}, status=status.HTTP_404_NOT_FOUND)
 
     if request.user != message.user:
         return Response({'error': 'You are not the author of this message'}, status=status.HTTP_403_FORBIDDEN)
 
-    data = JSONParser().parse(request)
+    data = request.data
     message.content = data['content']
     message.save()
 
     serializer = MessageSerializer(message)
+    broadcast_message('message.updated', serializer.data)
     return Response(serializer.data, status=status.HTTP_200_OK)
@@ -2,8 +2,11 @@ from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import RefreshToken
-from ..serializers import UserSerializer, LoginSerializer, UserListSerializer, UserDetailSerializer
+from .. import response_cache
+from ..purge import tombstone_user
+from ..serializers import USER_ROW_FIELDS, UserSerializer, LoginSerializer, UserDetailSerializer, user_rows
+from ..tokens import RefreshToken
+from ..versions import USERS, etag_matches, get_generation, user_detail_etag, users_etag
 from django.contrib.auth.models import User
 
 
@@ -52,9 +55,16 @@ def login_user(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def list_users(request):
-    users = User.objects.all()
-    serializer = UserListSerializer(users, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    generation = get_generation(USERS)
+    etag = users_etag(generation)
+    if etag_matches(request, etag):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+    users = response_cache.get_or_build(
+        response_cache.users_key(generation),
+        lambda: user_rows(User.objects.filter(tombstone__isnull=True).values(*USER_ROW_FIELDS))
+    )
+    return Response(users, status=status.HTTP_200_OK, headers={'ETag': etag})
 
 
 @api_view(['PUT', 'GET', 'DELETE'])
@@ -77,10 +87,15 @@ def update_user(request):
 
 
 def get_user(request):
+    etag = user_detail_etag(request.user)
+    if etag_matches(request, etag):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
     serializer = UserDetailSerializer(request.user)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    return Response(serializer.data, status=status.HTTP_200_OK, headers={'ETag': etag})
 
 
 def delete_user(request):
-    request.user.delete()
+    # The user's messages are removed in the background
+    tombstone_user(request.user)
     return Response(status=status.HTTP_204_NO_CONTENT)